@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import store
+from bid_table import BidTable
+
+
+BIDDERS = 'bidders'
+
+_memo = {}
+
+
+def dataset_version(data_dir=store.DATA_DIR):
+    """Identify the current state of the stored datasets by their sizes and modification times."""
+    state = []
+    for name in [store.BIDS, store.TXS, store.RECEIPTS]:
+        stat = os.stat(store.path(name, data_dir))
+        state.append('{}:{}:{}'.format(name, stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(','.join(state).encode()).hexdigest()
+
+
+def aggregate_bidders(bids, txs=None, receipts=None):
+    """Compute per sender totals, bid counts, first and last bid times and failed transactions.
+
+    `bids` is a bids dataframe or a `BidTable`. Both are grouped by the integer sender codes.
+    """
+    sender = bids['sender']
+    codes = sender.cat.codes.to_numpy()
+    n_senders = len(sender.cat.categories)
+    time = bids['time'].to_numpy().astype(np.int64)
+    first_bid = np.full(n_senders, np.iinfo(np.int64).max)
+    last_bid = np.full(n_senders, np.iinfo(np.int64).min)
+    np.minimum.at(first_bid, codes, time)
+    np.maximum.at(last_bid, codes, time)
+    n_bids = np.bincount(codes, minlength=n_senders)
+    observed = n_bids > 0
+    bidders = pd.DataFrame({
+        'amount': np.bincount(codes, weights=bids['amount'], minlength=n_senders)[observed],
+        'n_bids': n_bids[observed],
+        'first_bid': first_bid[observed],
+        'last_bid': last_bid[observed],
+    }, index=pd.CategoricalIndex(sender.cat.categories[observed], name='sender'))
+    bidders['percentage'] = bidders['amount'] / bidders['amount'].sum()
+    if txs is not None and receipts is not None:
+        merged = pd.merge(txs[['from']], receipts[['status']], left_index=True, right_index=True)
+        failures = merged[merged['status'] == 0].groupby('from').size()
+        bidders['n_failed'] = failures.reindex(bidders.index.astype(str), fill_value=0).values
+    return bidders
+
+
+def load_bidders(data_dir=store.DATA_DIR):
+    """Get the bidder aggregates of the stored datasets.
+
+    The aggregates are computed only once per dataset version and are persisted next to the data.
+    """
+    version = dataset_version(data_dir)
+    key = (os.path.abspath(data_dir), version)
+    if key in _memo:
+        return _memo[key]
+
+    path = store.path(BIDDERS, data_dir)
+    bidders = None
+    if os.path.exists(path):
+        table = pq.read_table(path)
+        if table.schema.metadata.get(b'version') == version.encode():
+            bidders = table.to_pandas()
+    if bidders is None:
+        bidders = aggregate_bidders(
+            BidTable.load(['sender', 'amount', 'time'], data_dir),
+            store.load_txs(['hash', 'from'], data_dir),
+            store.load_receipts(['transactionHash', 'status'], data_dir)
+        )
+        table = pa.Table.from_pandas(bidders)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'version'] = version.encode()
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+
+    _memo[key] = bidders
+    return bidders
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import aiohttp
+
+import profiling
+import rpc
+from rpc import BACKOFF, BATCH_SIZE, RETRIES, RPC_URL, check_response, make_request
+
+
+CONCURRENCY = 16
+
+
+class AsyncClient:
+    """JSON-RPC client running many requests concurrently over a pool of connections.
+
+    At most `concurrency` requests are in flight at any time and, if `rate_limit` is given, no
+    more than that many are started per second. `rate_limiter` can instead be an
+    `rpc.RateLimiter` shared with other clients. Requests failing with an HTTP error or a
+    transient JSON-RPC error are retried up to `retries` times with exponential backoff.
+    """
+
+    def __init__(self, url=RPC_URL, concurrency=CONCURRENCY, rate_limit=None, retries=RETRIES,
+                 backoff=BACKOFF, batch_size=BATCH_SIZE, rate_limiter=None):
+        self.url = url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        if rate_limiter is None and rate_limit:
+            rate_limiter = rpc.RateLimiter(rate_limit)
+        self.rate_limiter = rate_limiter
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def post(self, payload, check=None):
+        """Send a request and return its response, passed through `check` if given.
+
+        `check` raises `rpc.RPCError` for error responses, which are retried if transient.
+        """
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                async with self.semaphore:
+                    async with self.session.post(self.url, json=payload) as response:
+                        response.raise_for_status()
+                        result = await response.json()
+                        if profiling.enabled:
+                            profiling.count_rpc(len(payload), len(json.dumps(payload)),
+                                                len(await response.read()))
+                return check(result) if check is not None else result
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            except rpc.RPCError as e:
+                if attempt == self.retries or not rpc.is_transient(e):
+                    raise
+            await asyncio.sleep(self.backoff * 2**attempt)
+
+    async def call(self, method, params):
+        results = await self.batch_call([(method, params)])
+        return results[0]
+
+    async def batch_call(self, calls):
+        """Perform a list of `(method, params)` calls, sending the batches concurrently.
+
+        Results found in `rpc.cache` are not requested again.
+        """
+        cached = rpc.CachedCalls(calls)
+        fetched = await self._send(cached.missing_calls) if cached.missing_calls else []
+        return cached.complete(fetched)
+
+    async def _send(self, calls):
+        batches = [calls[start:start + self.batch_size]
+                   for start in range(0, len(calls), self.batch_size)]
+        batch_results = await asyncio.gather(*[self._batch(batch) for batch in batches])
+        return [result for results in batch_results for result in results]
+
+    async def _batch(self, batch):
+        payload = [make_request(method, params, i) for i, (method, params) in enumerate(batch)]
+
+        def check(response):
+            by_id = {item['id']: item for item in response}
+            return [check_response(by_id[i]) for i in range(len(batch))]
+
+        return await self.post(payload, check)
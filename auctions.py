@@ -0,0 +1,55 @@
+import json
+import os
+from collections import namedtuple
+
+import store
+
+
+REGISTRY_FILENAME = 'auctions.json'
+DEFAULT_AUCTION = 'rdn'
+# bidders contributing more than this in total had to pass KYC
+KYC_LIMIT = 2.5  # ETH
+
+Auction = namedtuple('Auction', ['name', 'address', 'creation_block'])
+
+
+def load_registry():
+    """Get all known auctions.
+
+    The auctions are read from `auctions.json`, a list of objects with the fields of `Auction`.
+    Without it, only the RDN auction defined in `addresses.py` is known.
+    """
+    if os.path.exists(REGISTRY_FILENAME):
+        with open(REGISTRY_FILENAME) as f:
+            return [Auction(**entry) for entry in json.load(f)]
+    from addresses import AUCTION_ADDRESS
+    return [Auction(DEFAULT_AUCTION, AUCTION_ADDRESS, 4383437)]
+
+
+def get_auction(name=DEFAULT_AUCTION):
+    for auction in load_registry():
+        if auction.name == name:
+            return auction
+    raise KeyError('unknown auction {}'.format(name))
+
+
+def data_dir(auction):
+    """Directory holding the datasets of an auction."""
+    return os.path.join(store.DATA_DIR, auction.name)
+
+
+def load_checkpoint(auction):
+    """Get the fetch state of an auction: last confirmed block, its hash and the start time."""
+    path = store.checkpoint_path(data_dir(auction))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def start_time(auction):
+    """Start time of an auction as read from its `AuctionStarted` event when fetching."""
+    checkpoint = load_checkpoint(auction)
+    if checkpoint is None:
+        raise ValueError('auction {} has not been fetched yet'.format(auction.name))
+    return checkpoint['start_time']
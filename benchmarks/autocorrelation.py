@@ -0,0 +1,55 @@
+"""Compare `plot.calc_autocorrelation` to the previous loop based implementation.
+
+Run with `python -m benchmarks.autocorrelation` from the repository root.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import correlation
+
+
+def calc_autocorrelation_loop(bids):
+    """The implementation replaced by `correlation.autocorrelation`."""
+    bids = bids.copy()
+    bids['time_bin'] = bids['time'] // 60
+
+    bids_per_bin = bids.groupby('time_bin').size()
+    time_bins = np.arange(0, bids_per_bin.index[-1] + 1)
+    bids_per_bin = bids_per_bin.reindex(time_bins, fill_value=0)
+
+    tao = np.arange(1, 120)  # 2 hours
+    gamma = np.zeros(tao.shape)
+    for i in range(len(tao)):
+        for time_bin in time_bins[:-tao[-1]]:
+            gamma[i] += bids_per_bin[time_bin] * bids_per_bin[time_bin + tao[i]]
+
+    return tao, gamma
+
+
+def calc_autocorrelation_fft(bids):
+    counts = correlation.bin_counts(bids['time'], 60)
+    return correlation.autocorrelation(counts, 119)
+
+
+def make_bids(n_bids, duration, seed=0):
+    random = np.random.RandomState(seed)
+    return pd.DataFrame({'time': np.sort(random.randint(0, duration, n_bids))})
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for days in [1, 3, 10]:
+        bids = make_bids(5000 * days, days * 24 * 60 * 60)
+        (tao, expected), loop_time = timed(calc_autocorrelation_loop, bids)
+        (lags, gamma), fft_time = timed(calc_autocorrelation_fft, bids)
+        assert np.array_equal(tao, lags)
+        assert np.allclose(expected, gamma)
+        print('{:>3} days: loop {:8.3f}s, fft {:8.5f}s, speedup {:.0f}x'.format(
+            days, loop_time, fft_time, loop_time / fft_time))
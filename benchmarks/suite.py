@@ -0,0 +1,163 @@
+"""Time loading, analysis, figures and fetching on synthetic auctions of different sizes.
+
+Run with `python -m benchmarks.suite` from the repository root. Save the results with
+`--save baseline.json` and check later runs against them with `--compare baseline.json`, which
+fails if any benchmark got slower by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import aggregates
+import async_rpc
+import auctions
+import block_times
+import events
+import fetch
+import mock_rpc
+import plot
+import plot_plotly
+import store
+import synthetic
+import time_cube
+from bid_table import BidTable
+from concentration import Concentration
+
+
+SIZES = [10000, 100000, 1000000]
+# serving larger auctions from the mock node takes too long for a benchmark run
+FETCH_MAX_SIZE = 100000
+REPEATS = 3
+TOLERANCE = 1.5
+
+
+def best_time(function, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def lorenz_gini(bidders):
+    concentration = Concentration.from_totals(bidders['amount'])
+    concentration.lorenz_curve()
+    concentration.top_share(0.1)
+    return concentration.gini()
+
+
+def build_time_cube(table):
+    cube = time_cube.TimeCube(synthetic.START_TIME)
+    cube.append(table.time, table['amount'], table.senders[table.sender_codes], table.block)
+    return cube
+
+
+def bid_logs(bids):
+    """Bid logs in the format returned by `eth_getLogs`, with quantities decoded by `rpc`."""
+    topic = events.event_topic(fetch.BID_EVENT)
+    return [{
+        'topics': [topic, '0x' + mock_rpc.word(int(sender, 16))],
+        'data': '0x' + mock_rpc.word(amount) + mock_rpc.word(missing),
+        'blockNumber': int(block),
+        'transactionHash': txhash,
+        'logIndex': 0,
+    } for sender, amount, missing, block, txhash in zip(
+        bids['sender'], bids['amount'], bids['missing'], bids['block'], bids['txhash'])]
+
+
+def fetch_from_mock(url, timestamps_path):
+    auction = auctions.Auction('synthetic', synthetic.AUCTION_ADDRESS, synthetic.START_BLOCK - 1)
+
+    async def run():
+        async with async_rpc.AsyncClient(url) as client:
+            head = int(await client.call('eth_blockNumber', []), 16)
+            # start without known timestamps to include fetching them
+            if os.path.exists(timestamps_path):
+                os.remove(timestamps_path)
+            return await fetch.fetch_all(client, auction, auction.creation_block, head,
+                                         synthetic.START_TIME,
+                                         block_index=block_times.BlockTimes(timestamps_path))
+
+    return asyncio.run(run())
+
+
+def run_size(size, tmp_dir, fetch_max_size=FETCH_MAX_SIZE, repeats=REPEATS):
+    """Generate an auction with `size` bids and time the benchmarks on it."""
+    bids, txs, receipts = synthetic.generate(size)
+    data_dir = os.path.join(tmp_dir, str(size))
+    synthetic.write(bids, txs, receipts, data_dir)
+
+    table = BidTable.load(data_dir=data_dir)
+    bidders = aggregates.aggregate_bidders(table)
+    cube = build_time_cube(table)
+    logs = bid_logs(bids)
+    plotly_bids = plot_plotly.prepare_bids(store.load_bids(data_dir=data_dir),
+                                           synthetic.START_TIME)
+    cases = [
+        ('decode_bid_logs', lambda: events.decode_logs(fetch.BID_EVENT, logs)),
+        ('load_bids', lambda: store.load_bids(data_dir=data_dir)),
+        ('load_bid_table', lambda: BidTable.load(data_dir=data_dir)),
+        ('aggregate_bidders', lambda: aggregates.aggregate_bidders(table)),
+        ('calc_autocorrelation', lambda: plot.calc_autocorrelation(table)),
+        ('lorenz_gini', lambda: lorenz_gini(bidders)),
+        ('build_time_cube', lambda: build_time_cube(table)),
+        ('fig_rolling', lambda: plot_plotly.fig_rolling(cube)),
+        ('fig_bids', lambda: plot_plotly.fig_bids(plotly_bids, bidders, cube)),
+        ('fig_bid_hist', lambda: plot_plotly.fig_bid_hist(bidders)),
+    ]
+    for name, function in cases:
+        yield name, best_time(function, repeats)
+
+    if size <= fetch_max_size:
+        chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                                   synthetic.START_TIME, synthetic.START_BLOCK)
+        timestamps_path = os.path.join(tmp_dir, block_times.BLOCK_TIMES_FILENAME)
+        with mock_rpc.serve(chain) as url:
+            yield 'fetch', best_time(lambda: fetch_from_mock(url, timestamps_path), 1)
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Get the benchmarks slower than in the baseline by more than the tolerance factor."""
+    return [(key, baseline[key], seconds) for key, seconds in results.items()
+            if key in baseline and seconds > baseline[key] * tolerance]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='numbers of bids of the generated auctions')
+    parser.add_argument('--fetch-max-size', type=int, default=FETCH_MAX_SIZE,
+                        help='largest auction to benchmark fetching on')
+    parser.add_argument('--repeats', type=int, default=REPEATS,
+                        help='number of runs of each benchmark, the fastest one is reported')
+    parser.add_argument('--save', help='file to write the results to')
+    parser.add_argument('--compare', help='file with results to compare to')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='slowdown factor reported as regression')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            for name, seconds in run_size(size, tmp_dir, args.fetch_max_size, args.repeats):
+                print('{:<22} {:>8} bids {:10.4f}s'.format(name, size, seconds))
+                results['{}/{}'.format(name, size)] = seconds
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, before, after in regressions:
+            print('regression in {}: {:.4f}s -> {:.4f}s'.format(key, before, after))
+        if regressions:
+            sys.exit(1)
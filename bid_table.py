@@ -0,0 +1,126 @@
+"""Compact in-memory representation of the bids.
+
+Hashes and senders are kept as fixed width bytes, senders coded as integers into the array of
+distinct senders, and amounts as exact integer wei in the decimal128 arrays read from Parquet. No
+Python objects are created per bid unless a column is requested in the format of
+`store.load_bids`.
+"""
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import store
+from events import to_hex
+
+
+WEI_PER_ETHER = 10**18
+
+
+class BidTable:
+    """Bids as typed arrays, accepted wherever a bids dataframe is only indexed by column.
+
+    `table['amount']` and the other columns are returned as series in the format of
+    `store.load_bids`, computed on demand. `table['sender']` is categorical with the sender codes
+    as its codes, so per sender aggregations can be keyed by them.
+    """
+
+    def __init__(self, txhash, block, time, sender_codes, senders, amount, missing):
+        self.txhash = txhash  # S32
+        self.block = block  # int32
+        self.time = time  # int32, seconds since auction start
+        self.sender_codes = sender_codes  # int32 indices into `senders`
+        self.senders = senders  # S20
+        self.amount = amount  # pyarrow decimal128 wei
+        self.missing = missing  # pyarrow decimal128 wei
+        self._columns = {}
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Build from a table with (some of) the columns of the bids schema."""
+        def column(name):
+            if name not in table.column_names:
+                return None
+            if table.num_rows == 0:
+                return pa.array([], store.SCHEMAS[store.BIDS].field(name).type)
+            return pa.concat_arrays(table[name].chunks)
+
+        def fixed_bytes(array, width):
+            if array is None:
+                return None
+            if len(array) == 0:
+                return np.zeros(0, 'S{}'.format(width))
+            values = np.frombuffer(array.buffers()[1], dtype='S{}'.format(width))
+            return values[array.offset:array.offset + len(array)]
+
+        def integers(array, dtype):
+            return None if array is None else array.to_numpy().astype(dtype)
+
+        sender = fixed_bytes(column('sender'), 20)
+        if sender is not None:
+            codes, senders = pd.factorize(sender)
+            sender_codes, senders = codes.astype(np.int32), np.asarray(senders, dtype='S20')
+        else:
+            sender_codes, senders = None, None
+        return cls(
+            txhash=fixed_bytes(column('txhash'), 32),
+            block=integers(column('block'), np.int32),
+            time=integers(column('time'), np.int32),
+            sender_codes=sender_codes,
+            senders=senders,
+            amount=column('amount'),
+            missing=column('missing'),
+        )
+
+    @classmethod
+    def load(cls, columns=None, data_dir=store.DATA_DIR):
+        return cls.from_arrow(store.read_table(store.BIDS, columns, data_dir))
+
+    def __len__(self):
+        for values in [self.time, self.block, self.sender_codes, self.txhash, self.amount]:
+            if values is not None:
+                return len(values)
+        return 0
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            self._columns[name] = pd.Series(self._column(name), name=name)
+        return self._columns[name]
+
+    def _has(self, name):
+        return getattr(self, 'sender_codes' if name == 'sender' else name, None) is not None
+
+    def _column(self, name):
+        if not self._has(name):
+            raise KeyError(name)
+        if name in ('amount', 'missing'):
+            return store.wei_to_ether(getattr(self, name))
+        if name == 'sender':
+            return pd.Categorical.from_codes(self.sender_codes, to_hex(self.senders))
+        if name == 'txhash':
+            return to_hex(self.txhash)
+        return getattr(self, name)
+
+    @property
+    def columns(self):
+        return [name for name in store.SCHEMAS[store.BIDS].names if self._has(name)]
+
+    def to_frame(self):
+        """Convert to a dataframe as returned by `store.load_bids`."""
+        return pd.DataFrame({name: self[name] for name in self.columns})
+
+    def ether(self, name='amount'):
+        """Exact amounts in ETH as decimals."""
+        return [None if wei is None else Decimal(int(wei)) / WEI_PER_ETHER
+                for wei in getattr(self, name).to_pylist()]
+
+    def total_wei(self, name='amount'):
+        """Exact sum of an amount column in wei."""
+        return sum(int(wei) for wei in getattr(self, name).to_pylist() if wei is not None)
+
+    @property
+    def nbytes(self):
+        arrays = [self.txhash, self.block, self.time, self.sender_codes, self.senders]
+        return (sum(array.nbytes for array in arrays if array is not None) +
+                sum(array.nbytes for array in [self.amount, self.missing] if array is not None))
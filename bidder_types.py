@@ -1,12 +1,108 @@
+import argparse
+import asyncio
+
 import pandas as pd
-from web3 import Web3
+from eth_utils import keccak
 
+import async_rpc
+import auctions
+import rpc
+import store
+from fetch import CONFIRMATIONS
+from rpc_cache import RPCCache
 
-if __name__ == '__main__':
-    web3 = Web3(Web3.RPCProvider())
-    bids = pd.DataFrame.from_csv('bids.csv')
-    senders = bids['sender'].unique()
-    codes = [web3.eth.getCode(sender) for sender in senders]
-    n_external = codes.count('0x')
+
+BIDDER_TYPES = 'bidder_types'
+
+EOA = 'eoa'
+CONTRACT = 'contract'
+
+# number of addresses whose code is held in memory at the same time
+CHUNK_SIZE = 10000
+
+EMPTY_CODE_HASH = '0x' + keccak(b'').hex()
+
+
+def code_hash(code):
+    return '0x' + keccak(bytes.fromhex(code[2:])).hex()
+
+
+async def fetch_code_hashes(client, addresses, block_number, chunk_size=CHUNK_SIZE):
+    """Get the hash of the code of each address, only keeping a chunk of codes in memory."""
+    hashes = []
+    for start in range(0, len(addresses), chunk_size):
+        chunk = addresses[start:start + chunk_size]
+        codes = await client.batch_call([('eth_getCode', [address, hex(block_number)])
+                                         for address in chunk])
+        hashes.extend(code_hash(code) for code in codes)
+    return hashes
+
+
+def classify(senders, code_hashes, template_hashes):
+    """Build the per sender type table from code hashes and a `{code hash: name}` mapping."""
+    types = [EOA if h == EMPTY_CODE_HASH else template_hashes.get(h, CONTRACT)
+             for h in code_hashes]
+    bidder_types = pd.DataFrame({
+        'code_hash': pd.Categorical(code_hashes),
+        'type': pd.Categorical(types),
+    }, index=pd.Index(senders, name='sender'))
+    return bidder_types
+
+
+def template_addresses():
+    """Get contracts whose code identifies a known wallet template, by template name."""
+    from addresses import WALLET_ADDRESS
+    return {'multisig wallet': WALLET_ADDRESS}
+
+
+async def fetch_bidder_types(client, senders, block_number, templates=None):
+    """Classify senders by their code.
+
+    `templates` maps names to contracts with the code of a known wallet, by default
+    `template_addresses()`.
+    """
+    if templates is None:
+        templates = template_addresses()
+    template_names = list(templates)
+    addresses = [templates[name] for name in template_names] + list(senders)
+    hashes = await fetch_code_hashes(client, addresses, block_number)
+    template_hashes = dict(zip(hashes[:len(template_names)], template_names))
+    return classify(senders, hashes[len(template_names):], template_hashes)
+
+
+def save_bidder_types(bidder_types, data_dir=store.DATA_DIR):
+    bidder_types.to_parquet(store.path(BIDDER_TYPES, data_dir))
+
+
+def load_bidder_types(data_dir=store.DATA_DIR):
+    """Load the sender type table, indexed by sender to be joined with the bidder aggregates."""
+    return pd.read_parquet(store.path(BIDDER_TYPES, data_dir))
+
+
+async def main(auction):
+    data_dir = auctions.data_dir(auction)
+    bids = store.load_bids(['sender', 'block'], data_dir)
+    # query the code at the last bid so that results can be cached once it is final
+    block_number = int(bids['block'].max())
+    senders = [str(sender) for sender in bids['sender'].unique()]
+    async with async_rpc.AsyncClient() as client:
+        head = int(await client.call('eth_blockNumber', []), 16)
+        rpc.set_cache(RPCCache(finalized_block=head - CONFIRMATIONS))
+        bidder_types = await fetch_bidder_types(client, senders, block_number)
+    save_bidder_types(bidder_types, data_dir)
+
+    counts = bidder_types['type'].value_counts()
+    contracts = bidder_types[bidder_types['type'] != EOA]
     print('Total bidders: {}'.format(len(senders)))
-    print('External accounts: {}'.format(n_external))
+    print('External accounts: {}'.format(counts.get(EOA, 0)))
+    for name in template_addresses():
+        print('{}: {}'.format(name, counts.get(name, 0)))
+    print('Other contracts: {}'.format(counts.get(CONTRACT, 0)))
+    print('Distinct contract codes: {}'.format(contracts['code_hash'].nunique()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Classify the bidders by their code.')
+    parser.add_argument('--auction', default=auctions.DEFAULT_AUCTION,
+                        help='name of the auction in the registry')
+    asyncio.run(main(auctions.get_auction(parser.parse_args().auction)))
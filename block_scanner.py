@@ -0,0 +1,73 @@
+"""Scan whole blocks for the transactions sent to an address.
+
+Failed transactions do not emit events, so scanning the blocks is the only way to find all of
+them, not just the ones whose hash is already known from a log.
+"""
+import asyncio
+
+import numpy as np
+
+import profiling
+import rpc
+
+
+# number of full blocks requested (and held in memory) at once by each shard
+CHUNK_SIZE = 100
+# number of block ranges scanned at the same time
+SHARDS = 8
+
+
+def shard_ranges(from_block, to_block, shards=SHARDS):
+    """Split a block range into at most `shards` consecutive ranges of about the same size."""
+    n_blocks = to_block - from_block + 1
+    if n_blocks <= 0:
+        return []
+    bounds = np.linspace(from_block, to_block + 1, min(shards, n_blocks) + 1).astype(np.int64)
+    return [(int(start), int(end) - 1) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def full_block_calls(from_block, to_block):
+    return [('eth_getBlockByNumber', [hex(block_number), True])
+            for block_number in range(from_block, to_block + 1)]
+
+
+def filter_transactions(blocks, address):
+    """Get the transactions in the blocks sent to `address`, formatted like fetched ones."""
+    txs = [tx for block in blocks if block is not None for tx in block['transactions']]
+    if not txs:
+        return []
+    # contract creations have no recipient
+    recipients = np.array([tx['to'] or '' for tx in txs])
+    matches = np.flatnonzero(np.char.lower(recipients) == address.lower())
+    return [rpc.format_result(txs[i]) for i in matches]
+
+
+async def scan_shard(client, address, from_block, to_block, chunk_size=CHUNK_SIZE):
+    txs = []
+    receipts = []
+    for start in range(from_block, to_block + 1, chunk_size):
+        end = min(start + chunk_size - 1, to_block)
+        blocks = await client.batch_call(full_block_calls(start, end))
+        matches = filter_transactions(blocks, address)
+        if matches:
+            receipts.extend(await client.batch_call([('eth_getTransactionReceipt', [tx['hash']])
+                                                     for tx in matches]))
+        txs.extend(matches)
+    return txs, receipts
+
+
+@profiling.timed()
+async def scan_transactions(client, address, from_block, to_block, shards=SHARDS,
+                            chunk_size=CHUNK_SIZE):
+    """Get all transactions to `address` in a block range and their receipts, in block order.
+
+    The range is split into `shards` parts which are scanned concurrently by `client`. Only the
+    receipts of matching transactions are requested.
+    """
+    results = await asyncio.gather(*[
+        scan_shard(client, address, start, end, chunk_size)
+        for start, end in shard_ranges(from_block, to_block, shards)
+    ])
+    txs = [tx for shard_txs, _ in results for tx in shard_txs]
+    receipts = [receipt for _, shard_receipts in results for receipt in shard_receipts]
+    return txs, receipts
@@ -0,0 +1,157 @@
+"""Persistent index of block timestamps shared by all fetch runs and auctions.
+
+The timestamps are stored in a memory mapped array indexed by block number, with 0 for blocks
+that have not been fetched yet.
+"""
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+import rpc
+import store
+
+
+BLOCK_TIMES_FILENAME = 'block_times.npy'
+# seconds since epoch fit into 32 bits until 2106
+DTYPE = np.uint32
+# the array grows in steps of this many blocks
+GROWTH = 1 << 16
+
+
+def block_call(block_number):
+    return ('eth_getBlockByNumber', [hex(int(block_number)), False])
+
+
+class BlockTimes:
+    """Block number to timestamp index, filled lazily from the node.
+
+    Only timestamps of blocks not after `finalized_block` are stored, so that reorgs can not
+    leave wrong timestamps behind. Others are fetched again when needed.
+    """
+
+    def __init__(self, path=None, finalized_block=None):
+        self.path = path or os.path.join(store.DATA_DIR, BLOCK_TIMES_FILENAME)
+        self.finalized_block = finalized_block
+        self.times = np.zeros(0, DTYPE)
+        self._inode = None
+        self._reload()
+
+    def _reload(self):
+        """Map the file again if another process replaced it with a larger one."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if inode != self._inode:
+            self.times = np.load(self.path, mmap_mode='r+')
+            self._inode = inode
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the index, taken by every process writing to it.
+
+        Writes go to the mapped file directly, so with the lock held and the file mapped again,
+        no process writes to a file that has been replaced.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _grow(self, size):
+        # only called with the lock held, after mapping the current file
+        size = -(-size // GROWTH) * GROWTH
+        fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(self.path) or '.')
+        os.close(fd)
+        try:
+            times = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=DTYPE, shape=(size,))
+            times[:len(self.times)] = self.times
+            times.flush()
+            del times
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._reload()
+
+    def lookup(self, block_numbers):
+        """Get the stored timestamps of the blocks, 0 for the ones not stored."""
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        result = np.zeros(len(block_numbers), np.int64)
+        known = block_numbers < len(self.times)
+        result[known] = self.times[block_numbers[known]]
+        return result
+
+    def lookup_range(self, from_block, to_block):
+        return self.lookup(np.arange(from_block, to_block + 1))
+
+    def missing(self, block_numbers):
+        """Get the distinct block numbers whose timestamps are not stored."""
+        block_numbers = np.unique(np.asarray(block_numbers, dtype=np.int64))
+        return block_numbers[self.lookup(block_numbers) == 0]
+
+    def update(self, block_numbers, timestamps):
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        final = (block_numbers <= self.finalized_block if self.finalized_block is not None
+                 else np.zeros(len(block_numbers), bool))
+        if not final.any():
+            return
+        block_numbers = block_numbers[final]
+        with self._locked():
+            self._reload()
+            if block_numbers.max() >= len(self.times):
+                self._grow(int(block_numbers.max()) + 1)
+            self.times[block_numbers] = timestamps[final]
+            self.times.flush()
+
+    def _resolve(self, block_numbers, blocks, missing):
+        fetched = np.array([block['timestamp'] for block in blocks], dtype=np.int64)
+        self.update(missing, fetched)
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        timestamps = self.lookup(block_numbers)
+        # also covers the blocks that were fetched but are too recent to be stored
+        positions = np.searchsorted(missing, block_numbers)
+        is_missing = positions < len(missing)
+        is_missing[is_missing] = missing[positions[is_missing]] == block_numbers[is_missing]
+        timestamps[is_missing] = fetched[positions[is_missing]]
+        return timestamps
+
+    def fill(self, block_numbers, batch_size=rpc.BATCH_SIZE):
+        """Get the timestamps of the blocks, fetching only the ones not stored yet."""
+        missing = self.missing(block_numbers)
+        blocks = rpc.batch_call([block_call(n) for n in missing], batch_size)
+        return self._resolve(block_numbers, blocks, missing)
+
+    async def fill_async(self, client, block_numbers):
+        """Like `fill`, but fetching the missing blocks with an `async_rpc.AsyncClient`."""
+        missing = self.missing(block_numbers)
+        blocks = await client.batch_call([block_call(n) for n in missing])
+        return self._resolve(block_numbers, blocks, missing)
+
+    def estimate(self, block_numbers):
+        """Get the timestamps of the blocks, interpolating the ones not stored.
+
+        Outside of the stored range, the timestamps are extrapolated with the average block time
+        of the stored range. This is meant for quick previews only.
+        """
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        known = np.flatnonzero(self.times)
+        if len(known) == 0:
+            raise ValueError('no block timestamps stored yet')
+        known_times = self.times[known].astype(np.float64)
+        estimate = np.interp(block_numbers, known, known_times)
+        if len(known) > 1:
+            block_time = (known_times[-1] - known_times[0]) / (known[-1] - known[0])
+            before = block_numbers < known[0]
+            after = block_numbers > known[-1]
+            estimate[before] = known_times[0] - (known[0] - block_numbers[before]) * block_time
+            estimate[after] = known_times[-1] + (block_numbers[after] - known[-1]) * block_time
+        timestamps = self.lookup(block_numbers)
+        return np.where(timestamps > 0, timestamps, np.round(estimate).astype(np.int64))
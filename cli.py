@@ -0,0 +1,59 @@
+"""Single entry point for the common tasks: `python cli.py summary|plot|fetch`.
+
+Each subcommand imports its modules only when it runs. `summary` reads the snapshot written by
+fetch.py and returns within milliseconds, which makes it cheap to poll from monitoring scripts.
+`plot` and `fetch` take the arguments of render.py and fetch.py (see `python cli.py plot --help`),
+`plot` importing only the plotting library of the requested figures.
+"""
+import argparse
+import json
+
+# only uses the standard library
+import summary
+
+
+def run_summary(args, extra_args):
+    if extra_args:
+        raise SystemExit('unrecognized arguments: {}'.format(' '.join(extra_args)))
+    snapshot = summary.load(summary.auction_data_dir(args.auction))
+    if args.json:
+        snapshot = {key: value for key, value in snapshot.items() if key != 'sources'}
+        print(json.dumps(snapshot))
+    else:
+        print(summary.format_summary(snapshot))
+
+
+def run_plot(args, extra_args):
+    import render
+    render.main(extra_args)
+
+
+def run_fetch(args, extra_args):
+    import fetch
+    fetch.main(extra_args)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch, summarize and plot auctions.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    summary_parser = subparsers.add_parser('summary', help='print the auction statistics')
+    summary_parser.set_defaults(run=run_summary)
+    summary_parser.add_argument('--auction', default=summary.DEFAULT_AUCTION,
+                                help='name of the auction in the registry')
+    summary_parser.add_argument('--json', action='store_true', help='print the statistics as JSON')
+
+    # the other subcommands leave their arguments, including --help, to the scripts they run
+    plot_parser = subparsers.add_parser('plot', add_help=False,
+                                        help='render figures, takes the arguments of render.py')
+    plot_parser.set_defaults(run=run_plot)
+    fetch_parser = subparsers.add_parser('fetch', add_help=False,
+                                         help='fetch auctions, takes the arguments of fetch.py')
+    fetch_parser.set_defaults(run=run_fetch)
+    return parser.parse_known_args(argv)
+
+
+if __name__ == '__main__':
+    args, extra_args = parse_args()
+    args.run(args, extra_args)
@@ -0,0 +1,50 @@
+"""Compare the auctions in the registry.
+
+Run with `python compare.py` after fetching the auctions with `python fetch.py --all`.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import aggregates
+import auctions
+import store
+from concentration import Concentration
+
+
+
+def auction_metrics(auction, kyc_limit=auctions.KYC_LIMIT):
+    data_dir = auctions.data_dir(auction)
+    bidders = aggregates.load_bidders(data_dir)
+    concentration = Concentration.from_totals(bidders['amount'])
+    return {
+        'auction': auction.name,
+        'total_raised': bidders['amount'].sum(),
+        'bids': int(bidders['n_bids'].sum()),
+        'unique_participants': len(bidders),
+        'above_kyc_limit': int((bidders['amount'] > kyc_limit).sum()),
+        'gini': concentration.gini(),
+        'top_10_percent_share': concentration.top_share(0.1),
+        'duration_days': bidders['last_bid'].max() / (24 * 60 * 60),
+    }
+
+
+def compare(auction_list, processes=None):
+    """Compute the metrics of each auction in a separate process, one row per auction."""
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        rows = list(executor.map(auction_metrics, auction_list))
+    return pd.DataFrame(rows).set_index('auction')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the fetched auctions.')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of auctions to process at the same time')
+    args = parser.parse_args()
+    fetched = [auction for auction in auctions.load_registry()
+               if store.exists(auctions.data_dir(auction))]
+    if not fetched:
+        raise SystemExit('no auction has been fetched yet')
+    with pd.option_context('display.width', None, 'display.max_columns', None):
+        print(compare(fetched, args.processes))
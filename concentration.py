@@ -0,0 +1,223 @@
+from operator import mul
+
+import numpy as np
+
+
+# amounts are stored as integer multiples of this unit
+UNIT = 1e-9  # 1 GWei in ETH
+# keys are in [0, 2**KEY_BITS), enough for 1e9 ETH per bidder at 1 GWei resolution
+KEY_BITS = 60
+
+
+class Concentration:
+    """Per bidder totals supporting updates and concentration queries in logarithmic time.
+
+    Two Fenwick trees over the integer amount keys hold the number of bidders and the sum of
+    their totals per key, so counts and sums of all bidders below a threshold and order
+    statistics can be queried in O(KEY_BITS). They are stored sparsely in dicts. The sum of the
+    absolute differences of all pairs of totals is updated along with them, which makes the Gini
+    index available in O(1).
+
+    Built with `from_totals`, the totals are kept as sorted keys with prefix sums instead, which
+    answer the same queries by binary search. The trees are built from them on the first update.
+    """
+
+    def __init__(self, unit=UNIT, key_bits=KEY_BITS):
+        self.unit = unit
+        self.size = 1 << key_bits
+        self.counts = {}
+        self.sums = {}
+        self.totals = {}
+        self.n = 0
+        self.total = 0
+        # sum of |x_i - x_j| over all pairs i < j
+        self.pair_differences = 0
+        # sorted keys and their prefix sums until the trees are built
+        self.sorted_keys = None
+        self.prefix_sums = None
+
+    @classmethod
+    def from_totals(cls, totals, **kwargs):
+        """Build from a mapping or series of bidder totals.
+
+        The keys are sorted once and the pair differences computed from them with NumPy, instead
+        of inserting the bidders one by one.
+        """
+        concentration = cls(**kwargs)
+        bidders = list(totals.keys())
+        amounts = totals.to_numpy() if hasattr(totals, 'to_numpy') else list(totals.values())
+        keys = np.rint(np.asarray(amounts, dtype=np.float64) / concentration.unit)
+        keys = keys.astype(np.int64)
+        sorted_keys = np.sort(keys)
+        total = sum(sorted_keys.tolist())
+        if total >= 1 << 63 or len(set(bidders)) < len(bidders):
+            # the tree sums would overflow int64, or totals of a bidder would replace each other
+            for bidder, amount in zip(bidders, amounts):
+                concentration.set(bidder, amount)
+            return concentration
+
+        concentration.totals = dict(zip(bidders, keys.tolist()))
+        concentration.n = len(bidders)
+        concentration.total = total
+        n = concentration.n
+        # with x ascending, sum of |x_i - x_j| over i < j is the sum of (2i - n - 1) x_i
+        concentration.pair_differences = sum(map(mul, range(1 - n, n, 2), sorted_keys.tolist()))
+        concentration.sorted_keys = sorted_keys
+        concentration.prefix_sums = np.concatenate([[0], np.cumsum(sorted_keys)])
+        return concentration
+
+    def _build_trees(self):
+        """Fill the trees from the sorted keys, one level of parent nodes at a time."""
+        sorted_keys = self.sorted_keys
+        self.sorted_keys = self.prefix_sums = None
+        if len(sorted_keys) == 0:
+            return
+        nodes, first = np.unique(sorted_keys + 1, return_index=True)
+        counts = np.diff(np.append(first, len(sorted_keys)))
+        sums = counts * (nodes - 1)
+        all_nodes, all_counts, all_sums = [], [], []
+        while len(nodes):
+            all_nodes.append(nodes)
+            all_counts.append(counts)
+            all_sums.append(sums)
+            parents = nodes + (nodes & -nodes)
+            inside = parents <= self.size
+            nodes, counts, sums = _sum_by_node(parents[inside], counts[inside], sums[inside])
+        nodes, counts, sums = _sum_by_node(np.concatenate(all_nodes), np.concatenate(all_counts),
+                                           np.concatenate(all_sums))
+        nodes = nodes.tolist()
+        self.counts = dict(zip(nodes, counts.tolist()))
+        self.sums = dict(zip(nodes, sums.tolist()))
+
+    def to_key(self, amount):
+        return int(round(amount / self.unit))
+
+    def to_amount(self, key):
+        return key * self.unit
+
+    def _update_tree(self, key, count):
+        i = key + 1
+        while i <= self.size:
+            self.counts[i] = self.counts.get(i, 0) + count
+            self.sums[i] = self.sums.get(i, 0) + count * key
+            i += i & -i
+
+    def _prefix(self, key):
+        """Number and sum of the keys not larger than `key`."""
+        if self.sorted_keys is not None:
+            count = int(np.searchsorted(self.sorted_keys, key, side='right'))
+            return count, int(self.prefix_sums[count])
+        count = 0
+        total = 0
+        i = min(key + 1, self.size)
+        while i > 0:
+            count += self.counts.get(i, 0)
+            total += self.sums.get(i, 0)
+            i -= i & -i
+        return count, total
+
+    def _differences(self, key):
+        """Sum of |key - x| over all stored keys x."""
+        count_below, sum_below = self._prefix(key)
+        count_above = self.n - count_below
+        sum_above = self.total - sum_below
+        return key * count_below - sum_below + sum_above - key * count_above
+
+    def _insert(self, key):
+        self.pair_differences += self._differences(key)
+        self._update_tree(key, 1)
+        self.n += 1
+        self.total += key
+
+    def _remove(self, key):
+        self._update_tree(key, -1)
+        self.n -= 1
+        self.total -= key
+        self.pair_differences -= self._differences(key)
+
+    def set(self, bidder, amount):
+        """Set the total of a bidder."""
+        if self.sorted_keys is not None:
+            self._build_trees()
+        if bidder in self.totals:
+            self._remove(self.totals[bidder])
+        key = self.to_key(amount)
+        self.totals[bidder] = key
+        self._insert(key)
+
+    def add(self, bidder, amount):
+        """Add an amount to the total of a bidder."""
+        self.set(bidder, self.to_amount(self.totals.get(bidder, 0)) + amount)
+
+    def get(self, bidder):
+        return self.to_amount(self.totals.get(bidder, 0))
+
+    def total_amount(self):
+        return self.to_amount(self.total)
+
+    def gini(self):
+        if self.n == 0 or self.total == 0:
+            return 0.0
+        return self.pair_differences / (self.n * self.total)
+
+    def count_below(self, threshold):
+        """Number of bidders with a total not larger than `threshold`."""
+        count, _ = self._prefix(self.to_key(threshold))
+        return count
+
+    def count_above(self, threshold):
+        """Number of bidders with a total larger than `threshold`."""
+        return self.n - self.count_below(threshold)
+
+    def share_below(self, threshold):
+        """Share of the total contributed by bidders with totals not larger than `threshold`."""
+        if self.total == 0:
+            return 0.0
+        _, total = self._prefix(self.to_key(threshold))
+        return total / self.total
+
+    def _smallest_sum(self, m):
+        """Sum of the `m` smallest keys."""
+        if self.sorted_keys is not None:
+            return int(self.prefix_sums[m])
+        position = 0
+        remaining = m
+        total = 0
+        step = self.size
+        while step > 0:
+            next_position = position + step
+            if next_position <= self.size and self.counts.get(next_position, 0) < remaining:
+                position = next_position
+                remaining -= self.counts.get(next_position, 0)
+                total += self.sums.get(next_position, 0)
+            step >>= 1
+        # the remaining keys equal the m-th smallest key, which is at index position + 1
+        return total + remaining * position
+
+    def top_share(self, fraction):
+        """Share of the total contributed by the `fraction` of bidders with the largest totals."""
+        k = int(round(self.n * fraction))
+        if self.total == 0 or k == 0:
+            return 0.0
+        return (self.total - self._smallest_sum(self.n - k)) / self.total
+
+    def lorenz_curve(self):
+        """Fraction of bidders and cumulative share of the total, ordered by total."""
+        if self.sorted_keys is not None:
+            keys = self.sorted_keys.astype(np.float64)
+        else:
+            keys = np.sort(np.fromiter(self.totals.values(), dtype=np.float64, count=self.n))
+        x = np.arange(self.n) / self.n
+        y = np.cumsum(keys) / self.total
+        return x, y
+
+
+def _sum_by_node(nodes, counts, sums):
+    """Sort by node and add up the counts and sums of equal nodes."""
+    if len(nodes) == 0:
+        return nodes, counts, sums
+    order = np.argsort(nodes, kind='stable')
+    nodes = nodes[order]
+    starts = np.flatnonzero(np.append(True, nodes[1:] != nodes[:-1]))
+    return (nodes[starts], np.add.reduceat(counts[order], starts),
+            np.add.reduceat(sums[order], starts))
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def bin_counts(times, bin_size=60, n_bins=0):
+    """Count the events in consecutive time bins starting at 0."""
+    bins = (np.asarray(times) // bin_size).astype(np.int64)
+    return np.bincount(bins, minlength=n_bins)
+
+
+def autocorrelation(counts, max_lag, min_lag=1, window=None, normalize=False):
+    """Autocorrelation `gamma[tau] = sum(counts[t] * counts[t + tau] for t < window)`.
+
+    `counts` can be a 1D array or a 2D array with one series per row, in which case `window` can
+    be given per row. By default, the window is chosen such that the same bins are summed over for
+    all lags (`len(counts) - max_lag`). With `normalize`, gamma is divided by its value at lag 0.
+    Returns the lags from `min_lag` to `max_lag` and gamma for each of them.
+    """
+    counts = np.asarray(counts)
+    single = counts.ndim == 1
+    series = np.atleast_2d(counts).astype(np.float64)
+    n = series.shape[1]
+    if window is None:
+        window = n - max_lag
+    windows = np.clip(np.broadcast_to(window, series.shape[:1]), 0, n)
+    truncated = np.where(np.arange(n) < windows[:, None], series, 0)
+
+    # correlate via FFT, zero padded to avoid wrap around
+    size = 1 << int(2 * n - 1).bit_length()
+    spectrum = np.conj(np.fft.rfft(truncated, size)) * np.fft.rfft(series, size)
+    gamma = np.fft.irfft(spectrum, size)[:, :max_lag + 1]
+
+    if normalize:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gamma = gamma / gamma[:, :1]
+    elif np.issubdtype(counts.dtype, np.integer):
+        gamma = np.rint(gamma)
+
+    lags = np.arange(min_lag, max_lag + 1)
+    gamma = gamma[:, lags]
+    return lags, gamma[0] if single else gamma
+
+
+def segment_autocorrelation(times, segments, bin_size=60, max_lag=119, min_lag=1,
+                            normalize=False):
+    """Autocorrelation of the event counts of several segments of a series in one pass.
+
+    `segments` is a list of boolean masks selecting the events of each segment. Each segment is
+    binned from time 0 up to its last event and uses its own summation window.
+    """
+    times = np.asarray(times)
+    segment_times = [times[np.asarray(mask)] for mask in segments]
+    lengths = np.array([int(t.max() // bin_size) + 1 if len(t) else 0 for t in segment_times])
+    n_bins = max(lengths.max(), max_lag + 1)
+    counts = np.stack([bin_counts(t, bin_size, n_bins) for t in segment_times])
+    return autocorrelation(counts, max_lag, min_lag, lengths - max_lag, normalize)
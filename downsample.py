@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def as_float(values):
+    """Convert numbers or datetimes to a float array."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_points):
+    """Select `n_points` points of a line with the Largest-Triangle-Three-Buckets algorithm."""
+    n = len(x)
+    if n_points >= n or n_points < 3:
+        return np.arange(n)
+    x = as_float(x)
+    y = as_float(y)
+
+    # first and last point are always kept, the rest is split into n_points - 2 buckets
+    edges = np.linspace(1, n - 1, n_points - 1).astype(np.int64)
+    indices = np.empty(n_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for i in range(n_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        # twice the area of the triangle of the last selected, the candidate and the next point
+        area = np.abs((x[selected] - next_x) * (y[start:end] - y[selected]) -
+                      (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[i + 1] = selected
+    return indices
+
+
+def minmax_indices(y, n_points):
+    """Select the minimum and maximum of `n_points // 2` equally sized buckets of a line."""
+    n = len(y)
+    if n_points >= n or n_points < 2:
+        return np.arange(n)
+    y = as_float(y)
+    edges = np.linspace(0, n, n_points // 2 + 1).astype(np.int64)
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = y[start:end]
+        indices.extend([start + np.argmin(bucket), start + np.argmax(bucket)])
+    return np.unique(indices)
+
+
+def line_indices(x, y, n_points, method='lttb'):
+    if method == 'lttb':
+        return lttb_indices(x, y, n_points)
+    elif method == 'minmax':
+        return minmax_indices(y, n_points)
+    raise ValueError('unknown downsampling method {}'.format(method))
+
+
+def scatter_indices(x, y, n_points, n_extremes=100, log_y=False):
+    """Select at most `n_points` points of a scatter plot preserving its density and extremes.
+
+    The plane is divided into a grid of about `n_points - n_extremes` cells of which only the
+    point with the largest y is kept. The `n_extremes` points with the largest y are always kept.
+    """
+    n = len(x)
+    if n_points >= n:
+        return np.arange(n)
+    x = as_float(x)
+    y = as_float(y)
+    n_extremes = min(n_extremes, n_points)
+    extremes = np.argsort(y)[n - n_extremes:]
+
+    grid_y = np.log10(np.maximum(y, np.finfo(float).tiny)) if log_y else y
+    n_cells = max(int(np.sqrt(n_points - n_extremes)), 1)
+    x_cell = np.minimum(((x - x.min()) / (np.ptp(x) or 1) * n_cells).astype(np.int64),
+                        n_cells - 1)
+    y_cell = np.minimum(((grid_y - grid_y.min()) / (np.ptp(grid_y) or 1) * n_cells)
+                        .astype(np.int64), n_cells - 1)
+    cell = x_cell * n_cells + y_cell
+    # order by cell and descending y, the first point per cell is the largest one
+    order = np.lexsort((-y, cell))
+    _, first = np.unique(cell[order], return_index=True)
+    representatives = order[first]
+    return np.union1d(representatives, extremes)
@@ -0,0 +1,263 @@
+"""Price curve of the Dutch auction contract and simulations of auctions with other parameters.
+
+The contract lowers the price per token over time as
+
+    price = price_start * (1 + elapsed) / (1 + elapsed + elapsed**price_exponent / price_constant)
+
+with `elapsed` the seconds since the start. The auction ends as soon as the funds received pay
+for all tokens auctioned at the current price, which is then the final price paid by everyone.
+
+Run with `python dutch_auction.py` to replay the bids of the RDN auction against its parameters,
+and with e.g. `--price-exponent 2 3 4 --time-shift -24 0 24` to sweep over other parameters and
+bids placed earlier or later (in hours). The parameters are read from the contract by fetch.py.
+`--bids-output` writes the price at each bid and the tokens it bought to a CSV file.
+"""
+import argparse
+import itertools
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import auctions
+import store
+
+
+WEI_PER_ETHER = 10**18
+
+Parameters = namedtuple('Parameters', ['price_start', 'price_constant', 'price_exponent',
+                                       'token_multiplier', 'num_tokens_auctioned'])
+
+# parameters of the price function, and how the bids are moved in time, varied by `sweep`
+SWEEP_PARAMETERS = ['price_start', 'price_constant', 'price_exponent', 'time_shift', 'time_scale']
+# bids exceeding the missing funds by less than this share are accepted, as the prices computed
+# with floats differ from the contract's by rounding
+TOLERANCE = 1e-9
+# scenarios sent to a worker process at once
+CHUNK_SIZE = 16
+
+# bids of the sweep in the worker processes, sent once per process instead of once per scenario
+_bids = None
+
+
+def load_parameters(data_dir=store.DATA_DIR):
+    """Get the parameters of an auction and its final price in wei per token (0 if not ended)."""
+    with open(store.parameters_path(data_dir)) as f:
+        stored = json.load(f)
+    return Parameters(*(stored[name] for name in Parameters._fields)), stored['final_price']
+
+
+def price_exact(parameters, elapsed):
+    """Price in wei per token at a single time, with the integer arithmetic of the contract."""
+    elapsed = int(elapsed)
+    return (parameters.price_start * (1 + elapsed) //
+            (1 + elapsed + elapsed**parameters.price_exponent // parameters.price_constant))
+
+
+def price(parameters, elapsed):
+    """Price in wei per token at an array of times in seconds since the start.
+
+    Computed with floats, so the result differs from the contract's by rounding (relatively
+    about 1e-15 for the price and the final price).
+    """
+    elapsed = np.maximum(np.asarray(elapsed, dtype=np.float64), 0)
+    with np.errstate(over='ignore'):
+        decay = np.floor(elapsed**parameters.price_exponent / parameters.price_constant)
+    return parameters.price_start * (1 + elapsed) / (1 + elapsed + decay)
+
+
+def tokens_auctioned(parameters):
+    """Number of whole tokens auctioned."""
+    return parameters.num_tokens_auctioned / parameters.token_multiplier
+
+
+def funds_needed(parameters, elapsed):
+    """Funds in ETH ending the auction at the given times."""
+    return price(parameters, elapsed) * tokens_auctioned(parameters) / WEI_PER_ETHER
+
+
+def _end_time(parameters, received, after, before=None):
+    """Time between `after` and `before` at which the price drops to the funds received."""
+    low = float(after)
+    if before is None:
+        before = max(low, 1.0) * 2
+        while funds_needed(parameters, before) > received:
+            before *= 2
+    high = float(before)
+    for _ in range(64):
+        middle = (low + high) / 2
+        if funds_needed(parameters, middle) > received:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def simulate(parameters, times, amounts):
+    """Replay bids against an auction with the given parameters.
+
+    `times` are the bid times in seconds since the start in ascending order and `amounts` are in
+    ETH. As in the contract, a bid larger than the funds missing at its time reverts, and later
+    bids are still replayed. The auction ends as soon as the funds needed at the current price
+    are no more than the funds received, either with a bid paying exactly the missing funds or
+    when the price drops between two bids. Returns the accepted amount of each bid (0 if
+    rejected) and a summary with the end time, the funds received, the final price in wei per
+    token and the numbers of accepted and rejected bids.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    accepted = np.zeros(len(times), bool)
+    needed = funds_needed(parameters, times)
+    total = 0.0
+    end_time = None
+    start = 0
+    while start < len(times) and end_time is None:
+        # funds received before each bid if all bids from `start` on are accepted
+        before = total + np.cumsum(amounts[start:]) - amounts[start:]
+        reached = np.flatnonzero(amounts[start:] >= needed[start:] - before)
+        if len(reached) == 0:
+            accepted[start:] = True
+            total = float(before[-1] + amounts[-1])
+            break
+        stop = start + int(reached[0])
+        accepted[start:stop] = True
+        total = float(before[stop - start])
+        missing = needed[stop] - total
+        if missing <= 0:
+            # the price dropped to the funds received since the previous bid
+            end_time = _end_time(parameters, total, times[stop - 1] if stop > 0 else 0,
+                                 times[stop])
+        elif amounts[stop] <= missing * (1 + TOLERANCE):
+            accepted[stop] = True
+            total += amounts[stop]
+            end_time = times[stop]
+        start = stop + 1
+    if end_time is None and len(times) > 0:
+        # the price goes to 0 after the last bid, so the auction always ends
+        end_time = _end_time(parameters, total, times[-1])
+
+    n_accepted = int(accepted.sum())
+    summary = {
+        'end_time': float(end_time) if end_time is not None else None,
+        'received': float(total),
+        'final_price': (float(total * WEI_PER_ETHER / tokens_auctioned(parameters))
+                        if end_time is not None else None),
+        'accepted_bids': n_accepted,
+        # bids after the end are rejected as well
+        'rejected_bids': len(times) - n_accepted,
+    }
+    return np.where(accepted, amounts, 0.0), summary
+
+
+def bid_prices(parameters, bids):
+    """Price at each bid and the tokens it buys, given a dataframe with `time` and `amount`.
+
+    `tokens_at_bid` is the number of tokens a bid would buy if the auction ended at its time, a
+    lower bound of the tokens it gets. `tokens` are the tokens bought at the final price by the
+    accepted amount of the bid.
+    """
+    accepted, summary = simulate(parameters, bids['time'], bids['amount'])
+    bid_price = price(parameters, bids['time'])
+    return pd.DataFrame({
+        'price': bid_price / WEI_PER_ETHER,
+        'tokens_at_bid': bids['amount'].to_numpy() * WEI_PER_ETHER / bid_price,
+        'accepted': accepted,
+        'tokens': accepted * WEI_PER_ETHER / summary['final_price'],
+    }, index=bids.index)
+
+
+def move_bids(times, time_shift=0, time_scale=1):
+    """Bid times scaled and shifted by seconds, bids before the start are placed at the start."""
+    return np.maximum(np.asarray(times, dtype=np.float64) * time_scale + time_shift, 0)
+
+
+def scenarios(parameters, **values):
+    """All combinations of the given values of `SWEEP_PARAMETERS`, the others unchanged."""
+    defaults = dict(parameters._asdict(), time_shift=0, time_scale=1)
+    for name in values:
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError('cannot sweep over {}'.format(name))
+    names = list(values)
+    for combination in itertools.product(*(values[name] for name in names)):
+        yield dict(defaults, **dict(zip(names, combination)))
+
+
+def _set_bids(times, amounts):
+    global _bids
+    _bids = (times, amounts)
+
+
+def run_scenario(scenario):
+    times, amounts = _bids
+    parameters = Parameters(*(scenario[name] for name in Parameters._fields))
+    _, summary = simulate(parameters, move_bids(times, scenario['time_shift'],
+                                                scenario['time_scale']), amounts)
+    return dict(scenario, **summary)
+
+
+def sweep(parameters, times, amounts, processes=None, chunk_size=CHUNK_SIZE, **values):
+    """Simulate all combinations of the given parameter values in parallel, one row each.
+
+    For example `sweep(parameters, times, amounts, price_exponent=[2, 3], time_shift=[0, 3600])`
+    runs the four combinations, with the other parameters of `parameters`.
+    """
+    scenario_list = list(scenarios(parameters, **values))
+    times = np.asarray(times, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_set_bids,
+                             initargs=(times, amounts)) as executor:
+        rows = list(executor.map(run_scenario, scenario_list, chunksize=chunk_size))
+    return pd.DataFrame(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Simulate the auction with other parameters.')
+    parser.add_argument('--auction', default=auctions.DEFAULT_AUCTION,
+                        help='name of the auction in the registry')
+    parser.add_argument('--price-start', type=int, nargs='+', help='start prices in wei')
+    parser.add_argument('--price-constant', type=int, nargs='+')
+    parser.add_argument('--price-exponent', type=int, nargs='+')
+    parser.add_argument('--time-shift', type=float, nargs='+',
+                        help='hours to move all bids by')
+    parser.add_argument('--time-scale', type=float, nargs='+',
+                        help='factors to stretch the bid times by')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of scenarios to simulate at the same time')
+    parser.add_argument('--output', help='CSV file to write the results of a sweep to')
+    parser.add_argument('--bids-output',
+                        help='CSV file to write the price and tokens of each bid to')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    data_dir = auctions.data_dir(auctions.get_auction(args.auction))
+    parameters, final_price = load_parameters(data_dir)
+    bids = store.load_bids(['time', 'amount', 'sender', 'txhash'], data_dir)
+
+    _, summary = simulate(parameters, bids['time'], bids['amount'])
+    print('parameters: {}'.format(dict(parameters._asdict())))
+    print('simulated: {}'.format(summary))
+    if final_price:
+        print('final price of the contract: {} wei per token'.format(final_price))
+    if len(bids):
+        prices = bid_prices(parameters, bids)
+        print('tokens bought: {:.0f} of {:.0f}, {:.0f} at the prices of the bids'.format(
+            prices['tokens'].sum(), tokens_auctioned(parameters),
+            prices['tokens_at_bid'][prices['accepted'] > 0].sum()))
+        if args.bids_output:
+            bids[['txhash', 'sender', 'time', 'amount']].join(prices).to_csv(args.bids_output,
+                                                                             index=False)
+
+    values = {name: getattr(args, name) for name in SWEEP_PARAMETERS
+              if getattr(args, name) is not None}
+    if 'time_shift' in values:
+        values['time_shift'] = [hours * 60 * 60 for hours in values['time_shift']]
+    if values:
+        results = sweep(parameters, bids['time'], bids['amount'], args.processes, **values)
+        if args.output:
+            results.to_csv(args.output, index=False)
+        with pd.option_context('display.width', None, 'display.max_columns', None):
+            print(results)
@@ -0,0 +1,123 @@
+import binascii
+import itertools
+from operator import itemgetter
+
+import numpy as np
+from eth_utils import encode_hex, keccak
+
+
+def find_event(abi, name):
+    for item in abi:
+        if item['type'] == 'event' and item['name'] == name:
+            return item
+    raise ValueError('no event {} in abi'.format(name))
+
+
+def find_function(abi, name):
+    for item in abi:
+        if item['type'] == 'function' and item['name'] == name:
+            return item
+    raise ValueError('no function {} in abi'.format(name))
+
+
+def function_selector(function_abi):
+    signature = '{}({})'.format(function_abi['name'],
+                                ','.join(i['type'] for i in function_abi['inputs']))
+    return encode_hex(keccak(signature.encode())[:4])
+
+
+def event_signature(event_abi):
+    return '{}({})'.format(event_abi['name'], ','.join(i['type'] for i in event_abi['inputs']))
+
+
+def event_topic(event_abi):
+    return encode_hex(keccak(event_signature(event_abi).encode()))
+
+
+def _words(hex_strings, n_logs, n_strings, n_words):
+    """Convert hex strings of `n_words` 32 byte words each, `n_strings` per log, to an array of
+    shape (n_logs, n_strings * n_words, 32)."""
+    length = 2 + 64 * n_words
+    chars = np.frombuffer(''.join(hex_strings).encode('ascii'), dtype=np.uint8)
+    if chars.size != n_logs * n_strings * length:
+        raise ValueError('logs do not match the event')
+    # drop the 0x prefixes
+    digits = chars.reshape(n_logs * n_strings, length)[:, 2:]
+    raw = np.frombuffer(binascii.unhexlify(digits.tobytes()), dtype=np.uint8)
+    return raw.reshape(n_logs, n_strings * n_words, 32)
+
+
+def decode_words(words, abi_type):
+    """Decode an array of 32 byte words of shape (n, 32) into an array.
+
+    Addresses are returned as 20 byte `S20` values. Integers of up to 64 bits are returned as
+    int64 or uint64, wider ones as (n, 2) uint64 arrays of little endian 128 bit integers, the
+    layout of decimal128 values.
+    """
+    if abi_type == 'address':
+        return np.ascontiguousarray(words[:, 12:]).view('S20').ravel()
+    if abi_type == 'bool':
+        return words[:, 31] != 0
+    signed = abi_type.startswith('int')
+    bits = int(abi_type[3 if signed else 4:] or 256)
+    if bits <= 64:
+        values = np.ascontiguousarray(words[:, 24:]).view('>i8' if signed else '>u8').ravel()
+        return values.astype(np.int64 if signed else np.uint64)
+    # the upper half has to be the sign extension of the lower one
+    fill = np.where(words[:, 16] >= 0x80, 0xff, 0) if signed else 0
+    if not np.all(words[:, :16] == np.reshape(fill, (-1, 1))):
+        raise ValueError('{} values do not fit into 128 bits'.format(abi_type))
+    halves = np.ascontiguousarray(words[:, 16:]).view('>u8').astype(np.uint64)
+    return np.ascontiguousarray(halves[:, ::-1])
+
+
+def to_int(values, signed=False):
+    """Convert an array of 128 bit integers returned by `decode_words` to Python ints."""
+    high = values[:, 1].view(np.int64) if signed else values[:, 1]
+    return (high.astype(object) << 64) + values[:, 0].astype(object)
+
+
+def to_hex(values):
+    """Convert bytes to an object array of hex strings.
+
+    `values` is either a fixed width bytes array such as the `S20` and `S32` arrays returned by
+    `decode_logs`, keeping trailing zero bytes, or a sequence of bytes objects and None.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'S':
+        width = 2 * values.dtype.itemsize
+        hex_string = np.ascontiguousarray(values).tobytes().hex()
+        return np.array(['0x' + hex_string[i:i + width]
+                         for i in range(0, len(hex_string), width)], dtype=object)
+    return np.array([None if value is None else '0x' + value.hex() for value in values],
+                    dtype=object)
+
+
+def decode_logs(event_abi, logs):
+    """Decode the raw logs of an event with only static parameters into arrays.
+
+    Returns the arrays of the arguments by name (see `decode_words`) and of the `blockNumber`,
+    `logIndex` and `transactionHash` (as `S32`) of the logs. Each field is converted for all logs
+    at once instead of log by log.
+    """
+    n_logs = len(logs)
+    params = event_abi['inputs']
+    n_indexed = sum(1 for param in params if param['indexed'])
+    # all topics, including the event topic, and the data of each log have the same length
+    topics = _words(itertools.chain.from_iterable(map(itemgetter('topics'), logs)),
+                    n_logs, 1 + n_indexed, 1)[:, 1:]
+    data = _words(map(itemgetter('data'), logs), n_logs, 1, len(params) - n_indexed)
+    decoded = {}
+    topic_index = data_index = 0
+    for param in params:
+        if param['indexed']:
+            words = topics[:, topic_index]
+            topic_index += 1
+        else:
+            words = data[:, data_index]
+            data_index += 1
+        decoded[param['name']] = decode_words(words, param['type'])
+    decoded['blockNumber'] = np.fromiter(map(itemgetter('blockNumber'), logs), np.int64, n_logs)
+    decoded['logIndex'] = np.fromiter(map(itemgetter('logIndex'), logs), np.int64, n_logs)
+    hashes = _words(map(itemgetter('transactionHash'), logs), n_logs, 1, 1)
+    decoded['transactionHash'] = hashes.reshape(n_logs, 32).view('S32').ravel()
+    return decoded
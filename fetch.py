@@ -1,143 +1,371 @@
+import argparse
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import json
 import os
+import numpy as np
 import pandas as pd
-from web3 import Web3
-from eth_utils import from_wei, is_same_address
-from abis import auction_abi, wallet_abi
-from addresses import AUCTION_ADDRESS, WALLET_ADDRESS
+import pyarrow as pa
+from abis import auction_abi
+import async_rpc
+import auctions
+import block_scanner
+import block_times
+import events
+import log_scanner
+import profiling
+import rpc
+import rpc_cache
+import store
+import summary
 
 
-BID_OUTPUT_FILENAME = 'bids.csv'
-TX_OUTPUT_FILENAME = 'txs.csv'
-RECEIPT_OUTPUT_FILENAME = 'receipts.csv'
+CONFIRMATIONS = 12
 
-CONTRACT_CREATION_BLOCK = 4383437
+BID_EVENT = events.find_event(auction_abi, 'BidSubmission')
+START_EVENT = events.find_event(auction_abi, 'AuctionStarted')
+DEPLOYED_EVENT = events.find_event(auction_abi, 'Deployed')
+# price parameters not in the `Deployed` event, read with calls of the view functions
+VIEW_PARAMETERS = ['token_multiplier', 'num_tokens_auctioned', 'final_price']
 
 
-web3 = Web3(Web3.RPCProvider())
+def get_block_number(url=rpc.RPC_URL):
+    return int(rpc.call('eth_blockNumber', [], url), 16)
 
-auction_contract = web3.eth.contract(AUCTION_ADDRESS, abi=auction_abi)
-wallet_abi = web3.eth.contract(WALLET_ADDRESS, abi=wallet_abi)
 
+def scan_events(auction, event_abi, from_block, to_block, **scan_options):
+    """Get the arguments of all events of the given type as arrays, see `events.decode_logs`."""
+    logs = list(log_scanner.scan_logs(auction.address, [events.event_topic(event_abi)],
+                                      from_block, to_block, **scan_options))
+    return events.decode_logs(event_abi, logs)
 
-def fetch_bids():
-    """Get all bid events and return them as a dataframe."""
-    block_range = {'fromBlock': CONTRACT_CREATION_BLOCK}
-    # get bid events
-    log_filter = auction_contract.on('BidSubmission', block_range)
-    events = log_filter.get(only_changes=False)
-    df = pd.DataFrame({
-        'amount': [from_wei(event['args']['_amount'], 'ether') for event in events],
-        'missing': [from_wei(event['args']['_missing_funds'], 'ether') for event in events],
-        'sender': [event['args']['_sender'] for event in events],
-        'block': [event['blockNumber'] for event in events],
-        'txhash': [event['transactionHash'] for event in events]
+
+@profiling.timed()
+def fetch_bid_events(auction, from_block=None, to_block=None, url=rpc.RPC_URL, **scan_options):
+    """Get all bid events in a block range and return them as a dataframe (without bid times)."""
+    if from_block is None:
+        from_block = auction.creation_block
+    if to_block is None:
+        to_block = get_block_number(url)
+    logs = list(log_scanner.scan_logs(auction.address, [events.event_topic(BID_EVENT)],
+                                      from_block, to_block, url=url, **scan_options))
+    args = events.decode_logs(BID_EVENT, logs)
+    return pd.DataFrame({
+        'amount': events.to_int(args['_amount']),
+        'missing': events.to_int(args['_missing_funds']),
+        'sender': events.to_hex(args['_sender']),
+        'block': args['blockNumber'],
+        'txhash': events.to_hex(args['transactionHash']),
     })
 
-    # get start time of auction
-    log_filter = auction_contract.on('AuctionStarted', {'fromBlock': CONTRACT_CREATION_BLOCK})
-    start_events = log_filter.get(only_changes=False)
-    assert len(start_events) == 1
-    start_time = start_events[0]['args']['_start_time']
-    print(start_time)
-
-    # get bid times
-    blocks = df['block'].unique()
-    timestamps = []
-    for block_number in blocks:
-        block = web3.eth.getBlock(int(block_number))
-        timestamps.append(block['timestamp'] - start_time)
-    timestamp_df = pd.DataFrame({'block': blocks, 'time': timestamps})
-    merged = pd.merge(df, timestamp_df, on='block')
-
-    # sort by time and return
-    sorted = merged.sort_values('time')
-    return sorted
-
-
-def fetch_receipts(bids):
-    receipts = []
-    for txhash in bids['txhash']:
-        receipt = web3.eth.getTransactionReceipt(txhash)
-        receipts.append(receipt)
+
+@profiling.timed()
+def fetch_start_time(auction, to_block=None, url=rpc.RPC_URL):
+    """Get the start time of the auction."""
+    if to_block is None:
+        to_block = get_block_number(url)
+    args = scan_events(auction, START_EVENT, auction.creation_block, to_block, url=url)
+    assert len(args['blockNumber']) == 1
+    return int(events.to_int(args['_start_time'])[0])
+
+
+def call_views(auction, names, block, url=rpc.RPC_URL):
+    """Call view functions of the auction without arguments at a block, returning integers."""
+    calls = [('eth_call', [{'to': auction.address,
+                            'data': events.function_selector(events.find_function(auction_abi,
+                                                                                  name))},
+                           hex(block)])
+             for name in names]
+    return {name: int(result, 16) for name, result in zip(names, rpc.batch_call(calls, url=url))}
+
+
+@profiling.timed()
+def fetch_parameters(auction, block=None, url=rpc.RPC_URL):
+    """Get the parameters of the price function, the number of tokens and the final price.
+
+    The final price is 0 until the auction has ended, see `fetch_final_price`.
+    """
+    if block is None:
+        block = get_block_number(url)
+    # the constructor emits the event, so it is in the creation block
+    args = scan_events(auction, DEPLOYED_EVENT, auction.creation_block, auction.creation_block,
+                       url=url)
+    assert len(args['blockNumber']) == 1
+    parameters = {
+        'price_start': int(events.to_int(args['_price_start'])[0]),
+        'price_constant': int(events.to_int(args['_price_constant'])[0]),
+        'price_exponent': int(args['_price_exponent'][0]),
+    }
+    parameters.update(call_views(auction, VIEW_PARAMETERS, block, url))
+    return parameters
+
+
+def fetch_final_price(auction, block=None, url=rpc.RPC_URL):
+    if block is None:
+        block = get_block_number(url)
+    return call_views(auction, ['final_price'], block, url)['final_price']
+
+
+def receipt_calls(bids):
+    return [('eth_getTransactionReceipt', [txhash]) for txhash in bids['txhash']]
+
+
+def tx_calls(bids):
+    return [('eth_getTransactionByHash', [txhash]) for txhash in bids['txhash']]
+
+
+def add_bid_times(bids, timestamps, start_time):
+    """Add the time since auction start to each bid given its block timestamp, sort by it."""
+    bids = bids.assign(time=np.asarray(timestamps, dtype=np.int64) - start_time)
+    return bids.sort_values('time')
+
+
+def make_receipt_df(receipts):
+    if not receipts:
+        return pd.DataFrame()
     receipt_df = pd.DataFrame({key: [receipt[key]
                                for receipt in receipts] for key in receipts[0].keys()})
     receipt_df = receipt_df.set_index('transactionHash')
     return receipt_df
 
-def fetch_txs(bids):
-    txs = []
-    for txhash in bids['txhash']:
-        tx = dict(web3.eth.getTransaction(txhash))
-        tx['value'] = from_wei(tx['value'], 'ether')
-        txs.append(tx)
+
+def make_tx_df(txs):
+    if not txs:
+        return pd.DataFrame()
     tx_df = pd.DataFrame({key: [tx[key]
                           for tx in txs] for key in txs[0].keys()})
     tx_df = tx_df.set_index('hash')
     return tx_df
 
 
-# def fetch_txs(from_block, to_block):
-#     block_range = {'fromBlock': from_block, 'toBlock': to_block}
-#     block_numbers = range(from_block, to_block + 1)
-#     txs = []
-#     receipts = []
-#     for block_number in block_numbers:
-#         if (block_number - block_numbers[0]) % 10 == 0:
-#             print('fetching blocks {} + 10'.format(block_number))
-#         tx_count = web3.eth.getBlockTransactionCount(block_number)
-#         for i in range(tx_count):
-#             tx = dict(web3.eth.getTransactionFromBlock(block_number, i))
-#             if not tx['to'] or not is_same_address(tx['to'], AUCTION_ADDRESS):
-#                 continue
-#             tx['value'] = from_wei(tx['value'], 'ether')
-#             receipt = web3.eth.getTransactionReceipt(tx['hash'])
-#             txs.append(tx)
-#             receipts.append(receipt)
-#     tx_df = pd.DataFrame({key: [tx[key] for tx in txs] for key in txs[0].keys()})
-#     receipt_df = pd.DataFrame({key: [receipt[key]
-#                                for receipt in receipts] for key in receipts[0].keys()})
-#     return tx_df, receipt_df
+@profiling.timed()
+async def fetch_all(client, auction, from_block, to_block, start_time=None, block_index=None,
+                    scan_blocks=False, shards=block_scanner.SHARDS, **scan_options):
+    """Fetch bids, receipts and transactions, running the per-bid stages concurrently.
+
+    Returns the three dataframes and the start time of the auction, which is fetched if
+    `start_time` is not given.
+
+    Block timestamps are looked up in `block_index` (a `block_times.BlockTimes`), fetching only
+    the ones it does not know yet.
+
+    With `scan_blocks`, the transactions and receipts are those of all transactions to the
+    auction found by scanning the blocks, including failed bids that did not emit an event, and
+    those of bids sent through other contracts.
+    """
+    # the log scanner is synchronous, so run it in threads, querying the node of the client
+    loop = asyncio.get_event_loop()
+    bids_future = loop.run_in_executor(
+        None,
+        functools.partial(fetch_bid_events, auction, from_block, to_block, client.url,
+                          **scan_options)
+    )
+    if start_time is None:
+        bids, start_time = await asyncio.gather(
+            bids_future,
+            loop.run_in_executor(None, fetch_start_time, auction, to_block, client.url)
+        )
+    else:
+        bids = await bids_future
+    if block_index is None:
+        block_index = block_times.BlockTimes()
+    with profiling.stage('fetch_details'):
+        if scan_blocks:
+            timestamps, (txs, receipts) = await asyncio.gather(
+                block_index.fill_async(client, bids['block']),
+                block_scanner.scan_transactions(client, auction.address, from_block, to_block,
+                                                shards)
+            )
+            # bids sent through another contract are not transactions to the auction
+            scanned = {tx['hash'] for tx in txs}
+            missing = bids[~bids['txhash'].isin(scanned)].drop_duplicates('txhash')
+            if len(missing):
+                missing_receipts, missing_txs = await asyncio.gather(
+                    client.batch_call(receipt_calls(missing)),
+                    client.batch_call(tx_calls(missing))
+                )
+                txs = sorted(txs + missing_txs, key=lambda tx: tx['blockNumber'])
+                receipts = sorted(receipts + missing_receipts,
+                                  key=lambda receipt: receipt['blockNumber'])
+        else:
+            timestamps, receipts, txs = await asyncio.gather(
+                block_index.fill_async(client, bids['block']),
+                client.batch_call(receipt_calls(bids)),
+                client.batch_call(tx_calls(bids))
+            )
+    with profiling.stage('make_dataframes'):
+        return (add_bid_times(bids, timestamps, start_time), make_receipt_df(receipts),
+                make_tx_df(txs), start_time)
+
+
+def load_checkpoint(auction):
+    if not store.exists(auctions.data_dir(auction)):
+        return None
+    return auctions.load_checkpoint(auction)
+
+
+def save_checkpoint(auction, block, start_time):
+    checkpoint = {'block': block['number'], 'hash': block['hash'], 'start_time': start_time}
+    with open(store.checkpoint_path(auctions.data_dir(auction)), 'w') as f:
+        json.dump(checkpoint, f)
+
+
+def load_parameters(auction):
+    path = store.parameters_path(auctions.data_dir(auction))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_parameters(auction, parameters):
+    with open(store.parameters_path(auctions.data_dir(auction)), 'w') as f:
+        json.dump(parameters, f)
+
+
+@profiling.timed()
+def save_datasets(auction, bids, receipts, txs, checkpoint_block=None):
+    """Store the datasets, appending them to the stored ones up to `checkpoint_block` if given."""
+    data_dir = auctions.data_dir(auction)
+    for name, df in [(store.BIDS, bids), (store.RECEIPTS, receipts), (store.TXS, txs)]:
+        table = store.to_table(name, df)
+        if checkpoint_block is not None:
+            old = store.truncate(name, store.read_table(name, data_dir=data_dir),
+                                 checkpoint_block)
+            table = pa.concat_tables([old, table])
+        store.write(name, table, data_dir)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Fetch bids, transactions and receipts.')
+    parser.add_argument('--auction', dest='auctions', action='append',
+                        help='name of an auction in the registry (default: {})'.format(
+                            auctions.DEFAULT_AUCTION))
+    parser.add_argument('--all', action='store_true', help='fetch all auctions in the registry')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of auctions to fetch in parallel (default: number of cores)')
+    parser.add_argument('--url', default=rpc.RPC_URL, help='URL of the JSON-RPC endpoint')
+    parser.add_argument('--concurrency', type=int, default=async_rpc.CONCURRENCY,
+                        help='maximum number of requests in flight')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='maximum number of requests per second')
+    parser.add_argument('--batch-size', type=int, default=rpc.BATCH_SIZE,
+                        help='number of calls per JSON-RPC batch request')
+    parser.add_argument('--retries', type=int, default=rpc.RETRIES,
+                        help='number of retries for failed requests')
+    parser.add_argument('--chunk-size', type=int, default=log_scanner.INITIAL_CHUNK_SIZE,
+                        help='initial number of blocks per log query')
+    parser.add_argument('--scan-workers', type=int, default=1,
+                        help='number of log queries to run in parallel')
+    parser.add_argument('--scan-blocks', action='store_true',
+                        help='scan all blocks for transactions to the auction to include '
+                             'failed bids')
+    parser.add_argument('--shards', type=int, default=block_scanner.SHARDS,
+                        help='number of block ranges to scan in parallel with --scan-blocks')
+    parser.add_argument('--confirmations', type=int, default=CONFIRMATIONS,
+                        help='number of blocks after which a block is considered final')
+    parser.add_argument('--cache', default=rpc_cache.CACHE_FILENAME,
+                        help='file to cache finalized RPC results in')
+    parser.add_argument('--cache-size', type=int, default=rpc_cache.MAX_SIZE // 1024**2,
+                        help='maximum size of the cache in MB')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the RPC cache')
+    parser.add_argument('--full', action='store_true',
+                        help='ignore the checkpoint and fetch everything again')
+    parser.add_argument('--report', help='write timings, RPC counters and memory usage to this '
+                                         'JSON file')
+    parser.add_argument('--cprofile', metavar='DIR',
+                        help='write cProfile stats of each stage to this directory')
+    return parser.parse_args(args)
+
+
+async def fetch_auction(auction, args):
+    # the log scans, the start time and the parameters are fetched with synchronous requests,
+    # which share the rate limit of the client
+    rpc.set_throttle(rpc.Throttle(args.retries, rate_limit=args.rate_limit,
+                                  concurrency=args.concurrency))
+    client = async_rpc.AsyncClient(
+        args.url,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        batch_size=args.batch_size,
+        rate_limiter=rpc.throttle.rate_limiter
+    )
+    async with client:
+        head = int(await client.call('eth_blockNumber', []), 16)
+        if not args.no_cache:
+            rpc.set_cache(rpc_cache.RPCCache(args.cache, args.cache_size * 1024**2,
+                                             finalized_block=head - args.confirmations))
+
+        checkpoint = None if args.full else load_checkpoint(auction)
+        if checkpoint is not None:
+            block = await client.call('eth_getBlockByNumber', [hex(checkpoint['block']), False])
+            if block is None or block['hash'] != checkpoint['hash']:
+                print('checkpoint block {} is not canonical anymore'.format(checkpoint['block']))
+                checkpoint = None
+
+        if checkpoint is not None:
+            from_block = checkpoint['block'] + 1
+            start_time = checkpoint['start_time']
+        else:
+            from_block = auction.creation_block
+            start_time = None
+        print('{}: fetching bids between {} and {}'.format(auction.name, from_block, head))
+        block_index = block_times.BlockTimes(finalized_block=head - args.confirmations)
+        bids, receipts, txs, start_time = await fetch_all(client, auction, from_block, head,
+                                                          start_time, block_index=block_index,
+                                                          scan_blocks=args.scan_blocks,
+                                                          shards=args.shards,
+                                                          chunk_size=args.chunk_size,
+                                                          workers=args.scan_workers)
+        # everything after the checkpoint is unconfirmed and has just been fetched again
+        checkpoint_block = checkpoint['block'] if checkpoint is not None else None
+        save_datasets(auction, bids, receipts, txs, checkpoint_block)
+
+        confirmed_block_number = max(head - args.confirmations, from_block - 1)
+        confirmed_block = await client.call('eth_getBlockByNumber',
+                                            [hex(confirmed_block_number), False])
+        save_checkpoint(auction, confirmed_block, start_time)
+        parameters = None if args.full else load_parameters(auction)
+        # the constants are read once, the final price again until the auction has ended
+        if parameters is None:
+            save_parameters(auction, fetch_parameters(auction, head, args.url))
+        elif parameters['final_price'] == 0:
+            parameters['final_price'] = fetch_final_price(auction, head, args.url)
+            save_parameters(auction, parameters)
+        with profiling.stage('write_summary'):
+            summary.write(auctions.data_dir(auction), start_time)
+        print('{}: done'.format(auction.name))
+
+
+def run_fetch(auction, args):
+    """Fetch an auction, returning the recorded stages if profiling."""
+    if args.report or args.cprofile:
+        profiling.enable(args.cprofile)
+        profiling.reset()
+    asyncio.run(fetch_auction(auction, args))
+    return profiling.snapshot() if profiling.enabled else None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.report or args.cprofile:
+        profiling.enable(args.cprofile)
+    if args.all:
+        selected = auctions.load_registry()
+    else:
+        selected = [auctions.get_auction(name)
+                    for name in args.auctions or [auctions.DEFAULT_AUCTION]]
+    if len(selected) == 1:
+        run_fetch(selected[0], args)
+    else:
+        with ProcessPoolExecutor(args.processes) as executor:
+            for stages in executor.map(run_fetch, selected, [args] * len(selected)):
+                if stages is not None:
+                    profiling.merge(stages)
+    if args.report:
+        profiling.write_report(args.report)
 
 
 if __name__ == '__main__':
-    bids = fetch_bids()
-    receipts = fetch_receipts(bids)
-    txs = fetch_txs(bids)
-    bids.to_csv(BID_OUTPUT_FILENAME)
-    receipts.to_csv(RECEIPT_OUTPUT_FILENAME)
-    txs.to_csv(TX_OUTPUT_FILENAME)
-
-    # to_block = web3.eth.blockNumber
-
-    # if os.path.exists(BID_OUTPUT_FILENAME):
-    #     old_bids = pd.DataFrame.from_csv(BID_OUTPUT_FILENAME)
-    #     from_block = int(max(old_bids['block'] - 10))
-    # else:
-    #     old_bids = None
-    #     from_block = CONTRACT_CREATION_BLOCK
-    # print('fetching bids between {} and {}'.format(from_block, to_block))
-    # bids = fetch_bids(from_block, to_block)
-    # if old_bids is not None:
-    #     bids = pd.concat([old_bids, bids], ignore_index=True)
-
-    # if os.path.exists(TX_OUTPUT_FILENAME):
-    #     old_txs = pd.DataFrame.from_csv(TX_OUTPUT_FILENAME)
-    #     from_block = int(max(old_txs['blockNumber'] - 10))
-    # else:
-    #     old_txs = None
-    #     from_block = CONTRACT_CREATION_BLOCK
-    # if os.path.exists(RECEIPT_OUTPUT_FILENAME):
-    #     old_receipts = pd.DataFrame.from_csv(RECEIPT_OUTPUT_FILENAME)
-    #     from_block = min(from_block, int(max(old_receipts['blockNumber'] - 10)))
-    # else:
-    #     old_receipts = None
-    #     from_block = CONTRACT_CREATION_BLOCK
-    # print('fetching txs between {} and {}'.format(from_block, to_block))
-    # txs, receipts = fetch_txs(from_block, to_block)
-    # if old_txs is not None:
-    #     txs = pd.concat([old_txs, txs], ignore_index=True)
-    # if old_receipts is not None:
-    #     receipts = pd.concat([old_receipts, receipts], ignore_index=True)
-    # txs.to_csv(TX_OUTPUT_FILENAME)
-    # receipts.to_csv(RECEIPT_OUTPUT_FILENAME)
-    # print('done')
+    main()
@@ -0,0 +1,110 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import rpc
+
+
+INITIAL_CHUNK_SIZE = 10000
+MAX_CHUNK_SIZE = 1000000
+# chunks returning fewer logs than this are considered sparse and the chunk size is doubled
+SPARSE_LOG_COUNT = 1000
+
+# error messages of different node implementations if a query returns too much data
+TOO_MANY_RESULTS_MESSAGES = [
+    'query returned more than',
+    'too many',
+    'limit exceeded',
+    'response size',
+    'timeout',
+    'timed out',
+]
+
+
+def is_too_many_results(error):
+    """Check if an error indicates that a log query should be retried with a smaller range."""
+    if isinstance(error, requests.Timeout):
+        return True
+    if isinstance(error, rpc.RPCError):
+        message = str(error).lower()
+        return any(part in message for part in TOO_MANY_RESULTS_MESSAGES)
+    return False
+
+
+def get_logs(address, topics, from_block, to_block, url=rpc.RPC_URL):
+    log_filter = {
+        'address': address,
+        'topics': topics,
+        'fromBlock': hex(from_block),
+        'toBlock': hex(to_block)
+    }
+    # too many results are handled by splitting the range instead of retrying it
+    return rpc.call('eth_getLogs', [log_filter], url, retry_if=_should_retry)
+
+
+def _should_retry(error):
+    return rpc.is_transient(error) and not is_too_many_results(error)
+
+
+def scan_logs(address, topics, from_block, to_block, chunk_size=INITIAL_CHUNK_SIZE, workers=1,
+              url=rpc.RPC_URL):
+    """Generate all logs matching `address` and `topics` in a block range, in block order.
+
+    The range is queried in chunks. A chunk for which the node complains about too many results
+    is split in halves and the chunk size is reduced, chunks with only few logs make the chunk
+    size grow. With `workers > 1`, that many chunks are queried in parallel.
+    """
+    def get(start, end):
+        return get_logs(address, topics, start, end, url)
+
+    if workers > 1:
+        return _scan_parallel(get, from_block, to_block, chunk_size, workers)
+    else:
+        return _scan_serial(get, from_block, to_block, chunk_size)
+
+
+def _next_chunk_size(chunk_size, logs):
+    if len(logs) < SPARSE_LOG_COUNT:
+        return min(chunk_size * 2, MAX_CHUNK_SIZE)
+    return chunk_size
+
+
+def _scan_serial(get, from_block, to_block, chunk_size):
+    start = from_block
+    while start <= to_block:
+        end = min(start + chunk_size - 1, to_block)
+        try:
+            logs = get(start, end)
+        except (rpc.RPCError, requests.RequestException) as e:
+            if not is_too_many_results(e) or start == end:
+                raise
+            chunk_size = max((end - start + 1) // 2, 1)
+            continue
+        yield from logs
+        chunk_size = _next_chunk_size(chunk_size, logs)
+        start = end + 1
+
+
+def _scan_parallel(get, from_block, to_block, chunk_size, workers):
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        next_start = from_block
+        while pending or next_start <= to_block:
+            while len(pending) < workers and next_start <= to_block:
+                end = min(next_start + chunk_size - 1, to_block)
+                pending.append((next_start, end, executor.submit(get, next_start, end)))
+                next_start = end + 1
+
+            start, end, future = pending.popleft()
+            try:
+                logs = future.result()
+            except (rpc.RPCError, requests.RequestException) as e:
+                if not is_too_many_results(e) or start == end:
+                    raise
+                # rescan the failed chunk with smaller chunks before moving on to keep the order
+                chunk_size = max((end - start + 1) // 2, 1)
+                yield from _scan_serial(get, start, end, chunk_size)
+            else:
+                yield from logs
+                chunk_size = _next_chunk_size(chunk_size, logs)
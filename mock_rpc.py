@@ -0,0 +1,445 @@
+"""Local stand-in for an Ethereum node serving an auction dataset over JSON-RPC.
+
+Only the calls made by the fetchers are supported. Amounts have to be given in wei, as produced
+by fetch.py or `synthetic.generate`. Latency, errors and rate limits can be injected to test the
+throughput and retry behavior of the fetchers.
+
+Run with `python mock_rpc.py --synthetic 10000` or `python mock_rpc.py --auction rdn` to serve a
+fetched auction, then point the fetchers at `http://localhost:8545`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import auctions
+import events
+import store
+import synthetic
+from abis import auction_abi
+
+
+BID_TOPIC = events.event_topic(events.find_event(auction_abi, 'BidSubmission'))
+START_TOPIC = events.event_topic(events.find_event(auction_abi, 'AuctionStarted'))
+DEPLOYED_TOPIC = events.event_topic(events.find_event(auction_abi, 'Deployed'))
+
+BLOCK_TIME = 15  # seconds, for blocks without known timestamp
+# maximum number of logs returned by a single eth_getLogs call
+MAX_LOGS = 10000
+# number of blocks the chain extends after the last transaction
+TAIL_BLOCKS = 100
+PORT = 8545
+# runtime code given to senders made contracts with `contract_codes`
+CONTRACT_CODE = '0x6060604052600436106100'
+
+
+class MethodError(Exception):
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def word(value):
+    return '{:064x}'.format(value)
+
+
+def quantity(value):
+    return hex(int(value))
+
+
+def block_hash(block_number):
+    return '0x' + word(block_number)
+
+
+class MockChain:
+    """Blocks, transactions, receipts and bid logs of an auction, answering JSON-RPC calls."""
+
+    def __init__(self, bids, txs, receipts, auction_address, start_time, start_block,
+                 max_logs=MAX_LOGS, codes=None, parameters=None):
+        self.auction_address = auction_address.lower()
+        # runtime code of contract accounts by lower case address
+        self.codes = {address.lower(): code for address, code in (codes or {}).items()}
+        # auction parameters as stored by fetch.py, returned by the view functions of the same name
+        self.parameters = parameters or {}
+        self.selectors = {events.function_selector(events.find_function(auction_abi, name)): name
+                          for name in self.parameters}
+        self.start_time = start_time
+        self.start_block = start_block
+        self.max_logs = max_logs
+
+        bids = bids.sort_values('block', kind='stable')
+        self.bid_blocks = bids['block'].to_numpy()
+        # rows as dicts, which are much faster to access than dataframe rows
+        self.bids = bids.to_dict('records')
+        self.txs = txs.reset_index().to_dict('records')
+        self.receipts = {receipt['transactionHash']: receipt
+                         for receipt in receipts.reset_index().to_dict('records')}
+        self.tx_rows = {tx['hash']: i for i, tx in enumerate(self.txs)}
+        self.txs_by_block = txs.groupby('blockNumber').indices
+        self.timestamps = {int(block): start_time + int(time)
+                           for block, time in zip(bids['block'], bids['time'])}
+        last_block = max([start_block] + list(txs['blockNumber']) + list(self.bid_blocks))
+        self.head = int(last_block) + TAIL_BLOCKS
+
+    def handle(self, method, params):
+        handler = getattr(self, method, None)
+        if handler is None or not method.startswith('eth_'):
+            raise MethodError(-32601, 'the method {} does not exist'.format(method))
+        return handler(*params)
+
+    def eth_blockNumber(self):
+        return quantity(self.head)
+
+    def timestamp(self, block_number):
+        if block_number in self.timestamps:
+            return self.timestamps[block_number]
+        return self.start_time + (block_number - self.start_block) * BLOCK_TIME
+
+    def eth_getBlockByNumber(self, block_number, full_transactions=False):
+        block_number = self.head if block_number == 'latest' else int(block_number, 16)
+        if block_number > self.head:
+            return None
+        rows = self.txs_by_block.get(block_number, [])
+        if full_transactions:
+            transactions = [self.format_tx(i) for i in rows]
+        else:
+            transactions = [self.txs[i]['hash'] for i in rows]
+        return {
+            'number': quantity(block_number),
+            'hash': block_hash(block_number),
+            'parentHash': block_hash(block_number - 1),
+            'timestamp': quantity(self.timestamp(block_number)),
+            'transactions': transactions,
+        }
+
+    def format_tx(self, i):
+        tx = self.txs[i]
+        return {
+            'hash': tx['hash'],
+            'blockNumber': quantity(tx['blockNumber']),
+            'blockHash': block_hash(tx['blockNumber']),
+            'from': tx['from'],
+            'to': tx['to'],
+            'nonce': quantity(tx['nonce']),
+            'gas': quantity(tx['gas']),
+            'gasPrice': quantity(tx['gasPrice']),
+            'value': quantity(tx['value']),
+            'input': tx['input'],
+        }
+
+    def eth_getCode(self, address, block_number='latest'):
+        return self.codes.get(address.lower(), '0x')
+
+    def eth_call(self, call, block_number='latest'):
+        if call.get('to', '').lower() != self.auction_address:
+            return '0x'
+        name = self.selectors.get(call.get('data', '')[:10])
+        if name is None:
+            raise MethodError(-32000, 'execution reverted')
+        return '0x' + word(self.parameters[name])
+
+    def eth_getTransactionByHash(self, txhash):
+        i = self.tx_rows.get(txhash)
+        return None if i is None else self.format_tx(i)
+
+    def eth_getTransactionReceipt(self, txhash):
+        receipt = self.receipts.get(txhash)
+        if receipt is None:
+            return None
+        return {
+            'transactionHash': txhash,
+            'blockNumber': quantity(receipt['blockNumber']),
+            'blockHash': block_hash(receipt['blockNumber']),
+            'gasUsed': quantity(receipt['gasUsed']),
+            'cumulativeGasUsed': quantity(receipt['cumulativeGasUsed']),
+            'status': quantity(receipt['status']),
+        }
+
+    def eth_getLogs(self, log_filter):
+        from_block = int(log_filter.get('fromBlock', '0x0'), 16)
+        to_block = log_filter.get('toBlock', 'latest')
+        to_block = self.head if to_block == 'latest' else int(to_block, 16)
+        address = log_filter.get('address')
+        topics = log_filter.get('topics') or [None]
+        if address is not None and address.lower() != self.auction_address:
+            return []
+
+        logs = []
+        deployed_block = self.start_block - 1
+        if (self.parameters and topics[0] in (None, DEPLOYED_TOPIC) and
+                from_block <= deployed_block <= to_block):
+            logs.append(self.deployed_log())
+        if topics[0] in (None, START_TOPIC) and from_block <= self.start_block <= to_block:
+            logs.append(self.start_log())
+        if topics[0] in (None, BID_TOPIC):
+            start, end = np.searchsorted(self.bid_blocks, [from_block, to_block + 1])
+            if end - start + len(logs) > self.max_logs:
+                raise MethodError(-32005, 'query returned more than {} results'.format(
+                    self.max_logs))
+            logs.extend(self.bid_log(i) for i in range(start, end))
+        return logs
+
+    def deployed_log(self):
+        block_number = self.start_block - 1
+        return {
+            'address': self.auction_address,
+            'topics': [DEPLOYED_TOPIC] + ['0x' + word(self.parameters[name]) for name in
+                                          ['price_start', 'price_constant', 'price_exponent']],
+            'data': '0x',
+            'blockNumber': quantity(block_number),
+            'blockHash': block_hash(block_number),
+            'transactionHash': '0x' + word(1),
+            'logIndex': '0x0',
+            'removed': False,
+        }
+
+    def start_log(self):
+        return {
+            'address': self.auction_address,
+            'topics': [START_TOPIC, '0x' + word(self.start_time), '0x' + word(self.start_block)],
+            'data': '0x',
+            'blockNumber': quantity(self.start_block),
+            'blockHash': block_hash(self.start_block),
+            'transactionHash': '0x' + word(0),
+            'logIndex': '0x0',
+            'removed': False,
+        }
+
+    def bid_log(self, i):
+        bid = self.bids[i]
+        return {
+            'address': self.auction_address,
+            'topics': [BID_TOPIC, '0x' + word(int(bid['sender'], 16))],
+            'data': '0x' + word(int(bid['amount'])) + word(int(bid['missing'])),
+            'blockNumber': quantity(bid['block']),
+            'blockHash': block_hash(bid['block']),
+            'transactionHash': bid['txhash'],
+            'logIndex': '0x0',
+            'removed': False,
+        }
+
+
+def contract_codes(senders, contract_rate, seed=0):
+    """Make a random fraction of the senders contracts, for classification by bidder_types.py."""
+    random_state = np.random.RandomState(seed)
+    senders = pd.unique(np.asarray(senders))
+    contracts = senders[random_state.uniform(0, 1, len(senders)) < contract_rate]
+    return {address: CONTRACT_CODE for address in contracts}
+
+
+def load_dataset(data_dir):
+    """Read stored datasets in the format produced by fetch.py, with amounts in wei."""
+    frames = []
+    for name in [store.BIDS, store.TXS, store.RECEIPTS]:
+        table = store.read_table(name, data_dir=data_dir)
+        data = {}
+        for column_name in table.column_names:
+            column = table[column_name]
+            if column.type == store.WEI:
+                data[column_name] = [None if value is None else int(value)
+                                     for value in column.to_pylist()]
+            elif pa.types.is_fixed_size_binary(column.type) or pa.types.is_binary(column.type):
+                data[column_name] = events.to_hex(column.to_pylist())
+            else:
+                data[column_name] = column.to_numpy()
+        df = pd.DataFrame(data)
+        if name in store.INDEX_COLUMNS:
+            df = df.set_index(store.INDEX_COLUMNS[name])
+        frames.append(df)
+    return frames
+
+
+class Faults:
+    """Latency, errors and rate limits applied to the requests to the mock node.
+
+    Each request is delayed by `latency` seconds plus a random jitter of up to `jitter` seconds.
+    Requests fail with HTTP 503 with probability `http_error_rate`, and each call in a request
+    fails with a JSON-RPC error with probability `rpc_error_rate`. Requests exceeding `rate_limit`
+    per second are answered with HTTP 429.
+
+    The random decisions about a request are drawn from a generator seeded with `seed`, the
+    request body and the number of times the same body was sent before. As long as concurrent
+    requests differ, as they do with distinct call ids, the decisions are reproducible no matter
+    how the threads handling them are scheduled, and a retried request gets new ones. Rate
+    limiting depends on the timing of the requests and is not reproducible.
+    """
+
+    def __init__(self, latency=0, jitter=0, http_error_rate=0, rpc_error_rate=0,
+                 rate_limit=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.http_error_rate = http_error_rate
+        self.rpc_error_rate = rpc_error_rate
+        self.rate_limit = rate_limit
+        self.seed = seed
+        self.lock = threading.Lock()
+        # token bucket holding up to one second worth of requests
+        self.tokens = rate_limit
+        self.last_refill = time.monotonic()
+        self.stats = Counter()
+        self.attempts = Counter()
+
+    def request_random(self, body):
+        """Get the random generator for the decisions about a request with the given body."""
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            attempt = self.attempts[digest]
+            self.attempts[digest] += 1
+        return random.Random('{}:{}:{}'.format(self.seed, digest, attempt))
+
+    def delay(self, rng):
+        jitter = rng.uniform(0, self.jitter) if self.jitter else 0
+        return self.latency + jitter
+
+    def _take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit,
+                          self.tokens + (now - self.last_refill) * self.rate_limit)
+        self.last_refill = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def http_status(self, rng):
+        """Get the HTTP error status to answer a request with, if any."""
+        http_error = self.http_error_rate and rng.random() < self.http_error_rate
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.rate_limit is not None and not self._take_token():
+                self.stats['rate_limited'] += 1
+                return 429
+            if http_error:
+                self.stats['http_errors'] += 1
+                return 503
+        return None
+
+    def rpc_error(self, rng):
+        rpc_error = self.rpc_error_rate and rng.random() < self.rpc_error_rate
+        with self.lock:
+            self.stats['calls'] += 1
+            if rpc_error:
+                self.stats['rpc_errors'] += 1
+                return True
+        return False
+
+
+def make_handler(chain, faults=None):
+    faults = faults or Faults()
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def respond(self, request, rng):
+            response = {'jsonrpc': '2.0', 'id': request.get('id')}
+            try:
+                if faults.rpc_error(rng):
+                    raise MethodError(-32000, 'injected error')
+                response['result'] = chain.handle(request['method'], request.get('params', []))
+            except MethodError as e:
+                response['error'] = {'code': e.code, 'message': e.message}
+            return response
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            payload = json.loads(body)
+            rng = faults.request_random(body)
+            time.sleep(faults.delay(rng))
+            status = faults.http_status(rng)
+            if status is not None:
+                self.send_error(status)
+                return
+            if isinstance(payload, list):
+                result = [self.respond(request, rng) for request in payload]
+            else:
+                result = self.respond(payload, rng)
+            body = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+@contextmanager
+def serve(chain, port=0, faults=None):
+    """Serve the chain in a background thread, yielding the URL to send requests to."""
+    server = ThreadingHTTPServer(('localhost', port), make_handler(chain, faults))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield 'http://localhost:{}'.format(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve an auction dataset over JSON-RPC.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--auction', help='name of a fetched auction in the registry to serve')
+    source.add_argument('--synthetic', type=int, metavar='BIDS',
+                        help='serve a synthetic auction with this many bids')
+    parser.add_argument('--port', type=int, default=PORT, help='port to listen on')
+    parser.add_argument('--max-logs', type=int, default=MAX_LOGS,
+                        help='maximum number of logs returned by eth_getLogs')
+    parser.add_argument('--contract-rate', type=float, default=0,
+                        help='fraction of senders with contract code')
+    parser.add_argument('--latency', type=float, default=0, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='maximum random seconds added to the latency')
+    parser.add_argument('--http-error-rate', type=float, default=0,
+                        help='fraction of requests failing with HTTP 503')
+    parser.add_argument('--rpc-error-rate', type=float, default=0,
+                        help='fraction of calls failing with a JSON-RPC error')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='requests per second, more are answered with HTTP 429')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the injected faults')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.auction is not None:
+        auction = auctions.get_auction(args.auction)
+        bids, txs, receipts = load_dataset(auctions.data_dir(auction))
+        address = auction.address
+        start_time = auctions.start_time(auction)
+        start_block = auction.creation_block + 1
+        parameters_path = store.parameters_path(auctions.data_dir(auction))
+        parameters = None
+        if os.path.exists(parameters_path):
+            with open(parameters_path) as f:
+                parameters = json.load(f)
+    else:
+        bids, txs, receipts = synthetic.generate(args.synthetic)
+        address = synthetic.AUCTION_ADDRESS
+        start_time = synthetic.START_TIME
+        start_block = synthetic.START_BLOCK
+        parameters = synthetic.auction_parameters(bids)
+    chain = MockChain(bids, txs, receipts, address, start_time, start_block, args.max_logs,
+                      contract_codes(bids['sender'], args.contract_rate, args.seed), parameters)
+    faults = Faults(args.latency, args.jitter, args.http_error_rate, args.rpc_error_rate,
+                    args.rate_limit, args.seed)
+    server = ThreadingHTTPServer(('localhost', args.port), make_handler(chain, faults))
+    print('serving auction {} on http://localhost:{}'.format(address, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(dict(faults.stats))
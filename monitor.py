@@ -0,0 +1,164 @@
+"""Follow a running auction and serve live metrics.
+
+Run with `python monitor.py` and query `http://localhost:8000/metrics`.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import auctions
+import block_times
+import fetch
+import store
+from concentration import Concentration
+
+
+ROLLING_WINDOW = 24 * 60 * 60  # seconds
+POLL_INTERVAL = 15  # seconds
+PORT = 8000
+
+
+class LiveMetrics:
+    """Auction metrics updated bid by bid."""
+
+    def __init__(self, kyc_limit=auctions.KYC_LIMIT, rolling_window=ROLLING_WINDOW):
+        self.kyc_limit = kyc_limit
+        self.rolling_window = rolling_window
+        self.n_bids = 0
+        self.concentration = Concentration()
+        self.newest_time = None
+        # bids in the rolling window as (time, amount)
+        self.window = deque()
+        self.window_total = 0
+        self.last_block = None
+
+    def add_bid(self, sender, amount, time, block):
+        amount, time, block = float(amount), int(time), int(block)
+        self.n_bids += 1
+        self.concentration.add(sender, amount)
+
+        if self.newest_time is None or time > self.newest_time:
+            self.newest_time = time
+        self.window.append((time, amount))
+        self.window_total += amount
+        while self.window and self.window[0][0] <= self.newest_time - self.rolling_window:
+            _, old_amount = self.window.popleft()
+            self.window_total -= old_amount
+        self.last_block = block
+
+    def snapshot(self):
+        concentration = self.concentration
+        return {
+            'total_raised': concentration.total_amount(),
+            'bids': self.n_bids,
+            'unique_participants': concentration.n,
+            'above_kyc_limit': concentration.count_above(self.kyc_limit),
+            'below_kyc_limit_share': concentration.share_below(self.kyc_limit),
+            'top_10_percent_share': concentration.top_share(0.1),
+            'rolling_volume': self.window_total,
+            'newest_bid': self.newest_time,
+            'gini': concentration.gini(),
+            'last_block': self.last_block,
+        }
+
+
+class Monitor:
+
+    def __init__(self, auction, metrics, start_time, confirmations=fetch.CONFIRMATIONS):
+        self.auction = auction
+        self.metrics = metrics
+        self.start_time = start_time
+        self.confirmations = confirmations
+        self.block_index = block_times.BlockTimes()
+        self.lock = threading.Lock()
+
+    def replay_stored_bids(self):
+        """Process the stored bids up to the checkpoint, polling continues after it.
+
+        Bids after the checkpoint were not confirmed when they were fetched, so they are polled
+        again.
+        """
+        checkpoint = auctions.load_checkpoint(self.auction)
+        bids = store.load_bids(['sender', 'amount', 'time', 'block'],
+                               auctions.data_dir(self.auction))
+        bids = bids[bids['block'] <= checkpoint['block']]
+        with self.lock:
+            for sender, amount, bid_time, block in zip(bids['sender'], bids['amount'],
+                                                       bids['time'], bids['block']):
+                self.metrics.add_bid(sender, amount, bid_time, block)
+            self.metrics.last_block = checkpoint['block']
+
+    def poll(self):
+        """Process all bids since the last processed block."""
+        to_block = fetch.get_block_number() - self.confirmations
+        last_block = self.metrics.last_block
+        from_block = self.auction.creation_block if last_block is None else last_block + 1
+        if from_block > to_block:
+            return
+        bids = fetch.fetch_bid_events(self.auction, from_block, to_block)
+        # only confirmed blocks are polled, so their timestamps can be stored
+        self.block_index.finalized_block = to_block
+        timestamps = self.block_index.fill(bids['block'])
+        bids = fetch.add_bid_times(bids, timestamps, self.start_time)
+        with self.lock:
+            for sender, amount, bid_time, block in zip(bids['sender'], bids['amount'],
+                                                       bids['time'], bids['block']):
+                self.metrics.add_bid(sender, amount / 1e18, bid_time, block)
+            # remember that blocks without bids have been processed as well
+            self.metrics.last_block = to_block
+
+    def snapshot(self):
+        with self.lock:
+            return self.metrics.snapshot()
+
+    def run(self, interval=POLL_INTERVAL):
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def make_handler(monitor):
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = json.dumps(monitor.snapshot()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve live auction metrics.')
+    parser.add_argument('--auction', default=auctions.DEFAULT_AUCTION,
+                        help='name of the auction in the registry')
+    parser.add_argument('--port', type=int, default=PORT, help='port to serve metrics on')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help='seconds between polls for new bids')
+    parser.add_argument('--confirmations', type=int, default=fetch.CONFIRMATIONS,
+                        help='number of blocks to wait before processing bids')
+    parser.add_argument('--replay', action='store_true',
+                        help='start from the stored bids instead of scanning from the beginning')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    auction = auctions.get_auction(args.auction)
+    monitor = Monitor(auction, LiveMetrics(), fetch.fetch_start_time(auction),
+                      args.confirmations)
+    if args.replay:
+        monitor.replay_stored_bids()
+    server = ThreadingHTTPServer(('localhost', args.port), make_handler(monitor))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print('serving metrics on http://localhost:{}/metrics'.format(args.port))
+    monitor.run(args.interval)
@@ -2,20 +2,25 @@ import matplotlib as mpl
 from matplotlib import pyplot as plt
 import pandas as pd
 import numpy as np
+import aggregates
+import auctions
+from bid_table import BidTable
+import correlation
+from concentration import Concentration
+import store
+import time_cube
+from time_cube import TimeCube
+from timelines import Timelines
 
 mpl.rcParams.update({'font.size': 14})
 
 
-BID_FILENAME = 'bids.csv'
-TX_FILENAME = 'txs.csv'
-RECEIPT_FILENAME = 'receipts.csv'
-
-
-def plot_cum_bids(ax, bids):
-    time = bids['time']
-    bid_amount = bids['amount']
-    cum_bid_amount = np.cumsum(bid_amount)
-    cum_bid_number = np.arange(len(bids))
+def plot_cum_bids(ax, cube):
+    bins = cube.bins('minute')
+    # totals at the end of each minute
+    time = pd.Series(bins.index + time_cube.RESOLUTIONS['minute'])
+    cum_bid_amount = bins['sum'].cumsum()
+    cum_bid_number = bins['count'].cumsum()
 
     time_scale = 1 / (60 * 60)
     bid_scale = 1 / 1000
@@ -25,20 +30,20 @@ def plot_cum_bids(ax, bids):
 
     ax.set_xlabel('Time [h]')
     ax.set_ylabel('Bid amount [kETH]')
-    ax.set_xlim(0, time.iloc[-1] * time_scale)
+    ax.set_xlim(0, cube.last_time * time_scale)
     ax.set_ylim(0, cum_bid_amount.iloc[-1] * bid_scale)
 
-    ax2.set_ylim(0, len(bids))
+    ax2.set_ylim(0, cube.n_bids)
     ax2.set_ylabel('Number of bids')
 
 
-def plot_bid_dist(ax, bids):
+def plot_bid_dist(ax, bidders):
     """Number of bids in bid value range."""
-    amount_by_sender = bids[['sender', 'amount']].groupby('sender').sum()
     bins = np.concatenate([[0], 10.**np.arange(-2, 4) * 2.5, [np.inf]])
-    bid_amount_groups = amount_by_sender.groupby(pd.cut(amount_by_sender['amount'], bins))
+    # keep empty bins, so there is a bar for each
+    bid_amount_groups = bidders.groupby(pd.cut(bidders['amount'], bins), observed=False)
     bidders_per_bin = bid_amount_groups.size()
-    contribution_per_bin = bid_amount_groups['amount'].sum() / bids['amount'].sum() * 100
+    contribution_per_bin = bid_amount_groups['amount'].sum() / bidders['amount'].sum() * 100
 
     spacing = 0.2
     center = 0.5 + (1 + spacing) * np.arange(len(bins) - 1)
@@ -48,76 +53,64 @@ def plot_bid_dist(ax, bids):
 
     ax.set_xticks(center)
     ax.set_xticklabels(['{} - {}'.format(lower, upper)
-                        for lower, upper in zip(bins[:-1], bins[1:-1])])
+                        for lower, upper in zip(bins[:-1], bins[1:-1])] +
+                       ['> {}'.format(bins[-2])])
 
     ax.set_xlabel('Bidded amount [ETH]')
     ax.set_ylabel('Number of bids')
     ax2.set_ylabel('Total contributed amount [%]')
 
-def calc_autocorrelation(bids):
-    time_bin_size = 60  # 1 minute
-    bids['time_bin'] = bids['time'] // 60
-
-    bids_per_bin = bids.groupby('time_bin').size()
-    time_bins = np.arange(0, bids_per_bin.index[-1] + 1)
-    bids_per_bin = bids_per_bin.reindex(time_bins, fill_value=0)
+def calc_autocorrelation(bids, bin_size=60, max_lag=119, normalize=False):
+    """Autocorrelation of the number of bids per time bin (default: 1 minute, up to 2 hours).
 
-    tao = np.arange(1, 120)  # 2 hours
-    gamma = np.zeros(tao.shape)
-    for i in range(len(tao)):
-        for time_bin in time_bins[:-tao[-1]]:
-            gamma[i] += bids_per_bin[time_bin] * bids_per_bin[time_bin + tao[i]]
-
-    return tao, gamma
+    `bids` can also be a `TimeCube`, if `bin_size` is one of its resolutions.
+    """
+    if isinstance(bids, TimeCube):
+        counts = bids.counts(time_cube.resolution_name(bin_size))
+    else:
+        counts = correlation.bin_counts(bids['time'], bin_size)
+    return correlation.autocorrelation(counts, max_lag, normalize=normalize)
 
 
 def plot_corr(ax, bids):
-    tao1, gamma1 = calc_autocorrelation(bids[bids.time <= np.median(bids.time)])
-    tao2, gamma2 = calc_autocorrelation(bids[bids.time > np.median(bids.time)])
-    
+    first_half = bids['time'] <= np.median(bids['time'])
+    tao, (gamma1, gamma2) = correlation.segment_autocorrelation(
+        bids['time'], [first_half, ~first_half])
+
     ax2 = ax.twinx()
-    ax2.plot(tao2, gamma2, color='C1')
-    ax.plot(tao1, gamma1, color='C0')
+    ax2.plot(tao, gamma2, color='C1')
+    ax.plot(tao, gamma1, color='C0')
 
     ax.set_xlabel('Time delta [min]')
     ax.set_ylabel('Autocorrelation first half [a.u.]')
     ax2.set_ylabel('Autocorrelation second half [a.u.]')
 
 
-def print_summary(bids):
-    total_amount = bids['amount'].sum()
-    amount_by_sender = bids[['sender', 'amount']].groupby('sender').sum()
-    median_contribution = amount_by_sender.median()
-    average_contribution = amount_by_sender.mean()
-    largest_bids = amount_by_sender.sort_values('amount', ascending=False).iloc[:10]
+def print_summary(bidders):
+    total_amount = bidders['amount'].sum()
+    median_contribution = bidders['amount'].median()
+    average_contribution = bidders['amount'].mean()
+    largest_bids = bidders['amount'].sort_values(ascending=False).iloc[:10]
     print('total: {}'.format(total_amount))
     print('median contrib: {}'.format(median_contribution))
     print('avg contrib: {}'.format(average_contribution))
     print('largest bids: {}'.format(largest_bids))
 
 
-def plot_lorenz(ax, bids):
-    total_amount = bids['amount'].sum()
-    bidders = bids[['sender', 'amount']].groupby('sender').sum()
-    bidders['percentage'] = bidders['amount'] / bidders['amount'].sum()
-    bidders = bidders.sort_values('percentage')
-
-    lorenz_x = np.arange(len(bidders)) / len(bidders)
-    lorenz_y = np.cumsum(bidders['percentage'])
+def plot_lorenz(ax, bidders):
+    concentration = Concentration.from_totals(bidders['amount'])
+    lorenz_x, lorenz_y = concentration.lorenz_curve()
     ax.plot(lorenz_x, lorenz_y)
 
-    non_kyc_contrib = bidders[bidders['amount'] <= 2.5]['amount'].sum() / total_amount
-    top_10_percent = bidders.iloc[-int(round(len(bidders) / 10)):]
-    top_10_percent_contrib = top_10_percent['amount'].sum() / total_amount
-    gini = (1 / len(bidders) * lorenz_y).sum() * 2
-    #gini = (1 / len(bidders) * np.linspace(0, 1, len(bidders))).sum() * 2
+    non_kyc_contrib = concentration.share_below(auctions.KYC_LIMIT)
+    top_10_percent_contrib = concentration.top_share(0.1)
+    gini = concentration.gini()
 
     print('non KYC contribution: {}%'.format(non_kyc_contrib * 100))
     print('top 10% contribution: {}%'.format(top_10_percent_contrib * 100))
     print('Gini coefficient: {}%'.format(gini * 100))
 
 
-
 def plot_failed(ax, txs, receipts):
     merged = pd.merge(txs, receipts, left_index=True, right_index=True)
     failure_details = merged[['gasUsed', 'gas', 'status', 'input', 'value']]
@@ -137,17 +130,25 @@ def plot_failed(ax, txs, receipts):
     )
     ax.axis('equal')
 
-def plot_learning_bidders(ax, bids, txs, receipts):
-    merged = pd.merge(txs, receipts, left_index=True, right_index=True)
-    failing_tx_hashes = merged[merged['status'] == 0].index
-    failing_bidders = set(merged.loc[failing_tx_hashes]['from'].unique())
-    succeeding_bidders = set(bids['sender'].unique())
-    forever_failing = failing_bidders - succeeding_bidders
-    import pudb.b
-
-def plot_cum_hist(ax, bids):
-    bidders = bids[['sender', 'amount']].groupby('sender').sum()
-    import pudb.b
+def plot_learning_bidders(ax, timelines):
+    failures = timelines.failures_before_success()
+    failures = failures[failures['failures'] > 0]
+    learning = failures.loc[failures['succeeded'], 'failures']
+    forever_failing = failures.loc[~failures['succeeded'], 'failures']
+
+    max_failures = max(failures['failures'].max(), 1) if len(failures) else 1
+    n_failures = np.arange(1, max_failures + 1)
+    width = 0.4
+    ax.bar(n_failures - width / 2, np.bincount(learning, minlength=max_failures + 1)[1:],
+           width=width, label='succeeded later ({})'.format(len(learning)))
+    ax.bar(n_failures + width / 2, np.bincount(forever_failing, minlength=max_failures + 1)[1:],
+           width=width, label='never succeeded ({})'.format(len(forever_failing)))
+    ax.set_xlabel('Failed transactions before the first bid')
+    ax.set_ylabel('Bidders')
+    ax.legend()
+
+
+def plot_cum_hist(ax, bidders):
     hist, bin_edges = np.histogram(bidders['amount'], bins=100)
     width = np.diff(bin_edges)
     ax.bar(bin_edges[:-1], hist, width=width, bottom=0.001)
@@ -156,19 +157,37 @@ def plot_cum_hist(ax, bids):
     ax2.plot(bin_edges[:-1], np.cumsum(bin_edges[:-1] * hist), color='C1')
     ax.set_yscale('log')
 
+
+def load_data(auction_name=auctions.DEFAULT_AUCTION):
+    data_dir = auctions.data_dir(auctions.get_auction(auction_name))
+    data = {
+        'bids': BidTable.load(data_dir=data_dir),
+        'txs': store.load_txs(data_dir=data_dir),
+        'receipts': store.load_receipts(data_dir=data_dir),
+        'bidders': aggregates.load_bidders(data_dir),
+        'cube': time_cube.load_cube(data_dir),
+    }
+    data['timelines'] = Timelines.build(data['bids'], data['txs'], data['receipts'])
+    return data
+
+
 if __name__ == '__main__':
-    bids = pd.DataFrame.from_csv(BID_FILENAME)
-    txs = pd.DataFrame.from_csv(TX_FILENAME).set_index('hash')
-    receipts = pd.DataFrame.from_csv(RECEIPT_FILENAME).set_index('transactionHash')
+    data = load_data()
+    bids = data['bids']
+    txs = data['txs']
+    receipts = data['receipts']
+    bidders = data['bidders']
+    cube = data['cube']
+    timelines = data['timelines']
 
     fig = plt.figure()
     ax = fig.add_subplot(111)
-    # plot_cum_bids(ax, bids)
-    # plot_bid_dist(ax, bids)
+    # plot_cum_bids(ax, cube)
+    # plot_bid_dist(ax, bidders)
     # plot_corr(ax, bids)
     # plot_failed(ax, txs, receipts)
-    # plot_learning_bidders(ax, bids, txs, receipts)
-    # print_summary(bids)
-    # plot_lorenz(ax, bids)
-    plot_cum_hist(ax, bids)
+    # plot_learning_bidders(ax, timelines)
+    # print_summary(bidders)
+    # plot_lorenz(ax, bidders)
+    plot_cum_hist(ax, bidders)
     plt.show()
@@ -5,18 +5,38 @@ import plotly.plotly as py
 import plotly.graph_objs as go
 import plotly.figure_factory as ff
 from eth_utils import denoms
+import aggregates
+import auctions
+from concentration import Concentration
+import downsample
+import store
+import time_cube
 
 
-START_TIME = pd.to_datetime(1508341187, unit='s')
+# maximum number of points per trace sent to the browser
+MAX_POINTS = 5000
 
 
-def fig_avg(bids):
+def auction_title(auction_name):
+    return '{} auction'.format(auction_name.upper())
+
+
+TITLE = auction_title(auctions.DEFAULT_AUCTION)
+
+
+def fig_avg(cube, max_points=MAX_POINTS, title=TITLE):
+    bins = cube.bins('minute')
+    # totals at the end of each minute
+    end = bins.index + time_cube.RESOLUTIONS['minute']
+    average = bins['sum'].cumsum().values / (end / 60 / 60)
+    time = cube.datetimes(end)
+    indices = downsample.line_indices(time, average, max_points)
     data = [go.Scatter(
-        x=bids['time'],
-        y=bids['cum_amount'] / (bids['time_rel'].dt.total_seconds() / 60 / 60)
+        x=time[indices],
+        y=average[indices]
     )]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         yaxis=dict(
             title='Average bid amount per hour [ETH]'
         )
@@ -38,22 +58,27 @@ def fig_avg(bids):
 #     return fig
 
 
-def fig_bids(bids, bidders):
-    time_bins = pd.date_range(START_TIME, bids['time'].max(), freq='4h')
-    relevant_bids = bids[bids['amount'] > 2.5]
-    bins = pd.cut(relevant_bids['time'], time_bins)
-    binned_bids = relevant_bids.groupby(bins)
-    mean_bid_amount = binned_bids['amount'].median()
+def fig_bids(bids, bidders, cube, max_points=MAX_POINTS, title=TITLE):
+    binned_bids = cube.bins('4h')
+    time_bins = cube.datetimes(binned_bids.index)
+    # of the bids above the KYC limit
+    mean_bid_amount = binned_bids['sum_above'] / binned_bids['count_above']
+    minutes = cube.bins('minute')
+    minute_ends = cube.datetimes(minutes.index + time_cube.RESOLUTIONS['minute'])
+    cum_amount = minutes['sum'].cumsum().values
+    scatter_indices = downsample.scatter_indices(bids['time'], bids['amount'], max_points,
+                                                 log_y=True)
+    line_indices = downsample.line_indices(minute_ends, cum_amount, max_points)
     data = [
         go.Scatter(
-            x=bids['time'],
-            y=bids['amount'],
+            x=bids['time'].iloc[scatter_indices],
+            y=bids['amount'].iloc[scatter_indices],
             mode='markers',
             name='Bids'
         ),
         go.Scatter(
-            x=bids['time'],
-            y=bids['cum_amount'],
+            x=minute_ends[line_indices],
+            y=cum_amount[line_indices],
             name='Total amount',
             yaxis='y2'
         ),
@@ -65,7 +90,7 @@ def fig_bids(bids, bidders):
         # )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         yaxis={
             'title': 'Individual bid amount [ETH]',
             'type': 'log'
@@ -80,28 +105,29 @@ def fig_bids(bids, bidders):
     return fig
 
 
-def fig_rolling(bids):
-    hour = (bids['time'] - pd.to_datetime(0)).dt.total_seconds() // 60 // 60
-    hour = pd.to_datetime(hour, unit='h')
-    hourly = bids.groupby(hour)['amount'].sum()
+def fig_rolling(cube, title=TITLE):
+    hourly = cube.bins('hour')['sum']
 
-    volume = bids.groupby('time')['amount'].sum()
-    rolling = volume.rolling('1d', center=False).sum()
+    minutes = cube.bins('minute')
+    window = time_cube.RESOLUTIONS['day'] // time_cube.RESOLUTIONS['minute']
+    cumulative = np.concatenate([[0], minutes['sum'].cumsum().values])
+    # sum over the last 24 hours at the end of each minute
+    rolling = cumulative[1:] - cumulative[np.maximum(np.arange(1, len(cumulative)) - window, 0)]
 
     data = [
         go.Bar(
-            x=hourly.index,
+            x=cube.datetimes(hourly.index),
             y=hourly,
             name='hourly volume'
         ),
         go.Scatter(
-            x=rolling.index,
+            x=cube.datetimes(minutes.index + time_cube.RESOLUTIONS['minute']),
             y=rolling,
             name='24h rolling sum'
         )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         yaxis={
             'title': 'Bid amount [ETH]',
         }
@@ -110,7 +136,7 @@ def fig_rolling(bids):
     return fig
 
 
-def fig_bid_hist(bidders):
+def fig_bid_hist(bidders, title=TITLE):
     grouped = bidders.groupby(bidders['amount'] // 1)
     hist = grouped.size()
     total = bidders['amount'].sum()
@@ -132,7 +158,7 @@ def fig_bid_hist(bidders):
         )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         xaxis={
             'title': 'Bid amount [ETH]'
         },
@@ -151,14 +177,10 @@ def fig_bid_hist(bidders):
     return fig
 
 
-def fig_lorenz(bidders):
-    total_amount = bidders['amount'].sum()
-    bidders = bidders.sort_values('percentage')
-
-    lorenz_x = np.arange(len(bidders)) / len(bidders)
-    lorenz_y = np.cumsum(bidders['percentage'])
-
-    gini = 1 - 2 * (1 / len(bidders) * lorenz_y).sum()
+def fig_lorenz(bidders, title=TITLE):
+    concentration = Concentration.from_totals(bidders['amount'])
+    lorenz_x, lorenz_y = concentration.lorenz_curve()
+    gini = concentration.gini()
 
     data = [
         go.Scatter(
@@ -169,7 +191,7 @@ def fig_lorenz(bidders):
         )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         xaxis={
             'title': 'Percentage of bidders',
             'ticksuffix': '%'
@@ -191,18 +213,8 @@ def fig_lorenz(bidders):
 
     return go.Figure(data=data, layout=layout)
 
-    # non_kyc_contrib = bidders[bidders['amount'] <= 2.5]['amount'].sum() / total_amount
-    # top_10_percent = bidders.iloc[-int(round(len(bidders) / 10)):]
-    # top_10_percent_contrib = top_10_percent['amount'].sum() / total_amount
-    gini = (1 / len(bidders) * lorenz_y).sum() * 2
-    # #gini = (1 / len(bidders) * np.linspace(0, 1, len(bidders))).sum() * 2
 
-    # print('non KYC contribution: {}%'.format(non_kyc_contrib * 100))
-    # print('top 10% contribution: {}%'.format(top_10_percent_contrib * 100))
-    # print('Gini coefficient: {}%'.format(gini * 100))
-
-
-def fig_gas_usage(bids, receipts):
+def fig_gas_usage(bids, receipts, title=TITLE):
     merged = pd.merge(bids, receipts, left_on='txhash', right_index=True)
     gas_used = merged.groupby('block')['gasUsed'].sum()
     data = [
@@ -212,7 +224,7 @@ def fig_gas_usage(bids, receipts):
         )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         xaxis={
             'title': 'Block'
         },
@@ -223,7 +235,7 @@ def fig_gas_usage(bids, receipts):
     return go.Figure(data=data, layout=layout)
 
 
-def fig_gas_prices(txs):
+def fig_gas_prices(txs, title=TITLE):
     hist_price = txs.groupby(txs['gasPrice'] // denoms.gwei).size()
     hist_limit = txs.groupby(txs['gas'] // 1000).size()
 
@@ -244,7 +256,7 @@ def fig_gas_prices(txs):
     fig = plotly_tools.make_subplots(rows=1, cols=2)
     fig.append_trace(trace_price, 1, 1)
     fig.append_trace(trace_limit, 1, 2)
-    fig['layout']['title'] = 'RDN auction'
+    fig['layout']['title'] = title
     fig['layout']['xaxis1']['title'] = 'Gas price [GWei]'
     fig['layout']['xaxis2']['title'] = 'Gas limit [k]'
     fig['layout']['yaxis1']['title'] = 'Number of bids'
@@ -253,7 +265,7 @@ def fig_gas_prices(txs):
     return fig
 
 
-def fig_fits(bids):
+def fig_fits(bids, title=TITLE):
     outlier_bound = 500
     bids = bids[bids['amount'] < outlier_bound]
     cum_amount = bids['amount'].cumsum()
@@ -264,7 +276,7 @@ def fig_fits(bids):
         )
     ]
     layout = go.Layout(
-        title='RDN auction',
+        title=title,
         xaxis={
             'title': 'Block'
         },
@@ -276,24 +288,40 @@ def fig_fits(bids):
 
 
 
-if __name__ == '__main__':
-    bids = pd.DataFrame.from_csv('bids.csv')
-    receipts = pd.DataFrame.from_csv('receipts.csv')
-    txs = pd.DataFrame.from_csv('txs.csv')
-
+def prepare_bids(bids, start_time):
+    """Add the columns used by the figures to bids as loaded from the store."""
     bids['time_rel'] = pd.to_timedelta(bids['time'], unit='s')
-    bids['time'] = pd.to_datetime(bids['time'], origin=START_TIME, unit='s')
+    bids['time'] = pd.to_datetime(bids['time'], origin=pd.to_datetime(start_time, unit='s'),
+                                  unit='s')
     bids['cum_amount'] = bids['amount'].cumsum()
+    return bids
 
-    bidders = bids.groupby('sender')['amount'].sum()
-    bidders = pd.DataFrame({}, index=bids['sender'].unique())
-    bidders['amount'] = bids.groupby('sender')['amount'].sum()
-    bidders['percentage'] = bidders['amount'] / bidders['amount'].sum()
-    bidders['n_bids'] = bids['sender'].value_counts()
 
-    # py.plot(fig_avg(bids), filename='RDN average')
-    py.plot(fig_bids(bids, bidders), filename='RDN bids')
-    # py.plot(fig_rolling(bids), filename='RDN rolling')
+def load_data(auction_name=auctions.DEFAULT_AUCTION):
+    auction = auctions.get_auction(auction_name)
+    data_dir = auctions.data_dir(auction)
+    bids = prepare_bids(store.load_bids(data_dir=data_dir), auctions.start_time(auction))
+    return {
+        'bids': bids,
+        'bidders': aggregates.load_bidders(data_dir),
+        'cube': time_cube.load_cube(data_dir),
+        'receipts': store.load_receipts(data_dir=data_dir),
+        'txs': store.load_txs(data_dir=data_dir),
+        'title': auction_title(auction_name),
+    }
+
+
+if __name__ == '__main__':
+    data = load_data()
+    bids = data['bids']
+    bidders = data['bidders']
+    receipts = data['receipts']
+    txs = data['txs']
+    cube = data['cube']
+
+    # py.plot(fig_avg(cube), filename='RDN average')
+    py.plot(fig_bids(bids, bidders, cube), filename='RDN bids')
+    # py.plot(fig_rolling(cube), filename='RDN rolling')
     # py.plot(fig_bid_hist(bidders), filename='RDN bid hist')
     # # py.plot(fig_repeated(bids, bidders), filename='RDN repeated bidders')
     # py.plot(fig_lorenz(bidders), filename='RDN lorenz')
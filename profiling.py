@@ -0,0 +1,176 @@
+"""Optional instrumentation of the fetch and plotting stages.
+
+Disabled by default, in which case `stage` and functions decorated with `timed` cost a single
+check. Once enabled, each stage records its wall time, the RPC calls, requests and bytes sent
+and received while it ran (including those of concurrently running stages) and the peak traced
+memory. With a profile directory, the outermost running stage is also profiled with cProfile.
+"""
+import asyncio
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+COUNTERS = ['rpc_calls', 'rpc_requests', 'bytes_sent', 'bytes_received']
+
+enabled = False
+profile_dir = None
+
+_lock = threading.Lock()
+_counters = dict.fromkeys(COUNTERS, 0)
+# aggregated records of the finished stages by name
+_stages = {}
+# running stages by id, whose memory peaks are updated whenever the peak is reset
+_running = {}
+_profiling = False
+# peak traced memory over the whole run, the tracemalloc peak is reset for each stage
+_peak_memory = 0
+_null_context = nullcontext()
+
+
+def enable(profile_directory=None):
+    global enabled, profile_dir
+    enabled = True
+    profile_dir = profile_directory
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def reset():
+    """Forget the recorded stages, e.g. in a worker process inheriting those of its parent."""
+    global _peak_memory
+    with _lock:
+        _peak_memory = 0
+        _stages.clear()
+        for key in COUNTERS:
+            _counters[key] = 0
+
+
+def count_rpc(calls, bytes_sent, bytes_received):
+    """Record a JSON-RPC request, called by the RPC clients when enabled."""
+    with _lock:
+        _counters['rpc_calls'] += calls
+        _counters['rpc_requests'] += 1
+        _counters['bytes_sent'] += bytes_sent
+        _counters['bytes_received'] += bytes_received
+
+
+def _update_peaks():
+    global _peak_memory
+    _, peak = tracemalloc.get_traced_memory()
+    _peak_memory = max(_peak_memory, peak)
+    for running in _running.values():
+        running['peak_memory'] = max(running['peak_memory'], peak)
+    tracemalloc.reset_peak()
+
+
+def stage(name):
+    """Context manager recording a stage if enabled."""
+    if not enabled:
+        return _null_context
+    return _stage(name)
+
+
+@contextmanager
+def _stage(name):
+    global _profiling
+    with _lock:
+        _update_peaks()
+        running = dict(_counters, peak_memory=0)
+        _running[id(running)] = running
+        profiler = None
+        if profile_dir is not None and not _profiling:
+            _profiling = True
+            profiler = cProfile.Profile()
+    if profiler is not None:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        with _lock:
+            _update_peaks()
+            del _running[id(running)]
+            record = _stages.setdefault(name, dict(dict.fromkeys(COUNTERS, 0), calls=0,
+                                                   seconds=0, peak_memory=0))
+            record['calls'] += 1
+            record['seconds'] += seconds
+            for key in COUNTERS:
+                record[key] += _counters[key] - running[key]
+            record['peak_memory'] = max(record['peak_memory'], running['peak_memory'])
+            if profiler is not None:
+                profiler.dump_stats(os.path.join(
+                    profile_dir, '{}.{}.prof'.format(name, record['calls'])))
+                _profiling = False
+
+
+def timed(name=None):
+    """Decorator recording each call of a function or coroutine function as a stage."""
+    def decorator(function):
+        stage_name = name or function.__name__
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                if not enabled:
+                    return await function(*args, **kwargs)
+                with _stage(stage_name):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not enabled:
+                    return function(*args, **kwargs)
+                with _stage(stage_name):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Get the recorded stages and counters, to be merged into the report of another process."""
+    with _lock:
+        _update_peaks()
+        return {
+            'stages': {name: dict(record) for name, record in _stages.items()},
+            'rpc': dict(_counters),
+            'peak_memory': _peak_memory,
+        }
+
+
+def merge(other):
+    global _peak_memory
+    with _lock:
+        _peak_memory = max(_peak_memory, other['peak_memory'])
+        for name, other_record in other['stages'].items():
+            record = _stages.get(name)
+            if record is None:
+                _stages[name] = dict(other_record)
+                continue
+            for key, value in other_record.items():
+                if key == 'peak_memory':
+                    record[key] = max(record[key], value)
+                else:
+                    record[key] += value
+        for key in COUNTERS:
+            _counters[key] += other['rpc'][key]
+
+
+def write_report(path):
+    """Write the recorded stages as JSON, slowest first."""
+    report = snapshot()
+    report['command'] = sys.argv
+    report['stages'] = dict(sorted(report['stages'].items(),
+                                   key=lambda item: item[1]['seconds'], reverse=True))
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,198 @@
+"""Render all figures of plot.py and plot_plotly.py to files, in parallel.
+
+Run with `python render.py`. The datasets are loaded once before the worker processes are
+forked, so the workers share them instead of reading them again. The plotting libraries are
+imported only for the backends of the figures to render.
+"""
+import argparse
+import importlib
+import inspect
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import auctions
+import profiling
+
+
+# the figures of each auction are written to a subdirectory named after it
+OUTPUT_DIR = 'figures'
+MATPLOTLIB_FORMATS = ['png', 'svg']
+PLOTLY_FORMATS = ['html']
+
+# name: (module name, prefix of figure functions)
+BACKENDS = {
+    'matplotlib': ('plot', 'plot_'),
+    'plotly': ('plot_plotly', 'fig_'),
+}
+
+# datasets per backend, loaded in the main process and inherited by the forked workers
+_data = {}
+
+
+def backend_module(backend):
+    module_name, _ = BACKENDS[backend]
+    if backend == 'matplotlib':
+        import matplotlib
+        matplotlib.use('Agg')  # render without a display
+    return importlib.import_module(module_name)
+
+
+def select_backends(names=None):
+    """Get the backends with figure functions of the given names (all without names)."""
+    return [backend for backend, (_, prefix) in BACKENDS.items()
+            if names is None or any(name.startswith(prefix) for name in names)]
+
+
+def discover(backend):
+    """Find the names of all figure functions of a backend."""
+    module = backend_module(backend)
+    _, prefix = BACKENDS[backend]
+    return sorted(
+        name for name, function in inspect.getmembers(module, inspect.isfunction)
+        if name.startswith(prefix) and function.__module__ == module.__name__
+    )
+
+
+def load_data(backends, auction_name):
+    for backend in backends:
+        module = backend_module(backend)
+        with profiling.stage('load_data_' + backend):
+            _data[backend] = module.load_data(auction_name)
+
+
+def figure_arguments(function, data):
+    """Pick the datasets a figure function takes, by parameter name."""
+    parameters = inspect.signature(function).parameters
+    return {name: data[name] for name in parameters if name in data}
+
+
+def render_matplotlib(function, data, path, formats):
+    from matplotlib import pyplot as plt
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    with profiling.stage(function.__name__):
+        function(ax, **figure_arguments(function, data))
+    paths = []
+    for extension in formats:
+        paths.append('{}.{}'.format(path, extension))
+        with profiling.stage('save_' + extension):
+            fig.savefig(paths[-1], bbox_inches='tight')
+    plt.close(fig)
+    return paths
+
+
+def render_plotly(function, data, path, formats):
+    import plotly.io
+    import plotly.offline
+
+    with profiling.stage(function.__name__):
+        fig = function(**figure_arguments(function, data))
+    paths = []
+    for extension in formats:
+        paths.append('{}.{}'.format(path, extension))
+        with profiling.stage('save_' + extension):
+            if extension == 'html':
+                plotly.offline.plot(fig, filename=paths[-1], auto_open=False)
+            else:
+                # static export needs an image export backend
+                plotly.io.write_image(fig, paths[-1])
+    return paths
+
+
+RENDERERS = {
+    'matplotlib': render_matplotlib,
+    'plotly': render_plotly,
+}
+
+
+def render(backend, name, output_dir, formats, auction_name):
+    """Render a single figure.
+
+    Returns its name, the written files, the error, if any, and the recorded stages if profiling.
+    """
+    # only report the stages of this figure, not those inherited from the parent or other jobs
+    profiling.reset()
+    if backend not in _data:
+        load_data([backend], auction_name)
+    module = backend_module(backend)
+    path = os.path.join(output_dir, name)
+    try:
+        paths = RENDERERS[backend](getattr(module, name), _data[backend], path, formats)
+        error = None
+    except Exception:
+        paths, error = [], traceback.format_exc()
+    return name, paths, error, profiling.snapshot() if profiling.enabled else None
+
+
+def render_all(jobs, output_dir=None, workers=None, auction_name=auctions.DEFAULT_AUCTION):
+    """Render `(backend, name, formats)` jobs in a process pool.
+
+    The files are written to `output_dir`, by default the directory of the auction in
+    `OUTPUT_DIR`.
+    """
+    if output_dir is None:
+        output_dir = os.path.join(OUTPUT_DIR, auction_name)
+    os.makedirs(output_dir, exist_ok=True)
+    load_data({backend for backend, _, _ in jobs}, auction_name)
+    # fork to share the loaded data with the workers, otherwise each worker loads it itself
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        futures = [executor.submit(render, backend, name, output_dir, formats, auction_name)
+                   for backend, name, formats in jobs]
+        results = []
+        for future in futures:
+            name, paths, error, stages = future.result()
+            if stages is not None:
+                profiling.merge(stages)
+            results.append((name, paths, error))
+        return results
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Render all figures to files.')
+    parser.add_argument('--auction', default=auctions.DEFAULT_AUCTION,
+                        help='name of the auction in the registry')
+    parser.add_argument('--output-dir', default=None,
+                        help='directory to write to (default: {}/<auction>)'.format(OUTPUT_DIR))
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: number of cores)')
+    parser.add_argument('--matplotlib-formats', nargs='+', default=MATPLOTLIB_FORMATS,
+                        help='file formats of the matplotlib figures')
+    parser.add_argument('--plotly-formats', nargs='+', default=PLOTLY_FORMATS,
+                        help='file formats of the plotly figures')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='names of the figure functions to render')
+    parser.add_argument('--report', help='write timings and memory usage to this JSON file')
+    parser.add_argument('--cprofile', metavar='DIR',
+                        help='write cProfile stats of each stage to this directory')
+    return parser.parse_args(args)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.report or args.cprofile:
+        profiling.enable(args.cprofile)
+    formats = {'matplotlib': args.matplotlib_formats, 'plotly': args.plotly_formats}
+    jobs = [(backend, name, formats[backend])
+            for backend in select_backends(args.only) for name in discover(backend)
+            if args.only is None or name in args.only]
+    failed = 0
+    for name, paths, error in render_all(jobs, args.output_dir, args.workers, args.auction):
+        if error is None:
+            print('{}: {}'.format(name, ', '.join(paths)))
+        else:
+            failed += 1
+            print('{} failed:\n{}'.format(name, error))
+    print('rendered {} of {} figures'.format(len(jobs) - failed, len(jobs)))
+    if args.report:
+        profiling.write_report(args.report)
+
+
+if __name__ == '__main__':
+    main()
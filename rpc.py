@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+
+import requests
+
+import profiling
+
+
+RPC_URL = 'http://localhost:8545'
+BATCH_SIZE = 100
+TIMEOUT = 60  # seconds
+RETRIES = 5
+BACKOFF = 0.5  # seconds, doubled after each failed attempt
+# JSON-RPC errors caused by the request itself, which fail again when retried
+PERMANENT_ERROR_CODES = {
+    -32700,  # parse error
+    -32600,  # invalid request
+    -32601,  # method not found
+    -32602,  # invalid params
+}
+
+# hex encoded fields that web3 returns as ints
+QUANTITY_KEYS = {
+    'blockNumber',
+    'cumulativeGasUsed',
+    'gas',
+    'gasPrice',
+    'gasUsed',
+    'logIndex',
+    'nonce',
+    'number',
+    'status',
+    'timestamp',
+    'transactionIndex',
+    'v',
+    'value',
+}
+
+
+class RPCError(Exception):
+    pass
+
+
+def format_result(result):
+    """Decode hex quantities of a result dict (or list of dicts) the way web3 does."""
+    if isinstance(result, list):
+        return [format_result(item) for item in result]
+    if not isinstance(result, dict):
+        return result
+    return {
+        key: int(value, 16) if key in QUANTITY_KEYS and isinstance(value, str) else value
+        for key, value in result.items()
+    }
+
+
+# cache of immutable results, see `rpc_cache.RPCCache`
+cache = None
+
+
+def set_cache(new_cache):
+    global cache
+    cache = new_cache
+
+
+def is_transient(error):
+    """Check if a failed request may succeed when sent again."""
+    if isinstance(error, RPCError):
+        details = error.args[0] if error.args else None
+        if not isinstance(details, dict):
+            return True
+        if 'revert' in str(details.get('message', '')).lower():
+            return False
+        return details.get('code') not in PERMANENT_ERROR_CODES
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class RateLimiter:
+    """Spaces out requests so that at most `rate` of them are started per second.
+
+    Thread safe, and shared by the synchronous requests and an `async_rpc.AsyncClient`.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve the next slot, returning the seconds to wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        return delay
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Throttle:
+    """Limits and retries of the synchronous requests, shared by all threads.
+
+    At most `concurrency` requests are in flight and, if `rate_limit` is given, no more than that
+    many are started per second. Failed requests are retried up to `retries` times with
+    exponential backoff, if the error is transient.
+    """
+
+    def __init__(self, retries=RETRIES, backoff=BACKOFF, rate_limit=None, concurrency=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.semaphore = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+    def run(self, send, retry_if=is_transient):
+        """Call `send`, which performs a request, retrying it if it fails with an error for which
+        `retry_if` is true."""
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            try:
+                if self.semaphore is None:
+                    return send()
+                with self.semaphore:
+                    return send()
+            except (RPCError, requests.RequestException) as e:
+                if attempt == self.retries or not retry_if(e):
+                    raise
+            time.sleep(self.backoff * 2**attempt)
+
+
+# limits and retries of the synchronous requests
+throttle = Throttle()
+
+
+def set_throttle(new_throttle):
+    global throttle
+    throttle = new_throttle
+
+
+def make_request(method, params, request_id=0):
+    return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+
+
+def check_response(response):
+    """Return the unformatted result of a response or raise its error."""
+    if 'error' in response:
+        raise RPCError(response['error'])
+    return response['result']
+
+
+def unpack_response(response):
+    return format_result(check_response(response))
+
+
+def call(method, params, url=RPC_URL, session=requests, retry_if=is_transient):
+    return batch_call([(method, params)], url=url, session=session, retry_if=retry_if)[0]
+
+
+class CachedCalls:
+    """Results of a list of calls found in `cache`, completed with the results of the others.
+
+    Used by the synchronous and the asynchronous clients, which send the `missing_calls` their
+    own way, so that both read and store the same results.
+    """
+
+    def __init__(self, calls):
+        self.cache = cache
+        if self.cache is None:
+            self.results = [None] * len(calls)
+        else:
+            self.results = self.cache.get_many(calls)
+        self.missing = [i for i, result in enumerate(self.results) if result is None]
+        self.missing_calls = [calls[i] for i in self.missing]
+
+    def complete(self, fetched):
+        """Store the unformatted results of the missing calls, return the results of all calls."""
+        if self.cache is not None and self.missing:
+            self.cache.put_many(self.missing_calls, fetched)
+        for i, result in zip(self.missing, fetched):
+            self.results[i] = result
+        return [format_result(result) for result in self.results]
+
+
+def cached_batch_call(calls, send):
+    """Perform calls, serving what is possible from the cache and sending the rest with `send`.
+
+    `send` takes a list of calls and returns their unformatted results.
+    """
+    cached = CachedCalls(calls)
+    return cached.complete(send(cached.missing_calls) if cached.missing_calls else [])
+
+
+def batch_call(calls, batch_size=BATCH_SIZE, url=RPC_URL, session=None, retry_if=is_transient):
+    """Perform a list of `(method, params)` calls using JSON-RPC batch requests.
+
+    The calls are sent in batches of at most `batch_size` requests, within the limits of
+    `throttle`. Batches failing with an error for which `retry_if` is true are sent again.
+    Results are returned in the same order as the calls.
+    """
+    def send_batch(batch):
+        if len(batch) == 1:
+            method, params = batch[0]
+            return [check_response(post(make_request(method, params)))]
+        payload = [make_request(method, params, i) for i, (method, params) in enumerate(batch)]
+        # responses to batch requests may come in any order
+        by_id = {item['id']: item for item in post(payload)}
+        return [check_response(by_id[i]) for i in range(len(batch))]
+
+    def send(calls):
+        results = []
+        for start in range(0, len(calls), batch_size):
+            batch = calls[start:start + batch_size]
+            results.extend(throttle.run(lambda: send_batch(batch), retry_if))
+        return results
+
+    def post(payload):
+        response = active_session.post(url, json=payload, timeout=TIMEOUT)
+        response.raise_for_status()
+        if profiling.enabled:
+            calls = len(payload) if isinstance(payload, list) else 1
+            profiling.count_rpc(calls, len(json.dumps(payload)), len(response.content))
+        return response.json()
+
+    if session is not None:
+        active_session = session
+        return cached_batch_call(calls, send)
+    with requests.Session() as active_session:
+        return cached_batch_call(calls, send)
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+CACHE_FILENAME = 'rpc_cache.sqlite'
+MAX_SIZE = 1024**3  # bytes
+
+
+def cache_key(method, params):
+    serialized = json.dumps([method, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def is_block_number(value):
+    return isinstance(value, str) and value.startswith('0x')
+
+
+class RPCCache:
+    """On-disk cache of RPC results that can not change anymore.
+
+    Results are keyed by a hash of method and parameters. Only results referring to blocks not
+    after `finalized_block` are stored. If the stored results exceed `max_size` bytes, the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path=CACHE_FILENAME, max_size=MAX_SIZE, finalized_block=None):
+        self.max_size = max_size
+        self.finalized_block = finalized_block
+        self.lock = threading.Lock()
+        # the timeout lets processes fetching different auctions share the cache
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access INTEGER NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS lru ON results (last_access)')
+        size, clock = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0), COALESCE(MAX(last_access), 0) FROM results'
+        ).fetchone()
+        self.size = size
+        self.clock = clock
+        self.db.commit()
+
+    def is_final(self, block_number):
+        return self.finalized_block is not None and block_number <= self.finalized_block
+
+    def is_immutable(self, method, params, result):
+        if result is None:
+            return False
+        if method in ('eth_getTransactionByHash', 'eth_getTransactionReceipt'):
+            return (result.get('blockNumber') is not None and
+                    self.is_final(int(result['blockNumber'], 16)))
+        if method == 'eth_getBlockByNumber':
+            # blocks with full transactions are too large to be worth keeping
+            return (is_block_number(params[0]) and not params[1] and
+                    self.is_final(int(params[0], 16)))
+        if method == 'eth_getCode':
+            return (len(params) > 1 and is_block_number(params[1]) and
+                    self.is_final(int(params[1], 16)))
+        if method == 'eth_getLogs':
+            to_block = params[0].get('toBlock')
+            return is_block_number(to_block) and self.is_final(int(to_block, 16))
+        return False
+
+    def get_many(self, calls):
+        """Return the cached raw results of `(method, params)` calls, `None` for misses."""
+        keys = [cache_key(method, params) for method, params in calls]
+        with self.lock:
+            found = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self.db.execute(
+                    'SELECT key, value FROM results WHERE key IN ({})'.format(
+                        ','.join('?' * len(chunk))),
+                    chunk
+                )
+                found.update(rows)
+            if found:
+                self.clock += 1
+                self.db.executemany('UPDATE results SET last_access = ? WHERE key = ?',
+                                    [(self.clock, key) for key in found])
+                self.db.commit()
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def put_many(self, calls, results):
+        """Store the raw results of `(method, params)` calls if they are immutable."""
+        rows = []
+        for (method, params), result in zip(calls, results):
+            if self.is_immutable(method, params, result):
+                value = json.dumps(result, separators=(',', ':'))
+                rows.append((cache_key(method, params), value, len(value)))
+        if not rows:
+            return
+        with self.lock:
+            self.clock += 1
+            for key, value, size in rows:
+                old = self.db.execute('SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+                if old is not None:
+                    self.size -= old[0]
+                self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                                (key, value, size, self.clock))
+                self.size += size
+            if self.size > self.max_size:
+                self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        rows = self.db.execute('SELECT key, size FROM results ORDER BY last_access')
+        evicted = []
+        for key, size in rows:
+            if self.size <= self.max_size:
+                break
+            evicted.append((key,))
+            self.size -= size
+        self.db.executemany('DELETE FROM results WHERE key = ?', evicted)
+
+    def close(self):
+        self.db.close()
@@ -1,15 +1,9 @@
-import pandas as pd
+import argparse
+import summary
 
 if __name__ == '__main__':
-    bids = pd.DataFrame.from_csv('bids.csv')
-    bidders = bids.groupby('sender')['amount'].sum()
-
-    total_raised = bids['amount'].sum()
-    unique_participants = len(bids['sender'].unique())
-    above_kyc_limit = len(bidders[bidders > 2.5])
-    newest_bid = pd.to_datetime(1508341187 + max(bids['time']), unit='s')
-
-    print('total raised: {} ETH'.format(total_raised))
-    print('unique participants: {}'.format(unique_participants))
-    print('bid > 2.5: {}'.format(above_kyc_limit))
-    print('newest analyzed bid: {}'.format(newest_bid))
+    parser = argparse.ArgumentParser(description='Print auction statistics.')
+    parser.add_argument('--auction', default=summary.DEFAULT_AUCTION,
+                        help='name of the auction in the registry')
+    data_dir = summary.auction_data_dir(parser.parse_args().auction)
+    print(summary.format_summary(summary.load(data_dir)))
@@ -0,0 +1,182 @@
+"""Parquet storage of bids, transactions and receipts.
+
+The loaders return the dataframes the analysis scripts work with: amounts in ETH, addresses and
+hashes as hex strings and senders as categorical.
+"""
+import os
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from events import to_hex
+
+
+DATA_DIR = 'data'
+
+BIDS = 'bids'
+TXS = 'txs'
+RECEIPTS = 'receipts'
+
+CHECKPOINT_FILENAME = 'checkpoint.json'
+PARAMETERS_FILENAME = 'parameters.json'
+
+ADDRESS = pa.binary(20)
+HASH = pa.binary(32)
+WEI = pa.decimal128(38, 0)
+
+SCHEMAS = {
+    BIDS: pa.schema([
+        ('txhash', HASH),
+        ('block', pa.int64()),
+        ('time', pa.int64()),
+        ('sender', ADDRESS),
+        ('amount', WEI),
+        ('missing', WEI),
+    ]),
+    TXS: pa.schema([
+        ('hash', HASH),
+        ('blockNumber', pa.int64()),
+        ('from', ADDRESS),
+        ('to', ADDRESS),
+        ('nonce', pa.int64()),
+        ('gas', pa.int64()),
+        ('gasPrice', pa.int64()),
+        ('value', WEI),
+        ('input', pa.binary()),
+    ]),
+    RECEIPTS: pa.schema([
+        ('transactionHash', HASH),
+        ('blockNumber', pa.int64()),
+        ('gasUsed', pa.int64()),
+        ('cumulativeGasUsed', pa.int64()),
+        ('status', pa.int8()),
+    ]),
+}
+
+# column to use as index of the loaded dataframes
+INDEX_COLUMNS = {
+    TXS: 'hash',
+    RECEIPTS: 'transactionHash',
+}
+
+# column holding the block number of each row
+BLOCK_COLUMNS = {
+    BIDS: 'block',
+    TXS: 'blockNumber',
+    RECEIPTS: 'blockNumber',
+}
+
+
+def path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, name + '.parquet')
+
+
+def checkpoint_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, CHECKPOINT_FILENAME)
+
+
+def parameters_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, PARAMETERS_FILENAME)
+
+
+def exists(data_dir=DATA_DIR):
+    return all(os.path.exists(path(name, data_dir)) for name in SCHEMAS)
+
+
+def hex_to_bytes(value):
+    # string columns hold missing values as NaN
+    if value is None or pd.isna(value):
+        return None
+    return bytes.fromhex(value[2:])
+
+
+def to_arrow(values, arrow_type):
+    values = list(values)
+    if arrow_type == WEI:
+        values = [None if value is None else Decimal(int(value)) for value in values]
+    elif pa.types.is_binary(arrow_type) or pa.types.is_fixed_size_binary(arrow_type):
+        values = [hex_to_bytes(value) for value in values]
+    return pa.array(values, arrow_type)
+
+
+def to_table(name, df):
+    """Convert a dataframe as produced by fetch.py (hex strings, int wei) to an arrow table."""
+    df = df.reset_index()
+    schema = SCHEMAS[name]
+    if len(df) == 0:
+        return schema.empty_table()
+    columns = [to_arrow(df[field.name], field.type) for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write(name, table, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    pq.write_table(table, path(name, data_dir))
+
+
+def read_table(name, columns=None, data_dir=DATA_DIR):
+    return pq.read_table(path(name, data_dir), columns=columns)
+
+
+def truncate(name, table, block_number):
+    """Drop all rows after the given block."""
+    return table.filter(pc.less_equal(table[BLOCK_COLUMNS[name]], block_number))
+
+
+def wei_to_ether(column):
+    """Convert a decimal128 wei column to float ETH without going through Python objects."""
+    if len(column) == 0:
+        return np.zeros(0)
+    array = pa.concat_arrays(column.chunks) if isinstance(column, pa.ChunkedArray) else column
+    # decimal128 values are stored as little endian 128 bit integers
+    limbs = np.frombuffer(array.buffers()[1], dtype='<u8')
+    limbs = limbs[2 * array.offset:2 * (array.offset + len(array))].reshape(-1, 2)
+    low = limbs[:, 0].astype(np.float64)
+    high = limbs[:, 1].view('<i8').astype(np.float64)
+    return (high * 2.0**64 + low) / 1e18
+
+
+def to_hex_categorical(values):
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, to_hex(uniques))
+
+
+def to_frame(name, table):
+    schema = SCHEMAS[name]
+    data = {}
+    for column_name in table.column_names:
+        column = table[column_name]
+        arrow_type = schema.field(column_name).type
+        if arrow_type == WEI:
+            data[column_name] = wei_to_ether(column)
+        elif column_name == 'sender':
+            data[column_name] = to_hex_categorical(column.to_numpy(zero_copy_only=False))
+        elif pa.types.is_fixed_size_binary(arrow_type) or pa.types.is_binary(arrow_type):
+            data[column_name] = to_hex(column.to_pylist())
+        else:
+            data[column_name] = column.to_pandas()
+    df = pd.DataFrame(data, columns=table.column_names)
+    index_column = INDEX_COLUMNS.get(name)
+    if index_column in df.columns:
+        df = df.set_index(index_column)
+    return df
+
+
+def load(name, columns=None, data_dir=DATA_DIR):
+    return to_frame(name, read_table(name, columns, data_dir))
+
+
+def load_bids(columns=None, data_dir=DATA_DIR):
+    return load(BIDS, columns, data_dir)
+
+
+def load_txs(columns=None, data_dir=DATA_DIR):
+    return load(TXS, columns, data_dir)
+
+
+def load_receipts(columns=None, data_dir=DATA_DIR):
+    return load(RECEIPTS, columns, data_dir)
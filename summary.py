@@ -0,0 +1,101 @@
+"""Snapshot of the headline statistics of an auction, written by fetch.py.
+
+Reading the snapshot needs only the standard library, so `python cli.py summary` returns within
+milliseconds. The pandas based modules are imported only to recompute the statistics when the
+datasets have changed since the snapshot was written.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+
+# store.DATA_DIR, auctions.DEFAULT_AUCTION and auctions.KYC_LIMIT, not imported to not load
+# pandas and pyarrow
+DATA_DIR = 'data'
+DEFAULT_AUCTION = 'rdn'
+KYC_LIMIT = 2.5  # ETH
+
+SUMMARY_FILENAME = 'summary.json'
+
+
+def path(data_dir):
+    return os.path.join(data_dir, SUMMARY_FILENAME)
+
+
+def auction_data_dir(auction_name):
+    return os.path.join(DATA_DIR, auction_name)
+
+
+def file_states(paths):
+    """Size and modification time of each file, to tell if it changed."""
+    states = {}
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            states[file_path] = None
+        else:
+            states[file_path] = [stat.st_size, stat.st_mtime_ns]
+    return states
+
+
+def compute(data_dir, start_time):
+    import aggregates
+    from concentration import Concentration
+
+    bidders = aggregates.load_bidders(data_dir)
+    concentration = Concentration.from_totals(bidders['amount'])
+    return {
+        'total_raised': float(bidders['amount'].sum()),
+        'participants': len(bidders),
+        'above_kyc_limit': int((bidders['amount'] > KYC_LIMIT).sum()),
+        'newest_bid': int(start_time + bidders['last_bid'].max()) if len(bidders) else None,
+        'gini': float(concentration.gini()),
+        'top_10_percent_share': float(concentration.top_share(0.1)),
+    }
+
+
+def write(data_dir, start_time):
+    """Compute the statistics of the stored datasets and write them as snapshot."""
+    import store
+
+    sources = [store.path(name, data_dir) for name in store.SCHEMAS]
+    sources.append(store.checkpoint_path(data_dir))
+    # taken before computing, so changes in the meantime make the snapshot outdated
+    states = file_states(sources)
+    snapshot = compute(data_dir, start_time)
+    snapshot['sources'] = states
+    with open(path(data_dir), 'w') as f:
+        json.dump(snapshot, f)
+    return snapshot
+
+
+def load(data_dir):
+    """Get the snapshot of an auction, recomputed if the datasets changed since it was written."""
+    try:
+        with open(path(data_dir)) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        snapshot = None
+    if snapshot is None or file_states(snapshot['sources']) != snapshot['sources']:
+        import store
+
+        with open(store.checkpoint_path(data_dir)) as f:
+            start_time = json.load(f)['start_time']
+        snapshot = write(data_dir, start_time)
+    return snapshot
+
+
+def format_summary(snapshot):
+    newest_bid = snapshot['newest_bid']
+    if newest_bid is not None:
+        newest_bid = datetime.fromtimestamp(newest_bid, timezone.utc)
+        newest_bid = newest_bid.strftime('%Y-%m-%d %H:%M:%S')
+    return '\n'.join([
+        'total raised: {} ETH'.format(snapshot['total_raised']),
+        'unique participants: {}'.format(snapshot['participants']),
+        'bid > {}: {}'.format(KYC_LIMIT, snapshot['above_kyc_limit']),
+        'newest analyzed bid: {}'.format(newest_bid),
+        'Gini coefficient: {:.4f}'.format(snapshot['gini']),
+        'top 10% share: {:.4f}'.format(snapshot['top_10_percent_share']),
+    ])
@@ -0,0 +1,174 @@
+"""Generate synthetic auction datasets for benchmarks and offline testing.
+
+Run with `python synthetic.py --data-dir data/synthetic` and add the auction to `auctions.json`
+with the printed address and creation block to analyze it like a fetched one.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import dutch_auction
+import store
+
+
+BLOCK_TIME = 15  # seconds
+START_TIME = 1508341187
+START_BLOCK = 4383437
+AUCTION_ADDRESS = '0x' + 'a0' * 20
+# selector of `bid()`
+BID_INPUT = '0x1998aeef'
+BID_GAS = 100000
+BID_GAS_USED = 56000
+# gas limit of failed transactions that run out of gas
+LOW_GAS = 21500
+
+TIME_PROFILES = ['uniform', 'front', 'ends']
+
+# price function of the RDN auction
+PRICE_START = 2 * 10**18
+PRICE_CONSTANT = 1574640000
+PRICE_EXPONENT = 3
+TOKEN_MULTIPLIER = 10**18
+
+
+def random_hex(random, n, n_bytes):
+    words = random.randint(0, 256, (n, n_bytes), dtype=np.uint8)
+    return np.array(['0x' + row.tobytes().hex() for row in words], dtype=object)
+
+
+def random_times(random, n, duration, time_profile):
+    """Seconds since the start, with most bids at the beginning for the `front` profile and at
+    the beginning and the end for `ends`."""
+    if time_profile == 'uniform':
+        fractions = random.uniform(0, 1, n)
+    elif time_profile == 'front':
+        fractions = np.minimum(random.exponential(0.15, n), 1)
+    elif time_profile == 'ends':
+        fractions = random.beta(0.3, 0.3, n)
+    else:
+        raise ValueError('unknown time profile {}'.format(time_profile))
+    return np.sort((fractions * duration).astype(np.int64))
+
+
+def generate(n_bids=10000, n_bidders=None, duration=10 * 24 * 60 * 60, pareto_shape=1.2,
+             min_amount=0.1, time_profile='front', failure_rate=0.05, seed=0):
+    """Generate bids, transactions and receipts in the format produced by fetch.py.
+
+    Bidders place bids with frequencies following a Zipf law and amounts following a Pareto
+    distribution with the given shape, starting at `min_amount` ETH. `failure_rate` is the
+    fraction of transactions to the auction that fail (without a bid event).
+    """
+    random = np.random.RandomState(seed)
+    if n_bidders is None:
+        n_bidders = max(n_bids // 3, 1)
+    senders = random_hex(random, n_bidders, 20)
+    n_failed = int(round(n_bids * failure_rate / (1 - failure_rate)))
+    n_txs = n_bids + n_failed
+
+    weights = 1 / np.arange(1, n_bidders + 1)
+    tx_senders = senders[random.choice(n_bidders, n_txs, p=weights / weights.sum())]
+    blocks = START_BLOCK + random_times(random, n_txs, duration, time_profile) // BLOCK_TIME
+    failed = np.zeros(n_txs, bool)
+    failed[random.choice(n_txs, n_failed, replace=False)] = True
+    # amounts in GWei, to be exact in wei
+    amounts = ((random.pareto(pareto_shape, n_txs) + 1) * min_amount * 1e9).astype(np.int64)
+    amounts[failed & (random.uniform(0, 1, n_txs) < 0.5)] = 0
+    values = [int(amount) * 10**9 for amount in amounts]
+    hashes = random_hex(random, n_txs, 32)
+
+    out_of_gas = failed & (amounts > 0)
+    gas = np.where(out_of_gas, LOW_GAS, BID_GAS)
+    gas_used = np.where(out_of_gas, LOW_GAS, np.where(failed, BID_GAS, BID_GAS_USED))
+    txs = pd.DataFrame({
+        'hash': hashes,
+        'blockNumber': blocks,
+        'from': tx_senders,
+        'to': AUCTION_ADDRESS,
+        'nonce': pd.Series(tx_senders).groupby(tx_senders).cumcount().values,
+        'gas': gas,
+        'gasPrice': random.randint(1, 100, n_txs) * 10**9,
+        'value': values,
+        'input': BID_INPUT,
+    }).set_index('hash')
+    receipts = pd.DataFrame({
+        'transactionHash': hashes,
+        'blockNumber': blocks,
+        'gasUsed': gas_used,
+        'cumulativeGasUsed': gas_used,
+        'status': np.where(failed, 0, 1),
+    }).set_index('transactionHash')
+    succeeded = ~failed
+    bids = pd.DataFrame({
+        'amount': [value for value, ok in zip(values, succeeded) if ok],
+        'missing': 0,
+        'sender': tx_senders[succeeded],
+        'block': blocks[succeeded],
+        'txhash': hashes[succeeded],
+        'time': (blocks[succeeded] - START_BLOCK) * BLOCK_TIME,
+    })
+    return bids, txs, receipts
+
+
+def block_timestamp(block_number):
+    return START_TIME + (block_number - START_BLOCK) * BLOCK_TIME
+
+
+def auction_parameters(bids):
+    """Parameters of the auction as fetch.py stores them, with the number of tokens such that the
+    auction ends with the last bid."""
+    parameters = dutch_auction.Parameters(PRICE_START, PRICE_CONSTANT, PRICE_EXPONENT,
+                                          TOKEN_MULTIPLIER, 0)._asdict()
+    received = sum(int(amount) for amount in bids['amount'])
+    last_time = int(bids['time'].max()) if len(bids) else 0
+    end_price = dutch_auction.price_exact(dutch_auction.Parameters(**parameters), last_time)
+    parameters['num_tokens_auctioned'] = received * TOKEN_MULTIPLIER // end_price
+    parameters['final_price'] = (TOKEN_MULTIPLIER * received //
+                                 max(parameters['num_tokens_auctioned'], 1))
+    return parameters
+
+
+def write(bids, txs, receipts, data_dir):
+    """Store the datasets, a checkpoint and the auction parameters as fetch.py does."""
+    for name, df in [(store.BIDS, bids), (store.TXS, txs), (store.RECEIPTS, receipts)]:
+        store.write(name, store.to_table(name, df), data_dir)
+    last_block = int(txs['blockNumber'].max()) if len(txs) else START_BLOCK
+    checkpoint = {
+        'block': last_block,
+        'hash': '0x{:064x}'.format(last_block),
+        'start_time': START_TIME,
+    }
+    with open(store.checkpoint_path(data_dir), 'w') as f:
+        json.dump(checkpoint, f)
+    with open(store.parameters_path(data_dir), 'w') as f:
+        json.dump(auction_parameters(bids), f)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate a synthetic auction.')
+    parser.add_argument('--data-dir', default=os.path.join(store.DATA_DIR, 'synthetic'),
+                        help='directory to write the datasets to')
+    parser.add_argument('--bids', type=int, default=10000, help='number of bids')
+    parser.add_argument('--bidders', type=int, default=None,
+                        help='number of bidders (default: a third of the bids)')
+    parser.add_argument('--days', type=float, default=10, help='duration of the auction')
+    parser.add_argument('--pareto-shape', type=float, default=1.2,
+                        help='shape of the bid amount distribution, smaller is heavier tailed')
+    parser.add_argument('--time-profile', choices=TIME_PROFILES, default='front',
+                        help='distribution of the bids over time')
+    parser.add_argument('--failure-rate', type=float, default=0.05,
+                        help='fraction of failed transactions')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    datasets = generate(args.bids, args.bidders, int(args.days * 24 * 60 * 60),
+                        args.pareto_shape, time_profile=args.time_profile,
+                        failure_rate=args.failure_rate, seed=args.seed)
+    write(*datasets, args.data_dir)
+    print('wrote {} bids to {}'.format(args.bids, args.data_dir))
+    print('auction address {}, creation block {}'.format(AUCTION_ADDRESS, START_BLOCK - 1))
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# the modules are not a package, they are imported from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def auction_data():
+    """Bids, transactions and receipts of a small synthetic auction."""
+    return synthetic.generate(2000, failure_rate=0.2)
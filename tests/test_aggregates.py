@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import store
+import synthetic
+from bid_table import BidTable
+
+
+def expected_bidders(bids, txs, receipts):
+    """Aggregates computed with a plain groupby."""
+    groups = bids.groupby(bids['sender'].astype(str))
+    expected = pd.DataFrame({
+        'amount': groups['amount'].sum(),
+        'n_bids': groups.size(),
+        'first_bid': groups['time'].min(),
+        'last_bid': groups['time'].max(),
+    })
+    failed = txs.loc[receipts.index[receipts['status'] == 0], 'from']
+    expected['n_failed'] = failed.value_counts().reindex(expected.index, fill_value=0)
+    return expected
+
+
+def check_bidders(bidders, expected):
+    bidders = bidders.set_axis(bidders.index.astype(str)).sort_index()
+    assert list(bidders.index) == list(expected.index)
+    assert np.allclose(bidders['amount'], expected['amount'], rtol=1e-12)
+    assert np.allclose(bidders['percentage'], expected['amount'] / expected['amount'].sum())
+    for column in ['n_bids', 'first_bid', 'last_bid', 'n_failed']:
+        assert list(bidders[column]) == list(expected[column])
+
+
+def test_aggregate_bidders_matches_groupby(tmp_path, auction_data):
+    bids, txs, receipts = auction_data
+    data_dir = str(tmp_path)
+    synthetic.write(bids, txs, receipts, data_dir)
+    bids = store.load_bids(data_dir=data_dir)
+    txs = store.load_txs(data_dir=data_dir)
+    receipts = store.load_receipts(data_dir=data_dir)
+    expected = expected_bidders(bids, txs, receipts)
+    assert expected['n_failed'].sum() > 0
+
+    check_bidders(aggregates.aggregate_bidders(bids, txs, receipts), expected)
+    check_bidders(aggregates.aggregate_bidders(BidTable.load(data_dir=data_dir), txs, receipts),
+                  expected)
+    without_failures = aggregates.aggregate_bidders(bids)
+    assert 'n_failed' not in without_failures.columns
+
+
+def test_load_bidders_is_recomputed_for_new_data(tmp_path, auction_data):
+    bids, txs, receipts = auction_data
+    data_dir = str(tmp_path)
+    synthetic.write(bids, txs, receipts, data_dir)
+    first = aggregates.load_bidders(data_dir)
+    assert os.path.exists(store.path(aggregates.BIDDERS, data_dir))
+    assert aggregates.load_bidders(data_dir) is first
+
+    # reading the persisted aggregates gives the same result
+    aggregates._memo.clear()
+    persisted = aggregates.load_bidders(data_dir)
+    assert np.allclose(persisted['amount'], first['amount'])
+    assert list(persisted['n_failed']) == list(first['n_failed'])
+
+    half = bids.iloc[:len(bids) // 2]
+    store.write(store.BIDS, store.to_table(store.BIDS, half), data_dir)
+    assert aggregates.load_bidders(data_dir)['n_bids'].sum() == len(half)
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+import async_rpc
+import mock_rpc
+import rpc
+import synthetic
+
+
+@pytest.fixture
+def chain(auction_data):
+    bids, txs, receipts = auction_data
+    return mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                              synthetic.START_TIME, synthetic.START_BLOCK)
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    rpc.set_cache(None)
+
+
+def fetch(url, calls, **options):
+    async def run():
+        async with async_rpc.AsyncClient(url, **options) as client:
+            return await client.batch_call(calls)
+    return asyncio.run(run())
+
+
+def receipt_calls(auction_data, count=40):
+    _, txs, _ = auction_data
+    return [('eth_getTransactionReceipt', [txhash]) for txhash in txs.index[:count]]
+
+
+def test_client_retries_transient_errors(chain, auction_data):
+    calls = receipt_calls(auction_data)
+    with mock_rpc.serve(chain) as url:
+        expected = rpc.batch_call(calls, url=url)
+    faults = mock_rpc.Faults(http_error_rate=0.2, rpc_error_rate=0.05, seed=0)
+    with mock_rpc.serve(chain, faults=faults) as url:
+        assert fetch(url, calls, batch_size=5, backoff=0) == expected
+    assert faults.stats['http_errors'] > 0 and faults.stats['rpc_errors'] > 0
+
+
+def test_client_gives_up_after_retries(chain, auction_data):
+    calls = receipt_calls(auction_data, 3)
+    faults = mock_rpc.Faults(http_error_rate=1)
+    with mock_rpc.serve(chain, faults=faults) as url:
+        with pytest.raises(aiohttp.ClientResponseError):
+            fetch(url, calls, retries=2, backoff=0)
+    assert faults.stats['requests'] == 3
+
+
+def test_client_does_not_retry_permanent_errors(chain):
+    faults = mock_rpc.Faults()
+    with mock_rpc.serve(chain, faults=faults) as url:
+        with pytest.raises(rpc.RPCError):
+            fetch(url, [('eth_unknownMethod', [])], retries=3, backoff=0)
+    assert faults.stats['requests'] == 1
+
+
+def test_client_respects_rate_limit(chain, auction_data):
+    calls = receipt_calls(auction_data, 10)
+    faults = mock_rpc.Faults(rate_limit=20)
+    with mock_rpc.serve(chain, faults=faults) as url:
+        start = time.monotonic()
+        fetch(url, calls, batch_size=1, rate_limit=20, retries=0)
+        elapsed = time.monotonic() - start
+    # the first request goes out immediately, the others 1/20 s apart
+    assert elapsed >= 9 / 20
+    assert faults.stats['rate_limited'] == 0
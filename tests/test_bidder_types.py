@@ -0,0 +1,48 @@
+import asyncio
+
+import async_rpc
+import bidder_types
+import mock_rpc
+import rpc
+import synthetic
+
+
+WALLET_ADDRESS = '0x' + 'c' * 40
+WALLET_CODE = '0x6080604052600436'
+
+
+def test_classify():
+    wallet_hash = bidder_types.code_hash(WALLET_CODE)
+    contract_hash = bidder_types.code_hash(mock_rpc.CONTRACT_CODE)
+    senders = ['0x' + str(i) * 40 for i in range(4)]
+    hashes = [bidder_types.EMPTY_CODE_HASH, contract_hash, wallet_hash, contract_hash]
+    types = bidder_types.classify(senders, hashes, {wallet_hash: 'multisig wallet'})
+    assert list(types.index) == senders
+    assert list(types['type']) == [bidder_types.EOA, bidder_types.CONTRACT, 'multisig wallet',
+                                   bidder_types.CONTRACT]
+    assert list(types['code_hash']) == hashes
+
+
+def test_fetch_bidder_types_from_mock_node(auction_data):
+    rpc.set_cache(None)
+    bids, txs, receipts = auction_data
+    senders = [str(sender) for sender in bids['sender'].unique()]
+    codes = mock_rpc.contract_codes(senders, 0.2)
+    wallets = [sender for sender in senders if sender not in codes][:5]
+    codes.update({sender: WALLET_CODE for sender in wallets})
+    codes[WALLET_ADDRESS] = WALLET_CODE
+    chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                               synthetic.START_TIME, synthetic.START_BLOCK, codes=codes)
+
+    async def fetch(url):
+        async with async_rpc.AsyncClient(url) as client:
+            return await bidder_types.fetch_bidder_types(
+                client, senders, chain.head, {'multisig wallet': WALLET_ADDRESS})
+
+    with mock_rpc.serve(chain) as url:
+        types = asyncio.run(fetch(url))
+    expected = [bidder_types.EOA if sender not in codes else
+                'multisig wallet' if sender in wallets else bidder_types.CONTRACT
+                for sender in senders]
+    assert list(types['type']) == expected
+    assert types['type'].value_counts()['multisig wallet'] == len(wallets)
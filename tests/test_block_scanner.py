@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+import async_rpc
+import block_scanner
+import mock_rpc
+import rpc
+import synthetic
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    rpc.set_cache(None)
+
+
+@pytest.mark.parametrize('from_block, to_block, shards', [(0, 99, 8), (10, 12, 8), (5, 5, 3),
+                                                          (1, 1000, 7)])
+def test_shard_ranges_cover_range(from_block, to_block, shards):
+    ranges = block_scanner.shard_ranges(from_block, to_block, shards)
+    assert len(ranges) == min(shards, to_block - from_block + 1)
+    assert ranges[0][0] == from_block and ranges[-1][1] == to_block
+    for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+        assert start == end + 1
+    assert block_scanner.shard_ranges(from_block, from_block - 1, shards) == []
+
+
+@pytest.mark.parametrize('shards, chunk_size', [(1, 100), (3, 7), (8, 1000)])
+def test_scan_transactions_finds_transactions_to_address(auction_data, shards, chunk_size):
+    bids, txs, receipts = auction_data
+    # some transactions to other contracts, which are skipped
+    txs = txs.copy()
+    txs.iloc[::10, txs.columns.get_loc('to')] = '0x' + 'b' * 40
+    chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                               synthetic.START_TIME, synthetic.START_BLOCK)
+    from_block = int(txs['blockNumber'].quantile(0.2))
+    to_block = int(txs['blockNumber'].quantile(0.7))
+
+    async def scan(url):
+        async with async_rpc.AsyncClient(url) as client:
+            # addresses are compared without case
+            address = '0x' + synthetic.AUCTION_ADDRESS[2:].upper()
+            return await block_scanner.scan_transactions(client, address, from_block, to_block,
+                                                         shards, chunk_size)
+
+    with mock_rpc.serve(chain) as url:
+        found_txs, found_receipts = asyncio.run(scan(url))
+    expected = txs[(txs['to'] == synthetic.AUCTION_ADDRESS) &
+                   (txs['blockNumber'] >= from_block) & (txs['blockNumber'] <= to_block)]
+    assert sorted(tx['hash'] for tx in found_txs) == sorted(expected.index)
+    blocks = [tx['blockNumber'] for tx in found_txs]
+    assert blocks == sorted(blocks)
+    assert [receipt['transactionHash'] for receipt in found_receipts] == [
+        tx['hash'] for tx in found_txs]
@@ -0,0 +1,55 @@
+from multiprocessing import Pool
+
+import numpy as np
+import pytest
+
+import block_times
+
+
+def blocks(worker):
+    return np.concatenate([np.arange(start, start + 50)
+                           for start in range(worker * 1000, 2000000, 70000)])
+
+
+def update(args):
+    path, worker = args
+    index = block_times.BlockTimes(path, finalized_block=10**9)
+    for chunk in np.array_split(blocks(worker), 29):
+        index.update(chunk, chunk + 1)
+
+
+def test_concurrent_growth_keeps_timestamps(tmp_path):
+    path = str(tmp_path / block_times.BLOCK_TIMES_FILENAME)
+    with Pool(4) as pool:
+        # fails instead of hanging if a worker breaks the index
+        pool.map_async(update, [(path, worker) for worker in range(8)]).get(timeout=60)
+    index = block_times.BlockTimes(path)
+    expected = np.concatenate([blocks(worker) for worker in range(8)])
+    assert np.array_equal(index.lookup(expected), expected + 1)
+
+
+def test_recent_blocks_are_not_stored(tmp_path):
+    index = block_times.BlockTimes(str(tmp_path / 'times.npy'), finalized_block=100)
+    index.update([50, 150], [1000, 2000])
+    assert list(index.lookup([50, 150])) == [1000, 0]
+    assert list(index.missing([50, 150, 200])) == [150, 200]
+
+
+def test_estimate_interpolates_and_extrapolates(tmp_path):
+    index = block_times.BlockTimes(str(tmp_path / 'times.npy'), finalized_block=10**6)
+    # 15 seconds per block between the stored blocks
+    index.update([100, 200, 300], [10000, 11500, 13000])
+    estimate = index.estimate([100, 150, 250, 300, 50, 400])
+    assert list(estimate) == [10000, 10750, 12250, 13000, 9250, 14500]
+    # stored timestamps are returned as they are
+    index.update([150], [10800])
+    assert index.estimate([150])[0] == 10800
+
+
+def test_estimate_needs_stored_timestamps(tmp_path):
+    index = block_times.BlockTimes(str(tmp_path / 'times.npy'))
+    with pytest.raises(ValueError):
+        index.estimate([1])
+    index = block_times.BlockTimes(str(tmp_path / 'times.npy'), finalized_block=10**6)
+    index.update([10], [1000])
+    assert list(index.estimate([5, 10, 20])) == [1000, 1000, 1000]
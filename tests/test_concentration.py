@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from concentration import Concentration
+
+
+def gini(totals):
+    totals = np.asarray(totals, dtype=np.float64)
+    differences = np.abs(totals[:, None] - totals[None, :]).sum() / 2
+    return differences / (len(totals) * totals.sum())
+
+
+def top_share(totals, fraction):
+    totals = np.sort(totals)[::-1]
+    return totals[:int(round(len(totals) * fraction))].sum() / totals.sum()
+
+
+def random_totals(n, seed=0):
+    random = np.random.RandomState(seed)
+    # whole GWei, which the concentration stores exactly
+    return np.round((random.pareto(1.2, n) + 1) * 0.1, 9)
+
+
+def test_gini_and_top_share():
+    totals = random_totals(500)
+    concentration = Concentration.from_totals(dict(enumerate(totals)))
+    assert concentration.gini() == pytest.approx(gini(totals), rel=1e-9)
+    for fraction in [0.01, 0.1, 0.5, 1]:
+        assert concentration.top_share(fraction) == pytest.approx(top_share(totals, fraction),
+                                                                  rel=1e-9)
+
+
+def test_updates():
+    totals = random_totals(300)
+    concentration = Concentration.from_totals(dict(enumerate(totals)))
+    random = np.random.RandomState(1)
+    for bidder in random.randint(0, len(totals) + 50, 200):
+        amount = round(random.uniform(0, 10), 9)
+        if bidder < len(totals):
+            totals[bidder] += amount
+        else:
+            totals = np.append(totals, amount)
+            bidder = len(totals) - 1
+        concentration.add(bidder, amount)
+    assert concentration.gini() == pytest.approx(gini(totals), rel=1e-9)
+    assert concentration.top_share(0.1) == pytest.approx(top_share(totals, 0.1), rel=1e-9)
+    assert concentration.total_amount() == pytest.approx(totals.sum())
+
+
+def test_thresholds_and_lorenz_curve():
+    totals = random_totals(200)
+    concentration = Concentration.from_totals(dict(enumerate(totals)))
+    for threshold in [0.1, 0.2, 1, 10]:
+        below = totals <= threshold
+        assert concentration.count_below(threshold) == below.sum()
+        assert concentration.count_above(threshold) == (~below).sum()
+        assert concentration.share_below(threshold) == pytest.approx(
+            totals[below].sum() / totals.sum())
+    x, y = concentration.lorenz_curve()
+    assert np.allclose(x, np.arange(len(totals)) / len(totals))
+    assert np.allclose(y, np.cumsum(np.sort(totals)) / totals.sum())
+
+
+def test_equal_and_empty():
+    assert Concentration().gini() == 0
+    assert Concentration().top_share(0.1) == 0
+    concentration = Concentration.from_totals({i: 2.5 for i in range(10)})
+    assert concentration.gini() == 0
+    assert concentration.top_share(0.3) == pytest.approx(0.3)
+
+
+def test_bulk_build_equals_inserts():
+    totals = dict(enumerate(random_totals(2000, seed=2)))
+    bulk = Concentration.from_totals(totals)
+    inserted = Concentration()
+    for bidder, amount in totals.items():
+        inserted.set(bidder, amount)
+    for threshold in [0.1, 0.5, 3, 100]:
+        assert bulk.count_below(threshold) == inserted.count_below(threshold)
+        assert bulk.share_below(threshold) == inserted.share_below(threshold)
+    assert bulk.gini() == inserted.gini()
+    assert bulk.top_share(0.1) == inserted.top_share(0.1)
+    # the first update builds the trees from the sorted totals
+    bulk.add(3, 1.5)
+    inserted.add(3, 1.5)
+    assert bulk.counts == inserted.counts and bulk.sums == inserted.sums
+    assert bulk.pair_differences == inserted.pair_differences
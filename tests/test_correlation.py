@@ -0,0 +1,36 @@
+import numpy as np
+
+import correlation
+from benchmarks.autocorrelation import calc_autocorrelation_loop, make_bids
+
+
+def loop_autocorrelation(counts, max_lag, window):
+    return np.array([sum(counts[t] * counts[t + lag] for t in range(window))
+                     for lag in range(1, max_lag + 1)])
+
+
+def test_autocorrelation_matches_loop():
+    bids = make_bids(3000, 6 * 60 * 60)
+    expected_lags, expected = calc_autocorrelation_loop(bids)
+    lags, gamma = correlation.autocorrelation(correlation.bin_counts(bids['time'], 60), 119)
+    assert np.array_equal(lags, expected_lags)
+    assert np.array_equal(gamma, expected)
+
+
+def test_normalize():
+    counts = np.random.RandomState(0).poisson(3, 500)
+    _, gamma = correlation.autocorrelation(counts, 20, normalize=True)
+    expected = loop_autocorrelation(counts, 20, 480) / np.sum(counts[:480]**2)
+    assert np.allclose(gamma, expected)
+
+
+def test_segment_autocorrelation():
+    random = np.random.RandomState(0)
+    times = np.sort(random.randint(0, 4 * 60 * 60, 2000))
+    first_half = times < 60 * 60
+    lags, (gamma1, gamma2) = correlation.segment_autocorrelation(
+        times, [first_half, ~first_half], max_lag=30)
+    assert np.array_equal(lags, np.arange(1, 31))
+    for mask, gamma in [(first_half, gamma1), (~first_half, gamma2)]:
+        counts = correlation.bin_counts(times[mask], 60)
+        assert np.array_equal(gamma, loop_autocorrelation(counts, 30, len(counts) - 30))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import downsample
+
+
+def random_walk(n, seed=0):
+    random = np.random.RandomState(seed)
+    return np.arange(n, dtype=np.float64), np.cumsum(random.normal(size=n))
+
+
+@pytest.mark.parametrize('n_points', [3, 10, 500])
+def test_lttb_indices(n_points):
+    x, y = random_walk(10000)
+    indices = downsample.lttb_indices(x, y, n_points)
+    assert len(indices) == n_points
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[[100, 500, 900]] = [5, -7, 9]
+    indices = downsample.lttb_indices(x, y, 50)
+    assert {100, 500, 900} <= set(indices)
+
+
+def test_lttb_with_datetimes():
+    x = np.datetime64('2017-10-18') + np.arange(1000) * np.timedelta64(1, 'm')
+    _, y = random_walk(1000)
+    assert len(downsample.lttb_indices(x, y, 100)) == 100
+
+
+def test_small_inputs_are_kept():
+    x, y = random_walk(50)
+    assert np.array_equal(downsample.lttb_indices(x, y, 100), np.arange(50))
+    assert np.array_equal(downsample.scatter_indices(x, y, 100), np.arange(50))
+    assert np.array_equal(downsample.minmax_indices(y, 100), np.arange(50))
+
+
+def test_minmax_keeps_extremes():
+    _, y = random_walk(10000)
+    indices = downsample.minmax_indices(y, 200)
+    assert len(indices) <= 200
+    assert np.argmin(y) in indices and np.argmax(y) in indices
+
+
+@pytest.mark.parametrize('log_y', [False, True])
+@pytest.mark.parametrize('n_points, n_extremes', [(1000, 100), (200, 50), (50, 50)])
+def test_scatter_indices(log_y, n_points, n_extremes):
+    random = np.random.RandomState(0)
+    x = np.sort(random.uniform(0, 1e6, 20000))
+    y = random.pareto(1.2, 20000) + 0.1
+    indices = downsample.scatter_indices(x, y, n_points, n_extremes, log_y)
+    assert len(indices) <= n_points
+    assert len(np.unique(indices)) == len(indices)
+    assert set(np.argsort(y)[-n_extremes:]) <= set(indices)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dutch_auction
+import synthetic
+
+
+PARAMETERS = dutch_auction.Parameters(synthetic.PRICE_START, synthetic.PRICE_CONSTANT,
+                                      synthetic.PRICE_EXPONENT, synthetic.TOKEN_MULTIPLIER,
+                                      50000 * synthetic.TOKEN_MULTIPLIER)
+
+
+def replay(parameters, times, amounts):
+    """Bid by bid replay of the contract."""
+    received = 0.0
+    accepted = np.zeros(len(times))
+    previous = 0
+    for i, (time, amount) in enumerate(zip(times, amounts)):
+        needed = float(dutch_auction.funds_needed(parameters, time))
+        if needed <= received:
+            return accepted, dutch_auction._end_time(parameters, received, previous, time)
+        if amount <= needed - received:
+            accepted[i] = amount
+            received += amount
+            if received >= needed:
+                return accepted, time
+        previous = time
+    return accepted, dutch_auction._end_time(parameters, received, times[-1])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_simulate_matches_replay(seed):
+    random = np.random.RandomState(seed)
+    n = random.randint(1, 300)
+    times = np.sort(random.uniform(0, 2e6, n))
+    amounts = random.exponential(random.choice([10, 200, 2000]), n)
+    accepted, summary = dutch_auction.simulate(PARAMETERS, times, amounts)
+    expected, end_time = replay(PARAMETERS, times, amounts)
+    assert np.array_equal(accepted, expected)
+    assert summary['end_time'] == pytest.approx(end_time)
+    assert summary['received'] == pytest.approx(expected.sum())
+    assert summary['accepted_bids'] + summary['rejected_bids'] == n
+
+
+def test_too_large_bids_are_rejected():
+    needed = float(dutch_auction.funds_needed(PARAMETERS, 2000))
+    times = [10, 1000, 2000, 3000]
+    amounts = [100, 10 * needed, needed - 100, 5]
+    accepted, summary = dutch_auction.simulate(PARAMETERS, times, amounts)
+    # the second bid reverts, the third pays the missing funds and ends the auction
+    assert list(accepted) == [100, 0, needed - 100, 0]
+    assert summary['end_time'] == 2000
+    assert summary['received'] == pytest.approx(needed)
+    assert summary['rejected_bids'] == 2
+
+
+def test_no_bids():
+    accepted, summary = dutch_auction.simulate(PARAMETERS, [], [])
+    assert len(accepted) == 0
+    assert summary['end_time'] is None
+
+
+def test_bid_prices_match_price_exact():
+    random = np.random.RandomState(0)
+    times = np.sort(random.randint(0, 2000000, 200))
+    bids = pd.DataFrame({'time': times, 'amount': random.exponential(200, len(times))})
+    prices = dutch_auction.bid_prices(PARAMETERS, bids)
+    exact = np.array([dutch_auction.price_exact(PARAMETERS, time) for time in times])
+    assert np.allclose(prices['price'] * dutch_auction.WEI_PER_ETHER, exact, rtol=1e-12)
+    assert np.allclose(prices['tokens_at_bid'],
+                       bids['amount'] * dutch_auction.WEI_PER_ETHER / exact, rtol=1e-12)
+    # the accepted bids buy all tokens at the final price, which is at most their bid prices
+    assert prices['tokens'].sum() == pytest.approx(dutch_auction.tokens_auctioned(PARAMETERS))
+    accepted = prices['accepted'] > 0
+    assert (prices['tokens'][accepted] >= prices['tokens_at_bid'][accepted] * (1 - 1e-9)).all()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import events
+import fetch
+import mock_rpc
+import rpc
+import synthetic
+
+
+@pytest.fixture(scope='module')
+def chain(auction_data):
+    bids, txs, receipts = auction_data
+    return mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                              synthetic.START_TIME, synthetic.START_BLOCK,
+                              max_logs=len(bids) + 2,
+                              parameters=synthetic.auction_parameters(bids))
+
+
+def decode_word(word, abi_type):
+    """Decode a single 32 byte word given as hex string (without 0x prefix)."""
+    if abi_type == 'address':
+        return '0x' + word[-40:]
+    value = int(word, 16)
+    if abi_type == 'bool':
+        return bool(value)
+    if abi_type.startswith('int'):
+        bits = int(abi_type[3:] or 256)
+        if value >= 2**(bits - 1):
+            value -= 2**bits
+    return value
+
+
+def decode_log(event_abi, log):
+    """Decode the arguments of a raw log log by log, the reference for `events.decode_logs`."""
+    topics = iter(log['topics'][1:])
+    data = log['data'][2:]
+    data_words = iter(data[i:i + 64] for i in range(0, len(data), 64))
+    args = {}
+    for param in event_abi['inputs']:
+        word = next(topics)[2:] if param['indexed'] else next(data_words)
+        args[param['name']] = decode_word(word, param['type'])
+    return args
+
+
+def get_logs(chain, event_abi):
+    logs = chain.eth_getLogs({'topics': [events.event_topic(event_abi)]})
+    return [rpc.format_result(log) for log in logs]
+
+
+@pytest.mark.parametrize('event_abi', [fetch.BID_EVENT, fetch.START_EVENT,
+                                       fetch.DEPLOYED_EVENT])
+def test_decode_logs_matches_decode_log(chain, event_abi):
+    logs = get_logs(chain, event_abi)
+    assert len(logs) > 0
+    decoded = events.decode_logs(event_abi, logs)
+    for param in event_abi['inputs']:
+        values = decoded[param['name']]
+        if param['type'] == 'address':
+            values = events.to_hex(values)
+        elif values.ndim == 2:
+            values = events.to_int(values)
+        expected = [decode_log(event_abi, log)[param['name']] for log in logs]
+        assert [int(v) if param['type'] != 'address' else v for v in values] == expected
+    assert np.array_equal(decoded['blockNumber'], [log['blockNumber'] for log in logs])
+    assert list(events.to_hex(decoded['transactionHash'])) == [log['transactionHash']
+                                                              for log in logs]
+
+
+def test_decode_words_signed():
+    values = [0, 1, -1, 2**100, -2**100, 2**127 - 1, -2**127]
+    words = np.array([list((value % 2**256).to_bytes(32, 'big')) for value in values], np.uint8)
+    decoded = events.to_int(events.decode_words(words, 'int256'), signed=True)
+    assert list(decoded) == values
+    assert [decode_word(bytes(word).hex(), 'int256') for word in words] == values
+    small = events.decode_words(words[:3], 'int64')
+    assert list(small) == [0, 1, -1]
+
+
+def test_decode_words_too_wide():
+    words = np.zeros((1, 32), np.uint8)
+    words[0, 0] = 1
+    with pytest.raises(ValueError):
+        events.decode_words(words, 'uint256')
+
+
+def test_decode_no_logs():
+    decoded = events.decode_logs(fetch.BID_EVENT, [])
+    assert len(decoded['_amount']) == 0
+    assert len(decoded['blockNumber']) == 0
+
+
+def test_to_hex_keeps_trailing_zeros_and_none():
+    values = [b'\x01\x00', b'\x00\xff', b'\x00\x00']
+    assert list(events.to_hex(np.array(values, dtype='S2'))) == ['0x0100', '0x00ff', '0x0000']
+    assert list(events.to_hex(values + [None])) == ['0x0100', '0x00ff', '0x0000', None]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import pytest
+
+import async_rpc
+import auctions
+import fetch
+import mock_rpc
+import rpc
+import store
+import synthetic
+
+
+AUCTION = auctions.Auction('synthetic', synthetic.AUCTION_ADDRESS, synthetic.START_BLOCK - 1)
+
+
+@pytest.fixture
+def node(auction_data):
+    rpc.set_cache(None)
+    bids, txs, receipts = auction_data
+    chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                               synthetic.START_TIME, synthetic.START_BLOCK,
+                               parameters=synthetic.auction_parameters(bids))
+    with mock_rpc.serve(chain) as url:
+        yield chain, url
+
+
+def fetch_auction(url, data_dir, monkeypatch):
+    monkeypatch.setattr(store, 'DATA_DIR', str(data_dir))
+    asyncio.run(fetch.fetch_auction(AUCTION, fetch.parse_args(['--url', url, '--no-cache'])))
+    return store.load_bids(data_dir=auctions.data_dir(AUCTION))
+
+
+def test_save_datasets_truncates_after_checkpoint(tmp_path, monkeypatch, auction_data):
+    monkeypatch.setattr(store, 'DATA_DIR', str(tmp_path))
+    auction = auctions.Auction('synthetic', synthetic.AUCTION_ADDRESS, synthetic.START_BLOCK)
+    data_dir = auctions.data_dir(auction)
+    bids, txs, receipts = auction_data
+    synthetic.write(bids, txs, receipts, data_dir)
+
+    # the blocks after the checkpoint were reorganized, their bids are fetched again
+    checkpoint_block = int(bids['block'].median())
+    new_bids = bids[bids['block'] > checkpoint_block].iloc[::2]
+    new_txs = txs[txs['blockNumber'] > checkpoint_block].iloc[::2]
+    new_receipts = receipts[receipts.index.isin(new_txs.index)]
+    fetch.save_datasets(auction, new_bids, new_receipts, new_txs, checkpoint_block)
+
+    stored_bids = store.load_bids(data_dir=data_dir)
+    expected = bids[bids['block'] <= checkpoint_block]
+    assert len(stored_bids) == len(expected) + len(new_bids)
+    assert list(stored_bids['txhash']) == list(expected['txhash']) + list(new_bids['txhash'])
+    stored_txs = store.load_txs(data_dir=data_dir)
+    assert list(stored_txs.index) == (list(txs.index[txs['blockNumber'] <= checkpoint_block]) +
+                                      list(new_txs.index))
+    stored_receipts = store.load_receipts(data_dir=data_dir)
+    assert set(stored_receipts.index) == set(stored_txs.index)
+
+
+def test_save_datasets_without_checkpoint_replaces(tmp_path, monkeypatch, auction_data):
+    monkeypatch.setattr(store, 'DATA_DIR', str(tmp_path))
+    auction = auctions.Auction('synthetic', synthetic.AUCTION_ADDRESS, synthetic.START_BLOCK)
+    bids, txs, receipts = auction_data
+    synthetic.write(bids, txs, receipts, auctions.data_dir(auction))
+    fetch.save_datasets(auction, bids[:10], receipts[:10], txs[:10])
+    assert len(store.load_bids(data_dir=auctions.data_dir(auction))) == 10
+
+
+def test_fetch_auction_continues_from_checkpoint(tmp_path, monkeypatch, node, auction_data):
+    chain, url = node
+    bids, _, _ = auction_data
+    head = chain.head
+    expected = fetch_auction(url, tmp_path / 'full', monkeypatch)
+
+    chain.head = int(bids['block'].median())
+    fetch_auction(url, tmp_path / 'incremental', monkeypatch)
+    checkpoint = fetch.load_checkpoint(AUCTION)
+    assert checkpoint['block'] == chain.head - fetch.CONFIRMATIONS
+    assert checkpoint['start_time'] == synthetic.START_TIME
+    chain.head = head
+    stored = fetch_auction(url, tmp_path / 'incremental', monkeypatch)
+    assert list(stored['txhash']) == list(expected['txhash'])
+    assert list(stored['time']) == list(expected['time'])
+    assert fetch.load_checkpoint(AUCTION)['block'] == head - fetch.CONFIRMATIONS
+
+
+def test_fetch_auction_refetches_after_reorg(tmp_path, monkeypatch, node, auction_data, capsys):
+    chain, url = node
+    bids, _, _ = auction_data
+    head = chain.head
+    expected = fetch_auction(url, tmp_path / 'full', monkeypatch)
+
+    chain.head = int(bids['block'].median())
+    fetch_auction(url, tmp_path / 'reorg', monkeypatch)
+    # pretend the checkpoint block was replaced by another one
+    checkpoint = fetch.load_checkpoint(AUCTION)
+    fetch.save_checkpoint(AUCTION, {'number': checkpoint['block'], 'hash': '0x' + '1' * 64},
+                          checkpoint['start_time'])
+    chain.head = head
+    stored = fetch_auction(url, tmp_path / 'reorg', monkeypatch)
+    assert 'not canonical anymore' in capsys.readouterr().out
+    assert list(stored['txhash']) == list(expected['txhash'])
+    with open(store.checkpoint_path(auctions.data_dir(AUCTION))) as f:
+        assert json.load(f)['hash'] == mock_rpc.block_hash(head - fetch.CONFIRMATIONS)
+
+
+def test_fetch_auction_reads_only_the_final_price_again(tmp_path, monkeypatch, node,
+                                                        auction_data):
+    chain, url = node
+    bids, _, _ = auction_data
+    expected = synthetic.auction_parameters(bids)
+    assert fetch.fetch_parameters(AUCTION, url=url) == expected
+
+    chain.parameters['final_price'] = 0
+    fetch_auction(url, tmp_path, monkeypatch)
+    assert fetch.load_parameters(AUCTION) == dict(expected, final_price=0)
+    # the constants are not read again, so changing them has no effect
+    chain.parameters['final_price'] = expected['final_price']
+    chain.parameters['price_start'] += 1
+    fetch_auction(url, tmp_path, monkeypatch)
+    assert fetch.load_parameters(AUCTION) == expected
+
+
+def test_fetch_all_scanning_blocks_keeps_bids_through_contracts(auction_data):
+    rpc.set_cache(None)
+    bids, txs, receipts = auction_data
+    # bids sent through a wallet contract are transactions to the wallet
+    txs = txs.copy()
+    forwarded = bids['txhash'][::7]
+    txs.loc[forwarded, 'to'] = '0x' + 'b' * 40
+    chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                               synthetic.START_TIME, synthetic.START_BLOCK)
+
+    async def fetch_all(url):
+        async with async_rpc.AsyncClient(url) as client:
+            return await fetch.fetch_all(client, AUCTION, AUCTION.creation_block, chain.head,
+                                         scan_blocks=True)
+
+    with mock_rpc.serve(chain) as url:
+        _, fetched_receipts, fetched_txs, _ = asyncio.run(fetch_all(url))
+    assert set(fetched_txs.index) == set(txs.index)
+    assert set(fetched_receipts.index) == set(txs.index)
+    assert list(fetched_txs['blockNumber']) == sorted(fetched_txs['blockNumber'])
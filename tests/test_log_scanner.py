@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+import events
+import fetch
+import log_scanner
+import mock_rpc
+import rpc
+import synthetic
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    rpc.set_cache(None)
+
+
+TOO_MANY_RESULTS = rpc.RPCError({'code': -32005, 'message': 'query returned more than 20 results'})
+
+
+class FakeNode:
+    """Answers log queries with the block numbers of the logs, failing above `max_logs`."""
+
+    def __init__(self, blocks, max_logs, error=TOO_MANY_RESULTS):
+        self.blocks = np.sort(blocks)
+        self.max_logs = max_logs
+        self.error = error
+        self.queries = []
+
+    def get(self, start, end):
+        self.queries.append((start, end))
+        first, last = np.searchsorted(self.blocks, [start, end + 1])
+        if last - first > self.max_logs:
+            raise self.error
+        return list(self.blocks[first:last])
+
+
+def test_chunks_shrink_on_too_many_results_and_grow_when_sparse(monkeypatch):
+    monkeypatch.setattr(log_scanner, 'SPARSE_LOG_COUNT', 10)
+    # a dense range in the middle of sparse ones
+    blocks = np.concatenate([np.arange(0, 1000, 100), np.arange(1000, 1100),
+                             np.arange(1100, 10000, 500)])
+    node = FakeNode(blocks, max_logs=20)
+    logs = list(log_scanner._scan_serial(node.get, 0, 9999, 400))
+    assert logs == list(node.blocks)
+
+    sizes = [end - start + 1 for start, end in node.queries]
+    assert sizes[:2] == [400, 800]
+    # the dense range makes the chunks shrink to contain at most 20 logs
+    failed = [i for i, (start, end) in enumerate(node.queries)
+              if np.sum((node.blocks >= start) & (node.blocks <= end)) > 20]
+    assert failed
+    for i in failed:
+        assert sizes[i + 1] == max(sizes[i] // 2, 1)
+        assert node.queries[i + 1][0] == node.queries[i][0]
+    # and grow again after it
+    assert sizes[-1] > min(sizes)
+    # the successful queries cover the range without gaps
+    covered = [query for i, query in enumerate(node.queries) if i not in failed]
+    assert covered[0][0] == 0 and covered[-1][1] == 9999
+    assert all(b[0] == a[1] + 1 for a, b in zip(covered[:-1], covered[1:]))
+
+
+def test_chunk_size_is_capped():
+    node = FakeNode(np.array([5]), max_logs=10)
+    list(log_scanner._scan_serial(node.get, 0, 50 * log_scanner.MAX_CHUNK_SIZE, 1000))
+    assert max(end - start + 1 for start, end in node.queries) == log_scanner.MAX_CHUNK_SIZE
+
+
+def test_other_errors_are_raised():
+    node = FakeNode(np.arange(100), max_logs=10, error=rpc.RPCError({'code': -32000,
+                                                                     'message': 'unknown'}))
+    with pytest.raises(rpc.RPCError):
+        list(log_scanner._scan_serial(node.get, 0, 99, 50))
+
+
+def test_single_block_with_too_many_results_is_raised():
+    node = FakeNode(np.zeros(20, np.int64), max_logs=10)
+    with pytest.raises(rpc.RPCError):
+        list(log_scanner._scan_serial(node.get, 0, 99, 50))
+
+
+@pytest.mark.parametrize('workers', [2, 8])
+def test_parallel_scan_keeps_block_order(workers):
+    random = np.random.RandomState(workers)
+    blocks = random.randint(0, 100000, 3000)
+    node = FakeNode(blocks, max_logs=200)
+    logs = list(log_scanner._scan_parallel(node.get, 0, 99999, 5000, workers))
+    assert logs == list(node.blocks)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_scan_logs_against_mock_node(auction_data, workers):
+    bids, txs, receipts = auction_data
+    chain = mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                               synthetic.START_TIME, synthetic.START_BLOCK, max_logs=100)
+    topics = [events.event_topic(fetch.BID_EVENT)]
+    with mock_rpc.serve(chain) as url:
+        logs = list(log_scanner.scan_logs(synthetic.AUCTION_ADDRESS, topics,
+                                          synthetic.START_BLOCK, chain.head, chunk_size=1000,
+                                          workers=workers, url=url))
+    assert [log['transactionHash'] for log in logs] == list(
+        bids.sort_values('block', kind='stable')['txhash'])
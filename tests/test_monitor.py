@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pytest
+
+import auctions
+import monitor
+import store
+import synthetic
+
+
+def add_bids(metrics, bids):
+    for sender, amount, time, block in zip(bids['sender'], bids['amount'] / 1e18, bids['time'],
+                                           bids['block']):
+        metrics.add_bid(sender, amount, time, block)
+
+
+def test_live_metrics_match_totals(auction_data):
+    bids, _, _ = auction_data
+    metrics = monitor.LiveMetrics(rolling_window=6 * 60 * 60)
+    add_bids(metrics, bids)
+    snapshot = metrics.snapshot()
+
+    amounts = bids['amount'] / 1e18
+    totals = amounts.groupby(bids['sender']).sum().to_numpy()
+    assert snapshot['bids'] == len(bids)
+    assert snapshot['total_raised'] == pytest.approx(amounts.sum())
+    assert snapshot['unique_participants'] == len(totals)
+    assert snapshot['above_kyc_limit'] == np.sum(totals > auctions.KYC_LIMIT)
+    assert snapshot['newest_bid'] == bids['time'].max()
+    assert snapshot['last_block'] == bids['block'].iloc[-1]
+    recent = bids['time'] > bids['time'].max() - 6 * 60 * 60
+    assert snapshot['rolling_volume'] == pytest.approx(amounts[recent].sum())
+    top = np.sort(totals)[::-1][:int(round(len(totals) * 0.1))]
+    assert snapshot['top_10_percent_share'] == pytest.approx(top.sum() / totals.sum(), rel=1e-3)
+
+
+def test_live_metrics_without_bids():
+    snapshot = monitor.LiveMetrics().snapshot()
+    assert snapshot['bids'] == 0
+    assert snapshot['total_raised'] == 0
+    assert snapshot['last_block'] is None
+
+
+def test_replay_stops_at_checkpoint(tmp_path, monkeypatch, auction_data):
+    monkeypatch.setattr(store, 'DATA_DIR', str(tmp_path))
+    auction = auctions.Auction('synthetic', synthetic.AUCTION_ADDRESS, synthetic.START_BLOCK - 1)
+    bids, txs, receipts = auction_data
+    synthetic.write(bids, txs, receipts, auctions.data_dir(auction))
+    # bids after the checkpoint are stored, but not confirmed yet
+    checkpoint_block = int(bids['block'].median())
+    with open(store.checkpoint_path(auctions.data_dir(auction)), 'w') as f:
+        json.dump({'block': checkpoint_block, 'hash': '0x' + '0' * 64,
+                   'start_time': synthetic.START_TIME}, f)
+
+    metrics = monitor.LiveMetrics()
+    monitor.Monitor(auction, metrics, synthetic.START_TIME).replay_stored_bids()
+    confirmed = bids[bids['block'] <= checkpoint_block]
+    assert metrics.n_bids == len(confirmed)
+    assert metrics.last_block == checkpoint_block
+    expected = monitor.LiveMetrics()
+    add_bids(expected, confirmed)
+    assert metrics.snapshot() == dict(expected.snapshot(), last_block=checkpoint_block)
@@ -0,0 +1,135 @@
+import pytest
+import requests
+
+import mock_rpc
+import rpc
+import synthetic
+
+
+@pytest.fixture
+def chain(auction_data):
+    bids, txs, receipts = auction_data
+    return mock_rpc.MockChain(bids, txs, receipts, synthetic.AUCTION_ADDRESS,
+                              synthetic.START_TIME, synthetic.START_BLOCK)
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    rpc.set_cache(None)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    rpc.set_throttle(rpc.Throttle(backoff=0))
+    yield
+    rpc.set_throttle(rpc.Throttle())
+
+
+def mixed_calls(txs):
+    calls = []
+    for i, txhash in enumerate(txs.index[:25]):
+        calls.append(('eth_getTransactionReceipt', [txhash]))
+        if i % 5 == 0:
+            calls.append(('eth_blockNumber', []))
+        calls.append(('eth_getTransactionByHash', [txhash]))
+    return calls
+
+
+class ReversedResponse:
+    """Response with the items of a batch response in reverse order."""
+
+    def __init__(self, response):
+        self.response = response
+        self.content = response.content
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    def json(self):
+        result = self.response.json()
+        return result[::-1] if isinstance(result, list) else result
+
+
+class ReversingSession(requests.Session):
+
+    def post(self, *args, **kwargs):
+        return ReversedResponse(super().post(*args, **kwargs))
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 100])
+def test_batch_call_matches_single_calls(chain, auction_data, batch_size):
+    calls = mixed_calls(auction_data[1])
+    with mock_rpc.serve(chain) as url:
+        results = rpc.batch_call(calls, batch_size, url)
+        expected = [rpc.call(method, params, url) for method, params in calls]
+    assert results == expected
+    receipt = results[0]
+    assert receipt['transactionHash'] == calls[0][1][0]
+    assert isinstance(receipt['blockNumber'], int)
+
+
+def test_batch_call_maps_responses_by_id(chain, auction_data):
+    calls = mixed_calls(auction_data[1])
+    with mock_rpc.serve(chain) as url:
+        expected = rpc.batch_call(calls, 10, url)
+        with ReversingSession() as session:
+            results = rpc.batch_call(calls, 10, url, session)
+    assert results == expected
+
+
+def test_batch_call_raises_rpc_errors(chain, auction_data):
+    txhash = auction_data[1].index[0]
+    calls = [('eth_getTransactionReceipt', [txhash]), ('eth_unknownMethod', [])]
+    with mock_rpc.serve(chain) as url:
+        with pytest.raises(rpc.RPCError) as error:
+            rpc.batch_call(calls, url=url)
+        assert error.value.args[0]['code'] == -32601
+        with pytest.raises(rpc.RPCError):
+            rpc.batch_call(calls[1:], url=url)
+
+
+def test_batch_call_raises_injected_errors(chain):
+    calls = [('eth_blockNumber', [])] * 3
+    with mock_rpc.serve(chain, faults=mock_rpc.Faults(rpc_error_rate=1)) as url:
+        with pytest.raises(rpc.RPCError):
+            rpc.batch_call(calls, url=url)
+    with mock_rpc.serve(chain, faults=mock_rpc.Faults(http_error_rate=1)) as url:
+        with pytest.raises(requests.HTTPError):
+            rpc.batch_call(calls, url=url)
+
+
+def test_batch_call_retries_transient_errors(chain, auction_data):
+    _, txs, _ = auction_data
+    calls = [('eth_getTransactionByHash', [txhash]) for txhash in txs.index[:40]]
+    faults = mock_rpc.Faults(http_error_rate=0.3, rpc_error_rate=0.05, seed=1)
+    with mock_rpc.serve(chain) as url:
+        expected = rpc.batch_call(calls, batch_size=5, url=url)
+    with mock_rpc.serve(chain, faults=faults) as url:
+        assert rpc.batch_call(calls, batch_size=5, url=url) == expected
+    assert faults.stats['http_errors'] > 0 and faults.stats['rpc_errors'] > 0
+
+
+def test_batch_call_does_not_retry_permanent_errors(chain):
+    rpc.set_throttle(rpc.Throttle(retries=3, backoff=0))
+    sent = []
+
+    class CountingSession:
+        def post(self, *args, **kwargs):
+            sent.append(args)
+            return requests.post(*args, **kwargs)
+
+    with mock_rpc.serve(chain) as url:
+        with pytest.raises(rpc.RPCError):
+            rpc.call('eth_unknownMethod', [], url=url, session=CountingSession())
+    assert len(sent) == 1
+
+
+def test_rate_limiter_spaces_out_requests():
+    limiter = rpc.RateLimiter(100)
+    delays = [limiter.reserve() for _ in range(5)]
+    assert delays[0] <= 0
+    assert delays[4] == pytest.approx(0.04, abs=0.005)
+
+
+def test_batch_call_without_calls():
+    assert rpc.batch_call([], url='http://localhost:1') == []
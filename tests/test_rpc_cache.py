@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import rpc_cache
+
+
+FINALIZED_BLOCK = 100
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = rpc_cache.RPCCache(str(tmp_path / 'cache.sqlite'), finalized_block=FINALIZED_BLOCK)
+    yield cache
+    cache.close()
+
+
+def receipt(block_number):
+    return {'transactionHash': '0x' + 'ab' * 32,
+            'blockNumber': None if block_number is None else hex(block_number)}
+
+
+@pytest.mark.parametrize('method, params, result, immutable', [
+    ('eth_getTransactionReceipt', ['0x01'], receipt(100), True),
+    ('eth_getTransactionReceipt', ['0x01'], receipt(101), False),
+    # pending transactions have no block yet
+    ('eth_getTransactionByHash', ['0x01'], receipt(None), False),
+    ('eth_getTransactionReceipt', ['0x01'], None, False),
+    ('eth_getBlockByNumber', [hex(50), False], {'number': hex(50)}, True),
+    ('eth_getBlockByNumber', [hex(50), True], {'number': hex(50)}, False),
+    ('eth_getBlockByNumber', ['latest', False], {'number': hex(50)}, False),
+    ('eth_getBlockByNumber', [hex(150), False], {'number': hex(150)}, False),
+    ('eth_getCode', ['0x' + '11' * 20, hex(10)], '0x60', True),
+    ('eth_getCode', ['0x' + '11' * 20, 'latest'], '0x60', False),
+    ('eth_getCode', ['0x' + '11' * 20], '0x60', False),
+    ('eth_getLogs', [{'fromBlock': hex(1), 'toBlock': hex(100)}], [], True),
+    ('eth_getLogs', [{'fromBlock': hex(1), 'toBlock': hex(101)}], [], False),
+    ('eth_getLogs', [{'fromBlock': hex(1), 'toBlock': 'latest'}], [], False),
+    ('eth_blockNumber', [], hex(100), False),
+])
+def test_only_immutable_results_are_stored(cache, method, params, result, immutable):
+    assert cache.is_immutable(method, params, result) == immutable
+    cache.put_many([(method, params)], [result])
+    assert cache.get_many([(method, params)]) == [result if immutable else None]
+
+
+def test_nothing_is_final_without_finalized_block(tmp_path):
+    cache = rpc_cache.RPCCache(str(tmp_path / 'cache.sqlite'))
+    assert not cache.is_immutable('eth_getTransactionReceipt', ['0x01'], receipt(0))
+    cache.close()
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    calls = [('eth_getBlockByNumber', [hex(i), False]) for i in range(4)]
+    results = [{'number': hex(i), 'padding': 'x' * 100} for i in range(4)]
+    size = len(json.dumps(results[0], separators=(',', ':')))
+    cache = rpc_cache.RPCCache(path, max_size=3 * size, finalized_block=FINALIZED_BLOCK)
+    cache.put_many(calls[:3], results[:3])
+    # reading the first result makes the second the least recently used one
+    assert cache.get_many(calls[:1]) == results[:1]
+    cache.put_many(calls[3:], results[3:])
+    assert cache.get_many(calls) == [results[0], None, results[2], results[3]]
+    assert cache.size == 3 * size
+    cache.close()
+
+    # the size and access order are restored when opening the cache again
+    cache = rpc_cache.RPCCache(path, max_size=3 * size, finalized_block=FINALIZED_BLOCK)
+    assert cache.size == 3 * size
+    cache.get_many(calls[2:3])
+    cache.put_many(calls[1:2], results[1:2])
+    assert cache.get_many(calls) == [None, results[1], results[2], results[3]]
+    cache.close()
+
+
+def test_replacing_a_result_keeps_the_size(cache):
+    call = ('eth_getCode', ['0x' + '11' * 20, hex(10)])
+    cache.put_many([call], ['0x6060'])
+    cache.put_many([call], ['0x6060'])
+    assert cache.size == len('"0x6060"')
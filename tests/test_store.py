@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import store
+
+
+@pytest.mark.parametrize('name', [store.BIDS, store.TXS, store.RECEIPTS])
+def test_round_trip(tmp_path, auction_data, name):
+    bids, txs, receipts = auction_data
+    df = {store.BIDS: bids, store.TXS: txs, store.RECEIPTS: receipts}[name]
+    if name == store.TXS:
+        # contract creations have no recipient
+        recipients = df['to'].to_numpy(dtype=object)
+        recipients[0] = None
+        df = df.assign(to=recipients)
+    store.write(name, store.to_table(name, df), str(tmp_path))
+    loaded = store.load(name, data_dir=str(tmp_path))
+
+    assert list(loaded.index) == list(df.index)
+    assert list(loaded.columns) == [column for column in store.SCHEMAS[name].names
+                                    if column != store.INDEX_COLUMNS.get(name)]
+    for column in loaded.columns:
+        expected = df[column].reset_index(drop=True)
+        values = loaded[column].reset_index(drop=True)
+        if store.SCHEMAS[name].field(column).type == store.WEI:
+            assert np.allclose(values, expected.astype(float) / 1e18, rtol=1e-15, atol=0)
+        else:
+            assert list(values.astype(object)) == list(expected.astype(object))
+    if name == store.BIDS:
+        assert isinstance(loaded['sender'].dtype, pd.CategoricalDtype)
+
+
+def test_load_columns(tmp_path, auction_data):
+    bids, _, _ = auction_data
+    store.write(store.BIDS, store.to_table(store.BIDS, bids), str(tmp_path))
+    loaded = store.load_bids(['time', 'sender'], str(tmp_path))
+    assert list(loaded.columns) == ['time', 'sender']
+    assert list(loaded['time']) == list(bids['time'])
+
+
+def test_empty_frame():
+    table = store.to_table(store.BIDS, pd.DataFrame())
+    assert table.schema == store.SCHEMAS[store.BIDS]
+    assert len(store.to_frame(store.BIDS, table)) == 0
+
+
+def test_wei_to_ether_wide_values():
+    values = [0, 1, 10**18, 2**64 + 5, 10**30, 2**100]
+    column = pa.chunked_array([pa.array([Decimal(v) for v in values[:2]], store.WEI),
+                               pa.array([Decimal(v) for v in values[2:]], store.WEI)])
+    assert np.allclose(store.wei_to_ether(column), [v / 1e18 for v in values], rtol=1e-15)
+    # slices start at an offset into the buffer
+    assert np.allclose(store.wei_to_ether(column.chunk(1).slice(2)),
+                       [v / 1e18 for v in values[4:]], rtol=1e-15)
+
+
+def test_truncate(auction_data):
+    bids, _, _ = auction_data
+    table = store.to_table(store.BIDS, bids)
+    block = int(bids['block'].median())
+    truncated = store.truncate(store.BIDS, table, block)
+    assert truncated.num_rows == (bids['block'] <= block).sum()
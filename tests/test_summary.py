@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+import auctions
+import store
+import summary
+import synthetic
+
+
+def test_constants_match_their_sources():
+    # summary.py copies them to not import pandas
+    assert summary.DATA_DIR == store.DATA_DIR
+    assert summary.DEFAULT_AUCTION == auctions.DEFAULT_AUCTION
+    assert summary.KYC_LIMIT == auctions.KYC_LIMIT
+
+
+@pytest.fixture
+def data_dir(tmp_path, auction_data):
+    bids, txs, receipts = auction_data
+    synthetic.write(bids, txs, receipts, str(tmp_path))
+    return str(tmp_path)
+
+
+def test_snapshot_is_reused_while_data_is_unchanged(data_dir, monkeypatch, auction_data):
+    bids, _, _ = auction_data
+    written = summary.write(data_dir, synthetic.START_TIME)
+    assert written['participants'] == bids['sender'].nunique()
+    assert written['newest_bid'] == synthetic.START_TIME + bids['time'].max()
+
+    def compute(data_dir, start_time):
+        raise AssertionError('recomputed an unchanged snapshot')
+
+    monkeypatch.setattr(summary, 'compute', compute)
+    assert summary.load(data_dir) == written
+
+
+def test_snapshot_is_recomputed_after_changes(data_dir, auction_data):
+    bids, _, _ = auction_data
+    summary.write(data_dir, synthetic.START_TIME)
+    half = bids.iloc[:len(bids) // 2]
+    store.write(store.BIDS, store.to_table(store.BIDS, half), data_dir)
+    assert summary.load(data_dir)['participants'] == half['sender'].nunique()
+
+
+def test_missing_snapshot_is_computed(data_dir, auction_data):
+    bids, _, _ = auction_data
+    assert not os.path.exists(summary.path(data_dir))
+    assert summary.load(data_dir)['participants'] == bids['sender'].nunique()
+    assert os.path.exists(summary.path(data_dir))
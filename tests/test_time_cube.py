@@ -0,0 +1,41 @@
+import numpy as np
+
+import time_cube
+from time_cube import TimeCube
+
+
+def random_bids(n, seed=0):
+    random = np.random.RandomState(seed)
+    times = np.sort(random.randint(0, 5 * 24 * 60 * 60, n))
+    amounts = random.pareto(1.2, n) + 0.1
+    senders = random.randint(0, 256, (n, 20)).astype(np.uint8).view('S20').ravel()
+    return times, amounts, senders, times // 15
+
+
+def test_appends_equal_single_append(tmp_path):
+    times, amounts, senders, blocks = random_bids(20000)
+    whole = TimeCube()
+    whole.append(times, amounts, senders, blocks)
+    parts = TimeCube()
+    for rows in np.array_split(np.arange(len(times)), 97):
+        parts.append(times[rows], amounts[rows], senders[rows], blocks[rows])
+    for resolution in time_cube.RESOLUTIONS:
+        assert parts.bins(resolution).equals(whole.bins(resolution))
+
+    path = str(tmp_path / 'cube.npz')
+    parts.save(path)
+    loaded = TimeCube.load(path)
+    for resolution in time_cube.RESOLUTIONS:
+        assert loaded.bins(resolution).equals(whole.bins(resolution))
+
+
+def test_coarse_bins_aggregate_minutes():
+    times, amounts, senders, blocks = random_bids(5000, seed=1)
+    cube = TimeCube()
+    cube.append(times, amounts, senders, blocks)
+    hours = cube.bins('hour')
+    hour = times // 3600
+    assert np.array_equal(hours['count'], np.bincount(hour, minlength=len(hours)))
+    assert np.allclose(hours['sum'], np.bincount(hour, amounts, minlength=len(hours)))
+    assert np.allclose(hours['max'], [amounts[hour == h].max(initial=0)
+                                      for h in range(len(hours))])
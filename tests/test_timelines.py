@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import store
+import synthetic
+from bid_table import BidTable
+from timelines import Timelines
+
+
+@pytest.fixture(scope='module')
+def datasets(tmp_path_factory, auction_data):
+    data_dir = str(tmp_path_factory.mktemp('auction'))
+    synthetic.write(*auction_data, data_dir)
+    return (store.load_bids(data_dir=data_dir), store.load_txs(data_dir=data_dir),
+            store.load_receipts(data_dir=data_dir), data_dir)
+
+
+def expected_failures(bids, txs, receipts):
+    first_bid = bids.groupby('sender', observed=True)['block'].min()
+    failed = txs.loc[receipts.index[receipts['status'] == 0], ['from', 'blockNumber']]
+    failed['first_bid'] = failed['from'].map(first_bid)
+    # failed transactions in the block of the first bid are counted as before it
+    before = failed['first_bid'].isna() | (failed['blockNumber'] <= failed['first_bid'])
+    failures = failed[before].groupby('from').size()
+    senders = first_bid.index.astype(str).union(failed['from'].unique())
+    return pd.DataFrame({
+        'failures': failures.reindex(senders, fill_value=0),
+        'succeeded': senders.isin(first_bid.index.astype(str)),
+    })
+
+
+def test_failures_before_success(datasets):
+    bids, txs, receipts, _ = datasets
+    result = Timelines.build(bids, txs, receipts).failures_before_success()
+    expected = expected_failures(bids, txs, receipts)
+    assert result['failures'].sum() > 0
+    result = result.sort_index()
+    assert list(result.index) == list(expected.index)
+    assert np.array_equal(result['failures'], expected['failures'])
+    assert np.array_equal(result['succeeded'], expected['succeeded'])
+
+
+def test_build_from_bid_table(datasets):
+    bids, txs, receipts, data_dir = datasets
+    from_frame = Timelines.build(bids, txs, receipts).failures_before_success().sort_index()
+    from_table = Timelines.build(BidTable.load(data_dir=data_dir), txs, receipts)
+    assert from_table.failures_before_success().sort_index().equals(from_frame)
+
+
+def test_history(datasets):
+    bids, txs, receipts, _ = datasets
+    timelines = Timelines.build(bids, txs, receipts)
+    sender = bids['sender'].value_counts().index[0]
+    history = timelines.history(sender)
+    sender_bids = bids[bids['sender'] == sender]
+    assert (~history['failed']).sum() == len(sender_bids)
+    assert history['block'].is_monotonic_increasing
+    assert np.isclose(history.loc[~history['failed'], 'amount'].sum(), sender_bids['amount'].sum())
+    assert timelines.n_events().sum() == len(bids) + (receipts['status'] == 0).sum()
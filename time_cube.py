@@ -0,0 +1,268 @@
+"""Pre-aggregated bid statistics per minute, hour, 4 hours and day.
+
+Time based figures query the bins of a resolution instead of grouping the raw bids, so they take
+the same time no matter how many bids there are. Each bin holds the number, sum and maximum of
+the bid amounts, the number and sum of the bids above the KYC limit and a HyperLogLog sketch of
+the senders, which can be merged to estimate the distinct senders over any range of bins.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+import aggregates
+import auctions
+import store
+from bid_table import BidTable
+
+
+TIME_CUBE = 'time_cube'
+
+# bin sizes in seconds
+RESOLUTIONS = {
+    'minute': 60,
+    'hour': 60 * 60,
+    '4h': 4 * 60 * 60,
+    'day': 24 * 60 * 60,
+}
+MEASURES = ['count', 'sum', 'max', 'count_above', 'sum_above']
+# the sketches have 2**HLL_PRECISION registers, for a standard error of about 6.5%
+HLL_PRECISION = 8
+
+_memo = {}
+
+
+def resolution_name(bin_size):
+    for name, size in RESOLUTIONS.items():
+        if size == bin_size:
+            return name
+    raise ValueError('no resolution with bins of {} seconds'.format(bin_size))
+
+
+def sender_hashes(senders):
+    """Hash senders given as an array of 20 byte addresses to 64 bit integers."""
+    raw = np.asarray(senders, dtype='S20').view(np.uint8).reshape(-1, 20)
+    h = np.ascontiguousarray(raw[:, :8]).view('>u8').ravel().astype(np.uint64)
+    # splitmix64 finalizer, to not rely on the addresses being uniformly distributed
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return h ^ (h >> np.uint64(31))
+
+
+def hll_estimate(registers):
+    """Estimate the number of distinct elements from HyperLogLog registers (last axis)."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m**2 / np.sum(2.0**-registers.astype(np.float64), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    # linear counting is more accurate for small cardinalities
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class TimeCube:
+    """Bid aggregates per time bin at all resolutions, built incrementally from time ordered bids.
+
+    Times are in seconds since `start_time`, the start of the auction.
+    """
+
+    def __init__(self, start_time=0, threshold=auctions.KYC_LIMIT, precision=HLL_PRECISION):
+        self.start_time = start_time
+        self.threshold = threshold
+        self.precision = precision
+        self.n_bids = 0
+        self.last_time = 0
+        self.last_block = -1
+        # the arrays of each resolution have room for more bins than the `n_bins` used
+        self.storage = {resolution: self._empty(0) for resolution in RESOLUTIONS}
+        self.n_bins = dict.fromkeys(RESOLUTIONS, 0)
+
+    def _empty(self, n_bins):
+        bins = {measure: np.zeros(n_bins) for measure in MEASURES}
+        bins['count'] = np.zeros(n_bins, np.int64)
+        bins['count_above'] = np.zeros(n_bins, np.int64)
+        bins['registers'] = np.zeros((n_bins, 1 << self.precision), np.uint8)
+        return bins
+
+    def _grow(self, resolution, n_bins):
+        """Make room for `n_bins` bins, doubling the capacity so appends copy amortized O(1)."""
+        self.n_bins[resolution] = max(self.n_bins[resolution], n_bins)
+        old = self.storage[resolution]
+        capacity = len(old['count'])
+        if capacity >= n_bins:
+            return
+        self.storage[resolution] = self._empty(max(n_bins, 2 * capacity))
+        for key, values in old.items():
+            self.storage[resolution][key][:capacity] = values
+
+    @property
+    def minutes(self):
+        return self._level('minute')
+
+    def append(self, times, amounts, senders, blocks):
+        """Add bids later than the ones added before, with senders as 20 byte addresses."""
+        times = np.asarray(times, dtype=np.int64)
+        if len(times) == 0:
+            return
+        amounts = np.asarray(amounts, dtype=np.float64)
+        bins = times // RESOLUTIONS['minute']
+        self._grow('minute', int(bins.max()) + 1)
+        minutes = self.storage['minute']
+        np.add.at(minutes['count'], bins, 1)
+        np.add.at(minutes['sum'], bins, amounts)
+        np.maximum.at(minutes['max'], bins, amounts)
+        above = amounts > self.threshold
+        np.add.at(minutes['count_above'], bins[above], 1)
+        np.add.at(minutes['sum_above'], bins[above], amounts[above])
+
+        hashes = sender_hashes(senders)
+        register = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes << np.uint64(self.precision)
+        # position of the first set bit of the remaining bits, as HyperLogLog rank
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = np.where(rest == 0, 64 - self.precision + 1, 64 - bit_length + 1)
+        np.maximum.at(minutes['registers'], (bins, register), rank.astype(np.uint8))
+
+        self.n_bids += len(times)
+        self.last_time = max(self.last_time, int(times.max()))
+        self.last_block = max(self.last_block, int(np.max(blocks)))
+        self._roll_up(int(bins.min()), int(bins.max()) + 1)
+
+    def _roll_up(self, first, last):
+        """Aggregate the coarser bins covering the minutes from `first` to `last` again."""
+        n_minutes = self.n_bins['minute']
+        minutes = self.storage['minute']
+        for resolution, size in RESOLUTIONS.items():
+            if resolution == 'minute':
+                continue
+            factor = size // RESOLUTIONS['minute']
+            first_bin = first // factor
+            last_bin = -(-last // factor)
+            self._grow(resolution, last_bin)
+            level = self.storage[resolution]
+            start = first_bin * factor
+            end = min(last_bin * factor, n_minutes)
+            padding = last_bin * factor - end
+            for key, values in minutes.items():
+                values = values[start:end]
+                if padding:
+                    values = np.concatenate([values, np.zeros((padding,) + values.shape[1:],
+                                                              values.dtype)])
+                values = values.reshape((last_bin - first_bin, factor) + values.shape[1:])
+                if key in ('max', 'registers'):
+                    level[key][first_bin:last_bin] = values.max(axis=1)
+                else:
+                    level[key][first_bin:last_bin] = values.sum(axis=1)
+
+    def _level(self, resolution):
+        if resolution not in RESOLUTIONS:
+            raise ValueError('unknown resolution {}'.format(resolution))
+        n_bins = self.n_bins[resolution]
+        return {key: values[:n_bins] for key, values in self.storage[resolution].items()}
+
+    def _range(self, resolution, start, end):
+        size = RESOLUTIONS[resolution]
+        n_bins = len(self._level(resolution)['count'])
+        first = 0 if start is None else max(int(start) // size, 0)
+        last = n_bins if end is None else min(-(-int(end) // size), n_bins)
+        return first, max(last, first)
+
+    def bins(self, resolution='minute', start=None, end=None):
+        """Aggregates of the bins overlapping the time range, indexed by bin start time (seconds).
+
+        `senders` is the estimated number of distinct senders per bin.
+        """
+        first, last = self._range(resolution, start, end)
+        level = self._level(resolution)
+        bins = pd.DataFrame({measure: level[measure][first:last] for measure in MEASURES},
+                            index=pd.Index(np.arange(first, last) * RESOLUTIONS[resolution],
+                                           name='time'))
+        bins['senders'] = hll_estimate(level['registers'][first:last])
+        return bins
+
+    def counts(self, resolution='minute'):
+        return self._level(resolution)['count']
+
+    def distinct_senders(self, start=None, end=None, resolution='minute'):
+        """Estimate the number of distinct senders over a time range."""
+        first, last = self._range(resolution, start, end)
+        registers = self._level(resolution)['registers'][first:last]
+        if len(registers) == 0:
+            return 0.0
+        return float(hll_estimate(registers.max(axis=0)))
+
+    def datetimes(self, bin_times):
+        """Convert times relative to the start to datetimes."""
+        return pd.to_datetime(self.start_time + np.asarray(bin_times), unit='s')
+
+    def save(self, path):
+        metadata = {
+            'start_time': self.start_time,
+            'threshold': self.threshold,
+            'precision': self.precision,
+            'n_bids': self.n_bids,
+            'last_time': self.last_time,
+            'last_block': self.last_block,
+        }
+        with open(path, 'wb') as f:
+            np.savez(f, metadata=json.dumps(metadata), **self.minutes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            metadata = json.loads(str(stored['metadata']))
+            cube = cls(metadata['start_time'], metadata['threshold'], metadata['precision'])
+            cube.n_bids = metadata['n_bids']
+            cube.last_time = metadata['last_time']
+            cube.last_block = metadata['last_block']
+            cube.storage['minute'] = {key: stored[key] for key in stored.files
+                                      if key != 'metadata'}
+        cube.n_bins['minute'] = len(cube.storage['minute']['count'])
+        cube._roll_up(0, cube.n_bins['minute'])
+        return cube
+
+
+def path(data_dir=store.DATA_DIR):
+    return os.path.join(data_dir, TIME_CUBE + '.npz')
+
+
+def load_cube(data_dir=store.DATA_DIR):
+    """Get the time cube of the stored bids.
+
+    The cube of the confirmed bids is persisted next to the data and only the bids added since it
+    was saved are aggregated. Unconfirmed bids, which may change with a reorg, are added in
+    memory only.
+    """
+    version = aggregates.dataset_version(data_dir)
+    key = (os.path.abspath(data_dir), version)
+    if key in _memo:
+        return _memo[key]
+
+    with open(store.checkpoint_path(data_dir)) as f:
+        checkpoint = json.load(f)
+    cube = None
+    if os.path.exists(path(data_dir)):
+        cube = TimeCube.load(path(data_dir))
+        if cube.start_time != checkpoint['start_time'] or cube.last_block > checkpoint['block']:
+            # fetched again from scratch
+            cube = None
+    if cube is None:
+        cube = TimeCube(checkpoint['start_time'])
+
+    table = store.read_table(store.BIDS, ['block', 'time', 'amount', 'sender'], data_dir)
+    table = table.filter(pc.greater(table['block'], cube.last_block))
+    confirmed = pc.less_equal(table['block'], checkpoint['block'])
+    for part, persist in [(table.filter(confirmed), True),
+                          (table.filter(pc.invert(confirmed)), False)]:
+        if part.num_rows > 0:
+            bids = BidTable.from_arrow(part)
+            cube.append(bids.time, store.wei_to_ether(bids.amount),
+                        bids.senders[bids.sender_codes], bids.block)
+        if persist:
+            cube.save(path(data_dir))
+
+    _memo[key] = cube
+    return cube
@@ -0,0 +1,116 @@
+"""Per bidder histories of bids and failed transactions.
+
+The bids and failed transactions are ordered by sender, then block, with the rows of each sender
+found by an offset array (as in a compressed sparse row matrix). Any sender's history is a slice,
+and queries over all senders are single passes over the arrays instead of a scan per sender.
+"""
+import numpy as np
+import pandas as pd
+
+
+class Timelines:
+    """Bids and failed transactions of all senders, sorted by sender, block and time.
+
+    The rows of the sender with code `i` are `offsets[i]:offsets[i + 1]`, `senders[i]` is its
+    address. `failed` marks the failed transactions, whose amount is the value sent. Failed
+    transactions have no bid times, their times are interpolated from the bids by block number.
+    """
+
+    def __init__(self, senders, offsets, codes, block, time, amount, failed):
+        self.senders = senders  # hex strings
+        self.offsets = offsets  # int64, one more than there are senders
+        self.codes = codes  # int32 sender code of each row
+        self.block = block
+        self.time = time
+        self.amount = amount  # ETH
+        self.failed = failed
+        self._codes_by_sender = None
+
+    @classmethod
+    def build(cls, bids, txs=None, receipts=None):
+        """Build from a bids dataframe or `BidTable` and optionally transactions and receipts."""
+        sender = bids['sender']
+        bid_codes = sender.cat.codes.to_numpy()
+        bid_blocks = bids['block'].to_numpy().astype(np.int64)
+        bid_times = bids['time'].to_numpy().astype(np.int64)
+        senders = pd.Index(sender.cat.categories.astype(str))
+
+        failed_from = np.zeros(0, dtype=object)
+        failed_blocks = np.zeros(0, dtype=np.int64)
+        failed_values = np.zeros(0)
+        if txs is not None and receipts is not None:
+            merged = pd.merge(txs[['from', 'blockNumber', 'value']], receipts[['status']],
+                              left_index=True, right_index=True)
+            failed_txs = merged[merged['status'] == 0]
+            failed_from = failed_txs['from'].to_numpy()
+            failed_blocks = failed_txs['blockNumber'].to_numpy().astype(np.int64)
+            failed_values = failed_txs['value'].to_numpy().astype(np.float64)
+            senders = senders.append(pd.Index(failed_from).difference(senders))
+
+        if len(bid_blocks) > 0:
+            order = np.argsort(bid_blocks, kind='stable')
+            failed_times = np.interp(failed_blocks, bid_blocks[order], bid_times[order])
+        else:
+            failed_times = np.zeros(len(failed_blocks))
+
+        codes = np.concatenate([bid_codes, senders.get_indexer(failed_from)]).astype(np.int32)
+        block = np.concatenate([bid_blocks, failed_blocks])
+        time = np.concatenate([bid_times, np.round(failed_times).astype(np.int64)])
+        amount = np.concatenate([bids['amount'].to_numpy().astype(np.float64), failed_values])
+        failed = np.concatenate([np.zeros(len(bid_codes), bool), np.ones(len(failed_from), bool)])
+        # within a block, failed transactions are assumed to come before the bids
+        order = np.lexsort((~failed, time, block, codes))
+        offsets = np.zeros(len(senders) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(senders)), out=offsets[1:])
+        return cls(senders, offsets, codes[order], block[order], time[order], amount[order],
+                   failed[order])
+
+    def __len__(self):
+        return len(self.senders)
+
+    def code(self, sender):
+        if self._codes_by_sender is None:
+            self._codes_by_sender = {address: i for i, address in enumerate(self.senders)}
+        return self._codes_by_sender[sender.lower()]
+
+    def history(self, sender):
+        """Bids and failed transactions of a sender (address or code) in order."""
+        code = sender if isinstance(sender, (int, np.integer)) else self.code(sender)
+        rows = slice(self.offsets[code], self.offsets[code + 1])
+        return pd.DataFrame({
+            'block': self.block[rows],
+            'time': self.time[rows],
+            'amount': self.amount[rows],
+            'failed': self.failed[rows],
+        })
+
+    def n_events(self):
+        return np.diff(self.offsets)
+
+    def failures_before_success(self):
+        """Number of failed transactions of each sender before its first bid.
+
+        `succeeded` is false for senders who never placed a bid, for whom `failures` counts all
+        their failed transactions.
+        """
+        n_events = self.n_events()
+        first_bid = np.full(len(self), np.iinfo(np.int64).max)
+        bid_rows = np.flatnonzero(~self.failed)
+        np.minimum.at(first_bid, self.codes[bid_rows], bid_rows)
+        succeeded = first_bid < np.iinfo(np.int64).max
+        failures = np.where(succeeded, first_bid - self.offsets[:-1], n_events)
+        return pd.DataFrame({'failures': failures, 'succeeded': succeeded},
+                            index=pd.Index(self.senders, name='sender'))
+
+    def learning_bidders(self, min_failures=1):
+        """Senders who failed at least `min_failures` times before their first bid."""
+        failures = self.failures_before_success()
+        return failures.index[failures['succeeded'] & (failures['failures'] >= min_failures)]
+
+    def gaps(self, include_failed=False):
+        """Seconds between consecutive bids (or transactions) of the same sender, with the codes
+        of the senders."""
+        rows = slice(None) if include_failed else ~self.failed
+        codes = self.codes[rows]
+        same_sender = codes[1:] == codes[:-1]
+        return np.diff(self.time[rows])[same_sender], codes[1:][same_sender]